@@ -0,0 +1,128 @@
+"""Parquet and Arrow IPC encoding of exported query rows.
+
+Used by the ``/export`` endpoints. The rows arrive as CSV chunks from
+``streaming.copy_csv_chunks``; each chunk is parsed by pyarrow's CSV reader
+into typed columns and written as one Parquet row group (or Arrow record
+batches) off the event loop, and its bytes are sent before the next chunk
+is read. An export of any size starts at once and holds about one chunk in
+memory. pyarrow is optional; ``available()`` is False and the endpoints
+answer 501 when it is not installed.
+"""
+import asyncio
+import io
+from typing import AsyncIterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+    import pyarrow.parquet as pq
+except ImportError:  # optional; only the export endpoints need it
+    pa = pcsv = pq = None
+
+PARQUET_COMPRESSION = "zstd"
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def sales_schema():
+    return pa.schema([
+        ("sale_id", pa.int64()),
+        ("date", pa.date32()),
+        ("sku", pa.string()),
+        ("channel", pa.string()),
+        ("quantity", pa.int32()),
+    ])
+
+
+def products_schema():
+    return pa.schema([
+        ("sku", pa.string()),
+        ("name", pa.string()),
+        ("category_id", pa.int32()),
+        ("category_name", pa.string()),
+        ("subcategory", pa.string()),
+        ("stock_level", pa.int32()),
+        ("prefix", pa.string()),
+        ("design_code", pa.string()),
+        ("pattern", pa.string()),
+        ("color", pa.string()),
+        ("size", pa.string()),
+    ])
+
+
+def parse_csv(data: bytes, schema) -> "pa.Table":
+    """Headerless Postgres CSV (columns in ``schema`` order) as a typed table.
+
+    Postgres writes NULL as an empty field and an empty string as ``""``,
+    so only unquoted empty fields become nulls.
+    """
+    return pcsv.read_csv(
+        pa.py_buffer(data),
+        read_options=pcsv.ReadOptions(column_names=schema.names),
+        parse_options=pcsv.ParseOptions(newlines_in_values=True),
+        convert_options=pcsv.ConvertOptions(
+            column_types=schema,
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file whose contents are taken out piece by piece with ``drain``."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+async def encode(chunks: AsyncIterator[bytes], schema, fmt: str) -> AsyncIterator[bytes]:
+    """Body of a Parquet file (``parquet``) or Arrow IPC stream (``arrow``), one part per CSV chunk."""
+    loop = asyncio.get_running_loop()
+    sink = _Sink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    def write(data: bytes) -> bytes:
+        table = parse_csv(data, schema)
+        if fmt == "parquet":
+            writer.write_table(table, row_group_size=max(table.num_rows, 1))
+        else:
+            writer.write_table(table)
+        return sink.drain()
+
+    try:
+        async for data in chunks:
+            # parsing and compressing are CPU-bound; keep them off the event loop
+            part = await loop.run_in_executor(None, write, data)
+            if part:
+                yield part
+    finally:
+        writer.close()
+    # footer (Parquet) or end-of-stream marker (Arrow)
+    yield sink.drain()
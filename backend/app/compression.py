@@ -0,0 +1,48 @@
+"""Response compression that leaves already-compressed bodies alone.
+
+Starlette's ``GZipMiddleware`` compresses every response over
+``minimum_size`` whatever its type, on the event loop. The columnar exports
+are zstd-compressed by pyarrow in an executor, so gzipping them again costs
+CPU on the loop for almost no saving. ``CompressionMiddleware`` decides per
+response from its media type and hands the rest to Starlette's responder.
+"""
+import os
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+
+from .columnar import MEDIA_TYPES
+
+# zlib level; 9 costs several times the CPU of 5 for a few percent on JSON
+GZIP_COMPRESSLEVEL = int(os.getenv("GZIP_COMPRESSLEVEL", "5"))
+# bodies that are compressed already
+UNCOMPRESSED_MEDIA_TYPES = frozenset(MEDIA_TYPES.values())
+
+
+class CompressionMiddleware:
+    """ASGI middleware gzipping responses except the ``UNCOMPRESSED_MEDIA_TYPES``."""
+
+    def __init__(self, app, minimum_size: int = 500, compresslevel: int = GZIP_COMPRESSLEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("Accept-Encoding", ""):
+            await self.app(scope, receive, send)
+            return
+        responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        responder.send = send
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                media_type = Headers(raw=message["headers"]).get("content-type", "").split(";")[0].strip()
+                passthrough = media_type in UNCOMPRESSED_MEDIA_TYPES
+            if passthrough:
+                await send(message)
+            else:
+                await responder.send_with_gzip(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,205 @@
+"""Product facets (sizes, colors, categories) kept in memory.
+
+``/products/facets`` used to run two ``SELECT DISTINCT`` queries and
+re-split and re-match every value on each call. The normalized tokens of
+every product are now computed once into a ``FacetIndex`` and held per
+process. The index is dropped by ``invalidate_facets`` when this process
+creates or imports products, and rebuilt on the next request; it also
+expires after ``FACETS_TTL_SECONDS`` so changes made elsewhere (CLI imports,
+other API workers) show up without a restart.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from .ingest.normalize import ALLOWED_SIZES
+from .models import Product
+
+FACETS_TTL_SECONDS = float(os.getenv("FACETS_TTL_SECONDS", "300"))
+
+SPLIT_RE = re.compile(r"[,/]")
+LETTER_RE = re.compile(r"[A-Za-zก-ฮ]")
+TIMES_X_RE = re.compile(r"^(2|3)[Xx]$")
+
+
+def size_tokens(raw) -> FrozenSet[str]:
+    """Normalized sizes in a size cell, e.g. 'S/M' -> {'S', 'M'}, 'XXXL' -> {'3XL'}."""
+    tokens = set()
+    if raw is None:
+        return frozenset()
+    for part in SPLIT_RE.split(str(raw).strip()):
+        token = part.strip().upper().replace(" ", "")
+        if not token:
+            continue
+        # map simple '2X' -> '2XL'
+        if TIMES_X_RE.match(token):
+            token = token.replace("X", "XL")
+        if token in ALLOWED_SIZES:
+            tokens.add(token)
+        elif token.endswith("XL") and token.count("X") >= 2:
+            # try heuristic: 'XXXL' -> '3XL'
+            xcount = token.count("X")
+            if xcount == 3:
+                tokens.add("3XL")
+            elif xcount == 2:
+                tokens.add("XXL")
+    return frozenset(tokens)
+
+
+def color_tokens(raw) -> FrozenSet[str]:
+    """Color names in a color cell; parts without a letter (numeric codes) are dropped."""
+    if raw is None:
+        return frozenset()
+    parts = (p.strip() for p in SPLIT_RE.split(str(raw).strip()))
+    return frozenset(p for p in parts if p and LETTER_RE.search(p))
+
+
+# an entity tag in If-None-Match, or the "*" wildcard
+ENTITY_TAG_RE = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+def _invert(tokens_per_product) -> Dict[object, FrozenSet[int]]:
+    """Token -> positions of the products carrying it, sorted by token."""
+    positions = defaultdict(set)
+    for i, tokens in enumerate(tokens_per_product):
+        for token in tokens:
+            positions[token].add(i)
+    return {token: frozenset(positions[token]) for token in sorted(positions)}
+
+
+def _count(tokens_at: List[Tuple], within: FrozenSet[int]) -> dict:
+    """Products per token among the positions ``within``, sorted by token."""
+    counts = Counter(chain.from_iterable(tokens_at[i] for i in within))
+    return dict(sorted(counts.items()))
+
+
+def _intersect(*sets: Optional[FrozenSet[int]]) -> Optional[FrozenSet[int]]:
+    """Intersection of the given position sets; None stands for every product."""
+    chosen = sorted((s for s in sets if s is not None), key=len)
+    if not chosen:
+        return None
+    return chosen[0].intersection(*chosen[1:]) if len(chosen) > 1 else chosen[0]
+
+
+class FacetIndex:
+    """Normalized facet tokens of every product, with filtered counts.
+
+    Products are numbered by position and each size, color and category maps
+    to the set of positions carrying it. The unfiltered counts are computed
+    once here; a filter intersects those sets, and only the products left
+    are counted. Counts under a single filter value are kept for reuse.
+    """
+
+    def __init__(self, rows):
+        categories, sizes, colors = [], [], []
+        for cat, size, color in rows:
+            categories.append((cat,) if cat is not None else ())
+            sizes.append(tuple(size_tokens(size)))
+            colors.append(tuple(color_tokens(color)))
+        self._tokens_at = {"size_counts": sizes, "color_counts": colors, "category_counts": categories}
+        self.by_size = _invert(sizes)
+        self.by_color = _invert(colors)
+        self.by_category = _invert(categories)
+        self.sizes = list(self.by_size)
+        self.colors = list(self.by_color)
+        self._unfiltered = {
+            "total": len(categories),
+            "size_counts": {token: len(ids) for token, ids in self.by_size.items()},
+            "color_counts": {token: len(ids) for token, ids in self.by_color.items()},
+            "category_counts": {token: len(ids) for token, ids in self.by_category.items()},
+        }
+        # counts under a single filter value, filled in as they are asked for
+        self._single = {}
+        self.built_at = time.monotonic()
+        # content hash: an unchanged catalog keeps its ETag across rebuilds
+        payload = sorted(
+            (cat[0] if cat else 0, sorted(s), sorted(c)) for cat, s, c in zip(categories, sizes, colors)
+        )
+        self.digest = hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()[:16]
+
+    def counts(self, category_id: Optional[int] = None, size: Optional[str] = None, color: Optional[str] = None) -> dict:
+        """Product counts per size, color and category under the given filters.
+
+        Each facet is counted with the filters on the *other* facets only, so
+        the counts show what picking another value would return.
+        """
+        size = size.strip().upper() if size else None
+        color = color.strip() if color else None
+        if category_id is None and size is None and color is None:
+            return dict(self._unfiltered)
+        filters = {"category": category_id, "size": size, "color": color}
+        counts = {"total": len(_intersect(*(self._matching(k, v) for k, v in filters.items())))}
+        for facet, own in (("size_counts", "size"), ("color_counts", "color"), ("category_counts", "category")):
+            others = tuple((k, v) for k, v in filters.items() if k != own and v is not None)
+            if not others:
+                counts[facet] = self._unfiltered[facet]
+            elif len(others) == 1:
+                within = self._matching(*others[0])
+                if not within:
+                    counts[facet] = {}
+                    continue
+                # one known filter value: few enough combinations to keep
+                key = (facet, others[0])
+                if key not in self._single:
+                    self._single[key] = _count(self._tokens_at[facet], within)
+                counts[facet] = self._single[key]
+            else:
+                counts[facet] = _count(self._tokens_at[facet], _intersect(*(self._matching(k, v) for k, v in others)))
+        return counts
+
+    def _matching(self, facet: str, value) -> Optional[FrozenSet[int]]:
+        if value is None:
+            return None
+        by_value = {"category": self.by_category, "size": self.by_size, "color": self.by_color}[facet]
+        return by_value.get(value, frozenset())
+
+    def etag(self, *filters) -> str:
+        key = hashlib.sha1(repr(filters).encode()).hexdigest()[:8]
+        return f'"{self.digest}-{key}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists ``etag`` (weak comparison) or is ``*``."""
+    for tag in ENTITY_TAG_RE.findall(if_none_match or ""):
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+_index: Optional[FacetIndex] = None
+# bumped by invalidate_facets so a rebuild racing an invalidation is not kept
+_generation = 0
+_lock = asyncio.Lock()
+
+
+async def get_facet_index(db) -> FacetIndex:
+    """The cached index, rebuilt from ``product`` when missing or expired."""
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.built_at < FACETS_TTL_SECONDS:
+        return index
+    async with _lock:
+        # another request may have rebuilt it while we waited
+        index = _index
+        if index is None or time.monotonic() - index.built_at >= FACETS_TTL_SECONDS:
+            generation = _generation
+            result = await db.execute(select(Product.category_id, Product.size, Product.color))
+            index = FacetIndex(result.all())
+            if generation == _generation:
+                _index = index
+        return index
+
+
+def invalidate_facets() -> None:
+    """Drop the cached index; call after products are created or imported."""
+    global _index, _generation
+    _generation += 1
+    _index = None
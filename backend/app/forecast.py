@@ -0,0 +1,121 @@
+"""Vectorized demand forecasting and restock recommendations.
+
+Sales history is laid out as a dense SKU x day matrix of units sold (one
+row per SKU, oldest day first), and every statistic below is computed for
+all SKUs at once with array operations, never a Python loop per SKU. The
+matrix is float32: 20k SKUs x 730 days is about 58 MB.
+
+Demand is a per-SKU daily rate, either the simple moving average of the
+last ``window`` days or simple exponential smoothing of the whole history.
+The reorder policy is the usual reorder point / order-up-to pair:
+
+- safety stock  = z * sigma * sqrt(lead time), sigma being the standard
+  deviation of daily sales over the last ``window`` days;
+- reorder point = demand * lead time + safety stock;
+- when stock is at or below the reorder point, order enough to reach
+  demand * (lead time + cover days) + safety stock.
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEMAND_METHODS = ("sma", "ema")
+DEFAULT_WINDOW_DAYS = 30
+DEFAULT_ALPHA = 0.1
+DEFAULT_LEAD_TIME_DAYS = 14  # the frontend's default lead time
+DEFAULT_COVER_DAYS = 30  # the frontend orders 30 days of supply
+# z-score of a ~95% cycle service level
+DEFAULT_SERVICE_Z = 1.65
+
+
+def demand_matrix(skus: Sequence[str], sale_skus, sale_days, quantities, days: int) -> np.ndarray:
+    """Dense ``len(skus) x days`` matrix of units sold.
+
+    ``sale_skus``, ``sale_days`` (0 = oldest day) and ``quantities`` are
+    parallel arrays with one entry per (sku, day); sales of SKUs missing
+    from ``skus`` or outside the day range are ignored.
+    """
+    demand = np.zeros((len(skus), days), dtype=np.float32)
+    rows = pd.Index(skus).get_indexer(np.asarray(sale_skus, dtype=object))
+    cols = np.asarray(sale_days, dtype=np.int64)
+    keep = (rows >= 0) & (cols >= 0) & (cols < days)
+    demand[rows[keep], cols[keep]] = np.asarray(quantities, dtype=np.float32)[keep]
+    return demand
+
+
+def sma_demand(demand: np.ndarray, window: int) -> np.ndarray:
+    """Mean daily sales over the last ``window`` days of each row."""
+    window = min(window, demand.shape[1])
+    if window <= 0:
+        return np.zeros(demand.shape[0])
+    return demand[:, -window:].sum(axis=1, dtype=np.float64) / window
+
+
+def ema_weights(days: int, alpha: float) -> np.ndarray:
+    """Weights that give the final level of simple exponential smoothing.
+
+    With the level started at the first observation, the level after the
+    last day is ``demand @ w`` where ``w[0] = (1-alpha)**(days-1)`` and
+    ``w[t] = alpha * (1-alpha)**(days-1-t)``; the weights sum to one.
+    """
+    if days <= 0:
+        return np.zeros(0)
+    age = np.arange(days - 1, -1, -1, dtype=np.float64)
+    weights = alpha * (1 - alpha) ** age
+    weights[0] = (1 - alpha) ** (days - 1)
+    return weights
+
+
+def ema_demand(demand: np.ndarray, alpha: float) -> np.ndarray:
+    """Exponentially smoothed daily demand of each row (one matrix-vector product)."""
+    if demand.shape[1] == 0:
+        return np.zeros(demand.shape[0])
+    return demand @ ema_weights(demand.shape[1], alpha).astype(demand.dtype)
+
+
+def recommend(
+    demand: np.ndarray,
+    stock,
+    method: str = "sma",
+    window: int = DEFAULT_WINDOW_DAYS,
+    alpha: float = DEFAULT_ALPHA,
+    lead_time_days: float = DEFAULT_LEAD_TIME_DAYS,
+    cover_days: float = DEFAULT_COVER_DAYS,
+    service_z: float = DEFAULT_SERVICE_Z,
+) -> Dict[str, np.ndarray]:
+    """Restock figures for every row of ``demand``, as parallel arrays.
+
+    ``stock`` holds the on-hand units of each row. Returns ``daily_demand``,
+    ``days_of_cover`` (inf where there is no demand), ``safety_stock``,
+    ``reorder_point``, ``reorder_qty`` and ``needs_reorder``.
+    """
+    if method not in DEMAND_METHODS:
+        raise ValueError(f"Unknown demand method: {method}")
+    if method == "sma":
+        rate = sma_demand(demand, window)
+    else:
+        rate = ema_demand(demand, alpha)
+    rate = np.asarray(rate, dtype=np.float64)
+
+    recent = demand[:, -min(window, demand.shape[1]):] if demand.shape[1] else demand
+    sigma = recent.std(axis=1, dtype=np.float64) if recent.shape[1] else np.zeros(len(rate))
+    safety = service_z * sigma * np.sqrt(lead_time_days)
+    reorder_point = rate * lead_time_days + safety
+
+    on_hand = np.maximum(np.asarray(stock, dtype=np.float64), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(rate > 0, on_hand / rate, np.inf)
+
+    needs = (rate > 0) & (on_hand <= reorder_point)
+    target = rate * (lead_time_days + cover_days) + safety
+    qty = np.where(needs, np.ceil(np.maximum(target - on_hand, 0)), 0).astype(np.int64)
+
+    return {
+        "daily_demand": rate,
+        "days_of_cover": cover,
+        "safety_stock": safety,
+        "reorder_point": reorder_point,
+        "reorder_qty": qty,
+        "needs_reorder": needs,
+    }
@@ -0,0 +1 @@
+# ingestion helpers shared by the import scripts
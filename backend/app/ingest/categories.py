@@ -0,0 +1,92 @@
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+from ..models import Category
+
+Pair = Tuple[str, Optional[str]]
+
+# Rows per INSERT; two bind parameters each, far below the protocol's 32767
+INSERT_BATCH_SIZE = 5000
+
+
+class CategoryResolver:
+    """Map (name, subcategory) pairs to category ids for an import.
+
+    Built once per import from every category row, so lookups never touch
+    the database; missing pairs are created together by ``create`` with one
+    multi-row ``INSERT ... RETURNING``. When a name appears more than once
+    with the same subcategory, the lowest id wins.
+
+    With ``fallback`` (the product importer's rule) a pair whose exact
+    subcategory is unknown resolves to the category of the same name
+    without a subcategory, if there is one.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[str]]], fallback: bool = True):
+        self.fallback = fallback
+        self._ids = {}
+        for category_id, name, subcategory in sorted(rows, key=lambda r: r[0]):
+            self._ids.setdefault((name, subcategory), category_id)
+
+    @classmethod
+    async def from_session(cls, session, fallback: bool = True) -> "CategoryResolver":
+        res = await session.execute(select(Category.category_id, Category.name, Category.subcategory))
+        return cls(res.all(), fallback=fallback)
+
+    def _key(self, name: str, subcategory: Optional[str]) -> Optional[Pair]:
+        if (name, subcategory) in self._ids:
+            return (name, subcategory)
+        if self.fallback and (name, None) in self._ids:
+            return (name, None)
+        return None
+
+    def __contains__(self, pair: Pair) -> bool:
+        return self._key(*pair) is not None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def resolve(self, name: str, subcategory: Optional[str]) -> Optional[int]:
+        key = self._key(name, subcategory)
+        return self._ids[key] if key is not None else None
+
+    def missing(self, pairs: Iterable[Pair]) -> List[Pair]:
+        """Pairs to create so that all of ``pairs`` resolve, in first-seen order.
+
+        Taken in order as if each were created when first met, so with
+        ``fallback`` a (name, None) pair listed earlier also covers later
+        pairs of that name, as it did when categories were created row by row.
+        """
+        planned = {}
+        for name, subcategory in pairs:
+            if (name, subcategory) in planned or (name, subcategory) in self:
+                continue
+            if self.fallback and (name, None) in planned:
+                continue
+            planned[(name, subcategory)] = None
+        return list(planned)
+
+    def add(self, name: str, subcategory: Optional[str], category_id: Optional[int]) -> None:
+        """Register a category; a dry run registers planned ones with id None."""
+        self._ids.setdefault((name, subcategory), category_id)
+
+    async def create(self, session, pairs: Iterable[Pair]) -> List[Tuple[int, str, Optional[str]]]:
+        """Insert the missing ``pairs`` with one multi-row insert; return the new (id, name, subcategory) rows.
+
+        Rows are flushed on the session's transaction, not committed.
+        """
+        new = self.missing(pairs)
+        created = []
+        for start in range(0, len(new), INSERT_BATCH_SIZE):
+            batch = new[start:start + INSERT_BATCH_SIZE]
+            res = await session.execute(
+                insert(Category)
+                .values([{"name": name, "subcategory": subcategory} for name, subcategory in batch])
+                .returning(Category.category_id, Category.name, Category.subcategory)
+            )
+            created.extend(tuple(row) for row in res.all())
+        created.sort()
+        for category_id, name, subcategory in created:
+            self.add(name, subcategory, category_id)
+        return created
@@ -0,0 +1,308 @@
+"""Column-wise parsing of product and sales sheets.
+
+These functions produce the same values as the original row-at-a-time
+parsers of the import scripts (kept as a reference in
+``tests/test_normalize_parity.py``), but work on whole columns with ``.str``
+operations. Sizes are only normalized here, and ``ALLOWED_SIZES`` is the
+list of size tokens for the whole app. Columns with few distinct values (sizes,
+colors, channels, dates) are normalized once per unique value and broadcast
+back with ``take``.
+"""
+import re
+from datetime import datetime
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Allowed size tokens (normalized form); also used by app.facets
+ALLOWED_SIZES = {"XS", "S", "M", "L", "XL", "XXL", "2XL", "3XL", "F", "FF"}
+ONE_SIZE_TOKENS = {"ONE", "ONESIZE", "OS"}
+CHANNEL_NOISE_TOKENS = {"PAJARA", "OFFICIAL"}
+
+NUMERIC_SIZE_RE = re.compile(r"\d+(?:[-–]\d+)?")
+SHORT_XL_RE = re.compile(r"^(2|3)[Xx](?:L)?$")
+LETTER_RE = re.compile(r"[A-Za-zก-ฮ]")
+NO_LETTER_RE = re.compile(r"[\d\W_]+")
+DIGIT_RE = re.compile(r"\d")
+# first non-empty comma / dash separated piece, skipping leading separators
+FIRST_COMMA_PART_RE = re.compile(r"^[\s,]*([^,]*)")
+FIRST_DASH_PART_RE = re.compile(r"^[\s-]*([^-]*)")
+
+
+def _on_uniques(values: pd.Series, fn: Callable[[pd.Series], pd.Series], na_value=None) -> pd.Series:
+    """Apply a column function to the distinct non-null values and broadcast back.
+
+    ``fn`` receives the uniques already converted with ``str()``; missing
+    cells become ``na_value``.
+    """
+    codes, uniques = pd.factorize(values.astype(object), use_na_sentinel=True)
+    table = np.empty(len(uniques) + 1, dtype=object)
+    if len(uniques):
+        mapped = fn(pd.Series(uniques, dtype=object).astype(str)).to_numpy(dtype=object)
+        table[:-1] = np.where(pd.isna(mapped), None, mapped)
+    # the sentinel code (-1) picks the trailing slot
+    table[-1] = na_value
+    return pd.Series(table.take(codes), index=values.index, dtype=object)
+
+
+def _stripped_text(values: pd.Series) -> pd.Series:
+    """``str(v).strip()`` for non-null cells, None for missing ones."""
+    arr = values.to_numpy(dtype=object)
+    mask = pd.notna(arr)
+    out = np.full(len(arr), None, dtype=object)
+    if mask.any():
+        out[mask] = pd.Series(arr[mask], dtype=object).astype(str).str.strip().to_numpy(dtype=object)
+    return pd.Series(out, index=values.index, dtype=object)
+
+
+def _empty(values: pd.Series) -> pd.Series:
+    """None / '' cells, which the per-row helpers reject with ``if not raw``."""
+    return values.isna() | values.astype(object).eq("")
+
+
+def _first_part(s: pd.Series, pattern: re.Pattern) -> pd.Series:
+    """First non-empty stripped piece captured by ``pattern``, or ``s`` when there is none."""
+    first = s.str.extract(pattern, expand=False).str.strip()
+    return first.where(first != "", s)
+
+
+def _normalize_size_uniques(raw: pd.Series) -> pd.Series:
+    s = raw.str.strip().str.upper()
+    s = s.str.split("/", n=1).str[0].str.strip()
+    s = s.str.split(",", n=1).str[0].str.strip()
+    s = s.str.replace(" ", "", regex=False)
+
+    out = pd.Series([None] * len(s), index=s.index, dtype=object)
+    done = s.str.fullmatch(NUMERIC_SIZE_RE)
+
+    allowed = ~done & s.isin(ALLOWED_SIZES)
+    out[allowed] = s[allowed]
+    done |= allowed
+
+    xcount = s.str.count("X")
+    repeated_x = ~done & s.str.endswith("XL") & xcount.isin([2, 3])
+    out[repeated_x & (xcount == 3)] = "3XL"
+    out[repeated_x & (xcount == 2)] = "XXL"
+    done |= repeated_x
+
+    one_size = ~done & s.isin(ONE_SIZE_TOKENS)
+    out[one_size] = "F"
+    done |= one_size
+
+    short_xl = s.str.extract(SHORT_XL_RE, expand=False)
+    short_xl = ~done & short_xl.notna() & (short_xl + "XL").isin(ALLOWED_SIZES)
+    out[short_xl] = s[short_xl].str[0] + "XL"
+    return out
+
+
+def normalize_size_series(raw: pd.Series) -> pd.Series:
+    """Canonical size token of each cell, or None.
+
+    Takes the first '/' or ',' separated part, uppercased without spaces;
+    numbers and numeric ranges are dropped, 'XXXL' becomes '3XL', '2X'
+    becomes '2XL' and one-size spellings become 'F'.
+    """
+    raw = raw.where(~_empty(raw), None)
+    return _on_uniques(raw, _normalize_size_uniques)
+
+
+def _normalize_color_uniques(raw: pd.Series) -> pd.Series:
+    stripped = raw.str.strip()
+    s = stripped.where(~stripped.str.contains(",", regex=False), _first_part(stripped, FIRST_COMMA_PART_RE))
+    s = s.str.split("/", n=1).str[0].str.strip().where(s.str.contains("/", regex=False), s)
+
+    has_letter = s.str.contains(LETTER_RE)
+    no_letter = s.str.fullmatch(NO_LETTER_RE) | s.str.contains(DIGIT_RE)
+    out = s.where(has_letter | ~no_letter, None)
+    out[stripped == ""] = None
+    return out
+
+
+def normalize_color_series(raw: pd.Series) -> pd.Series:
+    """Vectorized ``normalize_color``: cleaned color or None for numeric codes."""
+    raw = raw.where(~_empty(raw), None)
+    return _on_uniques(raw, _normalize_color_uniques)
+
+
+def _normalize_channel_uniques(raw: pd.Series) -> pd.Series:
+    s = raw.str.strip()
+    first = s.str.replace("/", " - ", regex=False).str.extract(FIRST_DASH_PART_RE, expand=False).str.strip()
+    candidate = first.where(first != "", s)
+    tokens = candidate.str.split().explode()
+    tokens = tokens[tokens.notna()]
+    tokens = tokens[~tokens.str.upper().isin(CHANNEL_NOISE_TOKENS)]
+    joined = tokens.groupby(level=0).agg(" ".join)
+    out = joined.reindex(s.index).astype(object).where(lambda x: x.notna(), "unknown")
+    out[s == ""] = "unknown"
+    return out
+
+
+def normalize_channel_series(raw: pd.Series) -> pd.Series:
+    """Vectorized ``normalize_channel``: marketplace name or 'unknown'."""
+    return _on_uniques(raw, _normalize_channel_uniques, na_value="unknown")
+
+
+def _parse_date(raw) -> Optional[datetime.date]:
+    if isinstance(raw, datetime):
+        return raw.date()
+    try:
+        parsed = pd.to_datetime(raw, errors="coerce")
+        if pd.isna(parsed):
+            return None
+        return parsed.date()
+    except Exception:
+        return None
+
+
+def parse_date_series(raw: pd.Series) -> pd.Series:
+    """Vectorized ``parse_date``: ``datetime.date`` or None.
+
+    Each distinct value is parsed on its own, exactly like the per-row
+    helper, so ambiguous strings such as '1/8/2025' resolve the same way.
+    ``pd.to_datetime`` on the whole column would infer one format from the
+    first value instead.
+    """
+    codes, uniques = pd.factorize(raw.astype(object), use_na_sentinel=True)
+    table = np.array([_parse_date(u) for u in uniques] + [None], dtype=object)
+    return pd.Series(table.take(codes), index=raw.index, dtype=object)
+
+
+def _to_int(v) -> int:
+    try:
+        return int(float(v))
+    except Exception:
+        return 0
+
+
+def parse_quantity_series(raw: pd.Series) -> pd.Series:
+    """``int(float(v))`` per cell with 0 for missing or unparsable values."""
+    if pd.api.types.is_numeric_dtype(raw.dtype) and not pd.api.types.is_bool_dtype(raw.dtype):
+        values = raw.to_numpy(dtype=float, na_value=np.nan)
+        ok = np.isfinite(values) & (np.abs(values) < 2 ** 63)
+        out = np.zeros(len(values), dtype=np.int64)
+        out[ok] = np.trunc(values[ok]).astype(np.int64)
+        return pd.Series(out, index=raw.index)
+    codes, uniques = pd.factorize(raw.astype(object), use_na_sentinel=True)
+    mapped = np.array([_to_int(u) for u in uniques] + [0], dtype=np.int64)
+    return pd.Series(mapped.take(codes), index=raw.index)
+
+
+def parse_sku_columns(sku: pd.Series) -> pd.DataFrame:
+    """Split stripped, non-empty SKUs into prefix/design_code/pattern/color/size.
+
+    Mirrors the SKU handling of ``parse_product_row``: the size is the last
+    dash segment, the color is the segment before it, and a non-numeric
+    segment before the color is the pattern.
+    """
+    sku = sku.reset_index(drop=True)
+    n = len(sku)
+
+    last = sku.str.rsplit("-", n=1).str[-1].str.strip()
+    size = normalize_size_series(last.where(last != "", None))
+
+    tokens = sku.str.split("-").explode().str.strip()
+    tokens = tokens[tokens != ""]
+    pos = tokens.groupby(level=0).cumcount().to_numpy()
+    count = tokens.groupby(level=0).size().reindex(range(n), fill_value=0).to_numpy()
+    owner = tokens.index.to_numpy()
+    base_len = np.where(count >= 2, count - 1, count)
+
+    def part_at(wanted: np.ndarray) -> pd.Series:
+        # ``wanted`` is the per-SKU token position to pick, -1 for none
+        hit = pos == wanted[owner]
+        picked = pd.Series(tokens.to_numpy()[hit], index=owner[hit], dtype=object)
+        return picked.reindex(range(n)).astype(object).where(lambda x: x.notna(), None)
+
+    none = np.full(n, -1)
+    prefix = part_at(np.where(count > 0, 0, -1))
+    design = part_at(np.where(count > 1, 1, -1))
+    last_base = part_at(np.where(base_len > 0, base_len - 1, none))
+    candidate = part_at(np.where(base_len >= 3, base_len - 2, none))
+
+    color = last_base.where(last_base.ne(size) | size.isna(), None)
+    color = normalize_color_series(color)
+
+    pattern = candidate.where(candidate.notna() & ~candidate.fillna("").str.isdigit(), None)
+    # guard: pattern equal to the color, or color equal to the size, is dropped
+    pattern = pattern.where(~pattern.eq(color), None)
+    color = color.where(~color.eq(size), None)
+    return pd.DataFrame({
+        "prefix": prefix,
+        "design_code": design,
+        "pattern": pattern,
+        "color": color,
+        "size": size,
+    })
+
+
+def normalize_product_frame(df: pd.DataFrame, cols: dict):
+    """Derive the product columns for a stock sheet.
+
+    Returns ``(frame, skipped)`` where ``frame`` has one row per row with a
+    SKU and the columns sku, name, main_cat, sub_name, stock_level, size,
+    prefix, design_code, pattern and color.
+    """
+    sku = _stripped_text(df[cols["sku"]])
+    keep = (sku.notna() & (sku != "")).to_numpy()
+    df = df.loc[keep]
+    sku = sku[keep].reset_index(drop=True)
+
+    name = _stripped_text(df[cols["name"]]).reset_index(drop=True).fillna("")
+    raw_cat = _stripped_text(df[cols["category"]]).reset_index(drop=True).fillna("")
+    if cols.get("subcategory"):
+        sub = _stripped_text(df[cols["subcategory"]]).reset_index(drop=True)
+        sub = sub.where(sub.notna() & (sub != ""), None)
+    else:
+        sub = pd.Series([None] * len(sku), dtype=object)
+
+    # Special-case: some category fields contain combined 'แถม คริสต์มาส' => main 'แถม', sub 'คริสต์มาส'
+    cat_parts = raw_cat.str.split()
+    split_gift = (raw_cat.str.startswith("แถม") & sub.isna() & (cat_parts.str.len() > 1)).to_numpy()
+    main_cat = raw_cat.where(~split_gift, cat_parts.str[0])
+    sub = sub.where(~split_gift, cat_parts.str[1:].str.join(" "))
+
+    frame = pd.DataFrame({
+        "sku": sku,
+        "name": name,
+        "main_cat": main_cat,
+        "sub_name": sub.astype(object),
+        "stock_level": parse_quantity_series(df[cols["quantity"]]).reset_index(drop=True),
+    })
+    frame = pd.concat([frame, parse_sku_columns(sku)], axis=1)
+    return frame, int((~keep).sum())
+
+
+def normalize_sales_frame(df: pd.DataFrame, cols: dict, first_line: int = 0):
+    """Derive the sale columns for a sales sheet.
+
+    Returns ``(frame, skipped)`` where ``frame`` has the columns line, sku,
+    date, quantity and channel; ``line`` is ``first_line`` plus the row's
+    index label, so rows keep their sheet line after footer/empty rows are
+    dropped. Rows without SKU or date are skipped.
+    """
+    line = pd.Series(df.index.to_numpy() + first_line)
+    sku = _stripped_text(df[cols["sku"]]).reset_index(drop=True)
+    date = parse_date_series(df[cols["date"]]).reset_index(drop=True)
+    keep = (sku.notna() & (sku != "") & (sku != "nan") & date.notna()).to_numpy()
+
+    if cols.get("channel"):
+        channel = normalize_channel_series(df[cols["channel"]]).reset_index(drop=True)
+    else:
+        channel = pd.Series(["unknown"] * len(df), dtype=object)
+
+    frame = pd.DataFrame({
+        "line": line,
+        "sku": sku,
+        "date": date,
+        "quantity": parse_quantity_series(df[cols["quantity"]]).reset_index(drop=True),
+        "channel": channel,
+    })
+    frame = frame.loc[keep].reset_index(drop=True)
+    return frame, int((~keep).sum())
+
+
+def frame_records(frame: pd.DataFrame):
+    """``frame`` as a list of dicts with None for missing values."""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict("records")
@@ -0,0 +1,152 @@
+"""Parse uploads in worker processes so the event loop only does DB writes.
+
+Reading a sheet and normalizing its columns is CPU-bound pandas/openpyxl
+work; run inside an ``async def`` importer it stalls every other request of
+the uvicorn worker for the length of the file. ``parse_chunks`` instead runs
+``iter_frames`` + column detection + normalization in a
+``ProcessPoolExecutor`` and streams each normalized chunk back as a dict of
+column arrays over a bounded queue, so at most ``PARSE_QUEUE_CHUNKS`` chunks
+are ever waiting in memory.
+
+The pool size comes from ``IMPORT_PARSE_WORKERS`` (default 2); 0 turns the
+pool off and parses inline on the event loop, as the importers used to.
+"""
+import asyncio
+import multiprocessing
+import os
+import queue as queue_errors
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Callable, Dict, NamedTuple, Optional
+
+import pandas as pd
+
+from .normalize import frame_records
+from .readers import READ_CHUNK_ROWS, iter_frames
+
+PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", "2"))
+# Parsed chunks buffered between a worker and the importer.
+PARSE_QUEUE_CHUNKS = 2
+# How often a blocked worker checks whether the importer has gone away, and
+# the importer whether the worker is still alive.
+POLL_SECONDS = 0.5
+
+_pool: Optional[ProcessPoolExecutor] = None
+_manager = None
+_lock = threading.Lock()
+
+
+class ParsedChunk(NamedTuple):
+    rows: int  # sheet rows in the chunk after footer/blank-row cleaning
+    skipped: int  # rows the normalizer dropped
+    columns: Dict[str, object]  # normalized column -> numpy array
+
+    def records(self):
+        return frame_records(pd.DataFrame(self.columns))
+
+
+class _Failed(NamedTuple):
+    error: BaseException
+
+
+_DONE = None
+
+
+def _get_pool():
+    """The shared pool and manager, started on first use.
+
+    Workers are spawned rather than forked: the API process holds an event
+    loop and open database connections that must not be copied.
+    """
+    global _pool, _manager
+    with _lock:
+        if _pool is None:
+            ctx = multiprocessing.get_context("spawn")
+            _manager = ctx.Manager()
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=ctx)
+        return _pool, _manager
+
+
+def _parse(path: str, detect: Callable, normalize: Callable, header_row: int, chunk_size: int):
+    cols = None
+    for df in iter_frames(path, header_row=header_row, chunk_size=chunk_size):
+        if cols is None:
+            cols = detect(df)
+        frame, skipped = normalize(df, cols)
+        yield ParsedChunk(len(df), skipped, {c: frame[c].to_numpy() for c in frame.columns})
+
+
+def _put(out, stop, item) -> bool:
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=POLL_SECONDS)
+            return True
+        except queue_errors.Full:
+            continue
+    return False
+
+
+def _parse_worker(path, detect, normalize, header_row, chunk_size, out, stop) -> None:
+    """Pool task: push ParsedChunks, then ``_DONE`` or the exception, to ``out``."""
+    try:
+        for chunk in _parse(path, detect, normalize, header_row, chunk_size):
+            if not _put(out, stop, chunk):
+                return
+        _put(out, stop, _DONE)
+    except Exception as e:
+        _put(out, stop, _Failed(e))
+
+
+def _take(out, future):
+    """Next item from a worker; a crashed worker surfaces as its exception."""
+    while True:
+        try:
+            return out.get(timeout=POLL_SECONDS)
+        except queue_errors.Empty:
+            if future.done():
+                future.result()
+                # the worker has finished, so anything it put is already queued
+                try:
+                    return out.get_nowait()
+                except queue_errors.Empty:
+                    return _DONE
+
+
+async def parse_chunks(
+    path: str,
+    detect: Callable[[pd.DataFrame], dict],
+    normalize: Callable[[pd.DataFrame, dict], tuple],
+    header_row: int = 1,
+    chunk_size: int = READ_CHUNK_ROWS,
+    inline: Optional[bool] = None,
+) -> AsyncIterator[ParsedChunk]:
+    """Yield the normalized chunks of an upload, parsed off the event loop.
+
+    ``detect(df)`` maps the first chunk's columns (raising on a bad file) and
+    ``normalize(df, cols)`` returns ``(frame, skipped)``; both must be
+    picklable module-level functions or partials of them. Errors raised in
+    the worker are re-raised here. ``inline`` forces (True) or skips (False)
+    parsing on the calling thread; by default it follows the pool size.
+    """
+    if inline if inline is not None else PARSE_WORKERS <= 0:
+        for chunk in _parse(path, detect, normalize, header_row, chunk_size):
+            yield chunk
+        return
+
+    pool, manager = _get_pool()
+    loop = asyncio.get_running_loop()
+    out = manager.Queue(maxsize=PARSE_QUEUE_CHUNKS)
+    stop = manager.Event()
+    future = pool.submit(_parse_worker, path, detect, normalize, header_row, chunk_size, out, stop)
+    try:
+        while True:
+            item = await loop.run_in_executor(None, _take, out, future)
+            if item is _DONE:
+                break
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        # lets a worker blocked on a full queue give up if we stopped early
+        stop.set()
+        await asyncio.wait([asyncio.wrap_future(future)])
@@ -0,0 +1,41 @@
+import time
+from typing import Optional
+
+
+class ImportProgress:
+    """Live counters of a running import, read by the job status endpoint.
+
+    The importer calls ``start`` with an estimate of the rows in the file and
+    ``update`` after every chunk with the rows read so far and its running
+    report; ``snapshot`` turns that into throughput and an ETA.
+    """
+
+    def __init__(self):
+        self.total_rows: Optional[int] = None
+        self.rows_read = 0
+        self.counts = {}
+        self._started: Optional[float] = None
+
+    def start(self, total_rows: Optional[int] = None) -> None:
+        self.total_rows = total_rows
+        self._started = time.monotonic()
+
+    def update(self, rows_read: int, report: dict) -> None:
+        self.rows_read = rows_read
+        # only the integer counters; lists such as bad_rows stay in the report
+        self.counts = {k: v for k, v in report.items() if isinstance(v, int) and not isinstance(v, bool)}
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        rate = self.rows_read / elapsed if elapsed > 0 and self.rows_read else None
+        eta = None
+        if rate and self.total_rows:
+            eta = max(self.total_rows - self.rows_read, 0) / rate
+        return {
+            "rows_total": self.total_rows,
+            "rows_read": self.rows_read,
+            **self.counts,
+            "elapsed_seconds": round(elapsed, 1),
+            "rows_per_second": round(rate, 1) if rate else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
@@ -0,0 +1,287 @@
+"""Sheet reading helpers shared by the importers."""
+import codecs
+import csv
+import hashlib
+import os
+import re
+import zipfile
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# Export trailer written below the data, e.g. 'Exported by | someone@...'
+# followed by 'Date Time | 25/9/2025 09:25+07:00'.
+FOOTER_RE = re.compile(r"Exported by|Date Time", re.IGNORECASE)
+# Rows examined per step while walking up from the bottom of the sheet.
+FOOTER_SCAN_BLOCK = 64
+STRING_KINDS = {"string", "mixed", "mixed-integer"}
+# Data rows per frame yielded by the streaming readers.
+READ_CHUNK_ROWS = 5000
+# Bytes / lines sampled from a CSV to guess its encoding, delimiter and header.
+CSV_SNIFF_BYTES = 64 * 1024
+CSV_HEADER_SCAN_LINES = 20
+# A cell containing one of these marks the header row (the SKU column every
+# export has); without a hit the widest of the first lines is used.
+HEADER_HINTS = ("รหัสสินค้า", "รหัส")
+# Used range written near the top of a worksheet part, e.g. <dimension ref="A1:H36305"/>
+DIMENSION_RE = re.compile(rb'<dimension ref="[A-Z]+\d+:[A-Z]+(\d+)"')
+# Block size used when hashing uploads.
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def _text_columns(df: pd.DataFrame):
+    """Positions of the columns that hold at least one string."""
+    cols = []
+    for j in range(df.shape[1]):
+        col = df.iloc[:, j]
+        if col.dtype == object and pd.api.types.infer_dtype(col, skipna=True) in STRING_KINDS:
+            cols.append(j)
+    return cols
+
+
+def _str_mask(col: pd.Series, op) -> np.ndarray:
+    """Evaluate a ``.str`` predicate; slices without any string are all False."""
+    try:
+        return op(col.str).to_numpy(dtype=bool, na_value=False)
+    except AttributeError:
+        return np.zeros(len(col), dtype=bool)
+
+
+def _blank_rows(df: pd.DataFrame, text_cols) -> np.ndarray:
+    """Rows whose cells are all NaN or whitespace-only strings.
+
+    Text cells are only stripped for rows that are still blank candidates,
+    so a data row is ruled out by its first filled cell.
+    """
+    isna = df.isna().to_numpy()
+    text = set(text_cols)
+    blank = np.ones(len(df), dtype=bool)
+    for j in range(df.shape[1]):
+        if j not in text:
+            blank &= isna[:, j]
+    for j in text_cols:
+        rows = np.flatnonzero(blank & ~isna[:, j])
+        if len(rows):
+            blank[rows[~_str_mask(df.iloc[rows, j], lambda s: s.strip().eq(""))]] = False
+    return blank
+
+
+def _footer_rows(df: pd.DataFrame, text_cols) -> np.ndarray:
+    """Rows with a footer marker in any text cell."""
+    hit = np.zeros(len(df), dtype=bool)
+    for j in text_cols:
+        hit |= _str_mask(df.iloc[:, j], lambda s: s.contains(FOOTER_RE, na=False))
+    return hit
+
+
+def _data_end(df: pd.DataFrame, text_cols) -> int:
+    """Length of the sheet without its trailing footer/blank block.
+
+    Walks up from the last row in small blocks and stops at the first row
+    that is neither blank nor a footer line, so only the trailer is scanned.
+    """
+    end = len(df)
+    while end > 0:
+        start = max(0, end - FOOTER_SCAN_BLOCK)
+        block = df.iloc[start:end]
+        trailer = _blank_rows(block, text_cols) | _footer_rows(block, text_cols)
+        if not trailer.all():
+            # index of the last data row inside the block, plus one
+            return start + int(np.flatnonzero(~trailer)[-1]) + 1
+        end = start
+    return 0
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Strip column names and drop the export footer and fully empty rows.
+
+    The footer ('Exported by' / 'Date Time' lines) only ever trails the data,
+    so it is located by scanning up from the bottom instead of testing every
+    row; empty rows are found with one columnar mask. The index is left
+    untouched so row labels still map to sheet lines.
+    """
+    df = df.rename(columns={c: c.strip() for c in df.columns if isinstance(c, str)})
+    text_cols = _text_columns(df)
+    df = df.iloc[:_data_end(df, text_cols)]
+    if len(df):
+        df = df.loc[~_blank_rows(df, text_cols)]
+    return df
+
+
+def _column_names(header) -> list:
+    """Header cells as column names, the way ``pd.read_excel`` labels them."""
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or value == "" else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _frame(rows, columns, start: int) -> pd.DataFrame:
+    width = len(columns)
+    rows = [r[:width] if len(r) >= width else r + (None,) * (width - len(r)) for r in rows]
+    df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    df.index = pd.RangeIndex(start, start + len(df))
+    # openpyxl reports blank cells as None; match read_excel's NaN in numeric columns
+    return clean_frame(df.replace("", np.nan))
+
+
+def iter_excel_frames(path: str, header_row: int = 1, chunk_size: int = READ_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Stream the first sheet of a workbook as cleaned DataFrames of ``chunk_size`` rows.
+
+    Uses openpyxl's read-only mode, so only one chunk of cell values is held
+    in memory regardless of file size. ``header_row`` is the 0-based row with
+    the column names (the exports put a title row above it). Each frame is
+    passed through ``clean_frame`` and indexed by 0-based sheet row, so a
+    label plus one is the line number a user sees. Text cells keep their
+    text (``read_excel`` would turn all-digit columns into numbers). At least
+    one (possibly empty) frame is yielded so callers can always inspect
+    columns.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(islice(rows, header_row, None), None)
+        if header is None:
+            raise ValueError("No valid data found in the uploaded file")
+        columns = _column_names(header)
+        start = header_row + 1
+        yielded = False
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch and yielded:
+                break
+            yield _frame(batch, columns, start)
+            yielded = True
+            start += len(batch)
+            if len(batch) < chunk_size:
+                break
+    finally:
+        wb.close()
+
+
+def detect_encoding(path: str) -> str:
+    """Guess a CSV's encoding: UTF-8 (with or without BOM), else Thai cp874.
+
+    cp874 is the Windows superset of TIS-620 that Thai Excel installs use
+    for "CSV" exports, so it also decodes plain TIS-620 files.
+    """
+    with open(path, "rb") as f:
+        sample = f.read(CSV_SNIFF_BYTES)
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # incremental decode: a multi-byte char cut by the sample end is fine
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp874"
+
+
+def _header_line(lines, hints) -> int:
+    rows = list(csv.reader(lines))
+    for i, row in enumerate(rows):
+        if any(h in cell for cell in row for h in hints):
+            return i
+    widths = [sum(1 for cell in row if cell.strip()) for row in rows]
+    return widths.index(max(widths)) if widths else 0
+
+
+def sniff_csv(path: str, hints=HEADER_HINTS):
+    """Return ``(encoding, delimiter, header_line)`` for a CSV export."""
+    encoding = detect_encoding(path)
+    with open(path, encoding=encoding, errors="replace", newline="") as f:
+        lines = list(islice(f, CSV_HEADER_SCAN_LINES))
+    try:
+        delimiter = csv.Sniffer().sniff("".join(lines), delimiters=",;\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    if delimiter != ",":
+        lines = [line.replace(delimiter, ",") for line in lines]
+    return encoding, delimiter, _header_line(lines, hints)
+
+
+def iter_csv_frames(path: str, chunk_size: int = READ_CHUNK_ROWS, hints=HEADER_HINTS) -> Iterator[pd.DataFrame]:
+    """Stream a CSV export as cleaned DataFrames, like ``iter_excel_frames``.
+
+    Encoding, delimiter and the header line (title rows above it are
+    skipped) are sniffed from the start of the file; the rows are then parsed
+    by pandas' C engine ``chunk_size`` at a time. Every cell is read as text
+    with only empty cells missing, which is what the normalizers expect from
+    a sheet, and frames are indexed by 0-based file row.
+    """
+    encoding, delimiter, header_line = sniff_csv(path, hints)
+    reader = pd.read_csv(
+        path,
+        encoding=encoding,
+        sep=delimiter,
+        skiprows=header_line,
+        header=0,
+        dtype=str,
+        keep_default_na=False,
+        na_values=[""],
+        skip_blank_lines=False,
+        chunksize=chunk_size,
+        engine="c",
+    )
+    yielded = False
+    with reader:
+        for chunk in reader:
+            chunk.index = chunk.index + header_line + 1
+            yield clean_frame(chunk)
+            yielded = True
+    if not yielded:
+        columns = pd.read_csv(path, encoding=encoding, sep=delimiter, skiprows=header_line, nrows=0).columns
+        yield clean_frame(pd.DataFrame(columns=columns))
+
+
+def iter_frames(path: str, header_row: int = 1, chunk_size: int = READ_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Stream an upload by extension: CSV via ``iter_csv_frames``, else Excel.
+
+    ``header_row`` applies to workbooks; CSV headers are detected.
+    """
+    if Path(path).suffix.lower() == ".csv":
+        return iter_csv_frames(path, chunk_size=chunk_size)
+    return iter_excel_frames(path, header_row=header_row, chunk_size=chunk_size)
+
+
+def estimate_rows(path: str, header_row: int = 1) -> Optional[int]:
+    """Cheap guess at the number of data rows in an upload, for progress ETAs.
+
+    Workbooks report their used range in the first sheet's ``<dimension>``
+    tag; CSVs are sized from the average line length of the first block.
+    Returns None when no estimate is available.
+    """
+    try:
+        if Path(path).suffix.lower() == ".csv":
+            size = os.path.getsize(path)
+            with open(path, "rb") as f:
+                sample = f.read(CSV_SNIFF_BYTES)
+            lines = sample.count(b"\n")
+            if not lines:
+                return None
+            return int(size / (len(sample) / lines))
+        with zipfile.ZipFile(path) as zf, zf.open("xl/worksheets/sheet1.xml") as sheet:
+            match = DIMENSION_RE.search(sheet.read(4096))
+        return max(int(match.group(1)) - header_row - 1, 0) if match else None
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def file_sha256(path: str) -> str:
+    """Hex sha256 of a file's bytes, read in blocks; identifies an upload."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,127 @@
+from bisect import bisect_left, insort
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from ..models import Product
+
+
+class SkuResolver:
+    """Resolve sales SKUs to catalog SKUs without touching the database.
+
+    Built once per import from every product SKU. Lookups follow the rules
+    the sales importer has always used:
+
+    1. Exact SKU.
+    2. Catalog SKUs starting with the sales SKU (e.g. 'SC-0020-SS-PI-FF'
+       -> 'SC-0020-SS-PI-FF/CL'): a single candidate wins, otherwise the
+       \\CL, /CL, -CL variants in that order, otherwise the shortest.
+    3. Catalog SKUs whose parts (split on '-', '/' and '\\') start with all
+       dash-separated parts of the sales SKU; the shortest wins.
+
+    Prefix lookups use bisect over the sorted SKUs plus a sparse table for
+    the shortest SKU in a range; rule 3 walks a token trie whose nodes keep
+    the shortest SKU below them. Ties on length go to the lexicographically
+    smallest SKU. Results are cached per sales SKU.
+    """
+
+    PRIORITY_SUFFIXES = ("\\CL", "/CL", "-CL")
+
+    def __init__(self, skus: Iterable[str]):
+        self._skus = sorted(set(skus))
+        self._known = set(self._skus)
+        self._sparse = None
+        self._trie = [{}, None]
+        for sku in self._skus:
+            self._trie_insert(sku)
+        self._cache = {}
+
+    @classmethod
+    async def from_session(cls, session) -> "SkuResolver":
+        res = await session.execute(select(Product.sku))
+        return cls(res.scalars().all())
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self._known
+
+    def __len__(self) -> int:
+        return len(self._skus)
+
+    def add(self, sku: str) -> None:
+        """Register a SKU created during the import (e.g. an auto-created product)."""
+        if sku in self._known:
+            return
+        self._known.add(sku)
+        insort(self._skus, sku)
+        self._trie_insert(sku)
+        self._sparse = None
+        # a new SKU can change the best candidate for anything already cached
+        self._cache.clear()
+
+    def resolve(self, sku: str) -> Optional[str]:
+        if sku in self._known:
+            return sku
+        if sku in self._cache:
+            return self._cache[sku]
+        match = self._match_prefix(sku)
+        if match is None:
+            match = self._match_parts(sku)
+        self._cache[sku] = match
+        return match
+
+    # -- rule 2: plain prefix ------------------------------------------------
+
+    def _match_prefix(self, sku: str) -> Optional[str]:
+        lo = bisect_left(self._skus, sku)
+        hi = bisect_left(self._skus, sku + "\U0010ffff", lo)
+        if hi - lo == 0:
+            return None
+        if hi - lo == 1:
+            return self._skus[lo]
+        for suffix in self.PRIORITY_SUFFIXES:
+            if sku + suffix in self._known:
+                return sku + suffix
+        return self._skus[self._shortest_in_range(lo, hi)]
+
+    def _build_sparse(self):
+        n = len(self._skus)
+        lengths = np.fromiter((len(s) for s in self._skus), dtype=np.int64, count=n)
+        # encode (length, index) in one int so np.minimum picks shortest, then first
+        table = [lengths * n + np.arange(n, dtype=np.int64)]
+        span = 1
+        while span * 2 <= n:
+            prev = table[-1]
+            table.append(np.minimum(prev[:-span], prev[span:]))
+            span *= 2
+        self._sparse = table
+
+    def _shortest_in_range(self, lo: int, hi: int) -> int:
+        if self._sparse is None:
+            self._build_sparse()
+        level = (hi - lo).bit_length() - 1
+        row = self._sparse[level]
+        best = min(row[lo], row[hi - (1 << level)])
+        return int(best % len(self._skus))
+
+    # -- rule 3: leading parts -----------------------------------------------
+
+    @staticmethod
+    def _parts(sku: str):
+        return sku.replace("\\", "-").replace("/", "-").split("-")
+
+    def _trie_insert(self, sku: str) -> None:
+        key = (len(sku), sku)
+        node = self._trie
+        for part in self._parts(sku):
+            node = node[0].setdefault(part, [{}, None])
+            if node[1] is None or key < node[1]:
+                node[1] = key
+
+    def _match_parts(self, sku: str) -> Optional[str]:
+        node = self._trie
+        for part in sku.split("-"):
+            node = node[0].get(part)
+            if node is None:
+                return None
+        return node[1][1] if node[1] else None
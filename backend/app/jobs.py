@@ -0,0 +1,212 @@
+"""Background import jobs.
+
+Uploads are saved to a temporary file and handed to ``submit``, which
+records an ``ImportJob`` row and returns its id straight away. The import
+itself runs as an asyncio task, at most ``IMPORT_WORKERS`` at a time, so a
+burst of uploads cannot take every database connection. While a job runs
+its ``ImportProgress`` lives in memory; when it finishes the final counters
+and report are written to the job row.
+
+Jobs belong to the process that accepted the upload, and ``IMPORT_WORKERS``
+limits each API worker separately. Every ``IMPORT_HEARTBEAT_SECONDS`` a
+worker copies the progress of its jobs to their rows, so the status
+endpoint of any worker can report it, and stamps ``heartbeat_at``. A job
+whose owner has not beaten for ``IMPORT_STALE_SECONDS`` died with its
+process and is marked failed by whichever worker notices first.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import or_, select, update
+
+from .database import AsyncSessionLocal
+from .ingest.progress import ImportProgress
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_HEARTBEAT_SECONDS = float(os.getenv("IMPORT_HEARTBEAT_SECONDS", "5"))
+IMPORT_STALE_SECONDS = float(os.getenv("IMPORT_STALE_SECONDS", "60"))
+
+# this process, stored as ImportJob.owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_slots = asyncio.Semaphore(IMPORT_WORKERS)
+_live: Dict[str, ImportProgress] = {}
+# strong references so running tasks are not garbage collected
+_tasks = set()
+_heartbeat: Optional[asyncio.Task] = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def _update_job(job_id: str, **values) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(ImportJob).where(ImportJob.job_id == job_id).values(**values))
+        await session.commit()
+
+
+async def submit(
+    kind: str,
+    filename: Optional[str],
+    path: str,
+    run: Callable[[str, ImportProgress], Awaitable[dict]],
+    summarize: Callable[[dict], dict],
+    explain: Callable[[Exception], str],
+    options: Optional[dict] = None,
+) -> str:
+    """Queue an import of ``path`` and return the job id.
+
+    ``run(path, progress)`` performs the import and returns its report;
+    ``summarize`` turns the report into the stored response body (which must
+    contain ``message``) and ``explain`` turns an exception into the error
+    shown to the user. The temporary file is removed when the job ends.
+    """
+    job_id = uuid.uuid4().hex
+    async with AsyncSessionLocal() as session:
+        now = _now()
+        session.add(ImportJob(
+            job_id=job_id, kind=kind, filename=filename, status="queued", options=options,
+            created_at=now, owner=WORKER_ID, heartbeat_at=now,
+        ))
+        await session.commit()
+
+    progress = ImportProgress()
+    _live[job_id] = progress
+    # a fresh context, so the job's queries are not charged to the upload request in app.metrics
+    task = contextvars.Context().run(asyncio.create_task, _run(job_id, path, run, progress, summarize, explain))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    logger.info(f"Queued {kind} import job {job_id} for {filename}")
+    return job_id
+
+
+async def _run(job_id, path, run, progress, summarize, explain) -> None:
+    try:
+        async with _slots:
+            await _update_job(job_id, status="running", started_at=_now(), heartbeat_at=_now())
+            try:
+                result = summarize(await run(path, progress))
+            except Exception as e:
+                logger.error(f"Import job {job_id} failed: {str(e)}")
+                await _update_job(job_id, status="failed", error=explain(e), progress=progress.snapshot(), finished_at=_now())
+            else:
+                logger.info(f"Import job {job_id} finished: {result['message']}")
+                await _update_job(
+                    job_id,
+                    status="succeeded",
+                    message=result["message"],
+                    report=result,
+                    progress=progress.snapshot(),
+                    finished_at=_now(),
+                )
+    except Exception:
+        logger.exception(f"Could not record the outcome of import job {job_id}")
+    finally:
+        _live.pop(job_id, None)
+        try:
+            Path(path).unlink()
+        except Exception:
+            pass
+
+
+def _job_dict(job: ImportJob) -> dict:
+    live = _live.get(job.job_id)
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "filename": job.filename,
+        "status": job.status,
+        "options": job.options or {},
+        "message": job.message,
+        "error": job.error,
+        "progress": live.snapshot() if live is not None else job.progress,
+        "report": job.report,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+async def get_job(session, job_id: str) -> Optional[dict]:
+    job = await session.get(ImportJob, job_id)
+    return _job_dict(job) if job is not None else None
+
+
+async def list_jobs(session, kind: Optional[str] = None, limit: int = 50) -> list:
+    query = select(ImportJob).order_by(ImportJob.created_at.desc()).limit(limit)
+    if kind:
+        query = query.where(ImportJob.kind == kind)
+    result = await session.execute(query)
+    return [_job_dict(job) for job in result.scalars().all()]
+
+
+async def fail_stale_jobs() -> int:
+    """Mark queued/running jobs whose owner stopped beating as failed; return how many."""
+    cutoff = _now() - timedelta(seconds=IMPORT_STALE_SECONDS)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(ImportJob)
+            .where(
+                ImportJob.status.in_(["queued", "running"]),
+                or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < cutoff),
+                ImportJob.job_id.not_in(list(_live)),
+            )
+            .values(status="failed", error="The server stopped before this import finished", finished_at=_now())
+        )
+        await session.commit()
+    if result.rowcount:
+        logger.warning(f"Marked {result.rowcount} interrupted import job(s) as failed")
+    return result.rowcount
+
+
+async def beat() -> None:
+    """Store the progress of this process's jobs and fail those of dead processes."""
+    if _live:
+        async with AsyncSessionLocal() as session:
+            now = _now()
+            for job_id, progress in list(_live.items()):
+                await session.execute(
+                    update(ImportJob)
+                    .where(ImportJob.job_id == job_id, ImportJob.status.in_(["queued", "running"]))
+                    .values(progress=progress.snapshot(), heartbeat_at=now)
+                )
+            await session.commit()
+    await fail_stale_jobs()
+
+
+async def _beat_forever() -> None:
+    while True:
+        await asyncio.sleep(IMPORT_HEARTBEAT_SECONDS)
+        try:
+            await beat()
+        except Exception:
+            logger.exception("Import job heartbeat failed")
+
+
+def start_heartbeat() -> None:
+    global _heartbeat
+    if _heartbeat is None or _heartbeat.done():
+        # a fresh context, so its queries count as background work in app.metrics
+        _heartbeat = contextvars.Context().run(asyncio.create_task, _beat_forever())
+
+
+async def stop_heartbeat() -> None:
+    global _heartbeat
+    if _heartbeat is not None:
+        _heartbeat.cancel()
+        try:
+            await _heartbeat
+        except asyncio.CancelledError:
+            pass
+        _heartbeat = None
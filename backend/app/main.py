@@ -1,16 +1,19 @@
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Response
 import sys
 from pathlib import Path
 import logging
-import time
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1].parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from .database import create_db_and_tables
-from .routers import categories, products, sales
+from . import metrics
+from .compression import CompressionMiddleware
+from . import jobs
+from .migrations import migrate
+from .rollup import backfill_sales_daily
+from .routers import analytics, categories, export, imports, products, restock, sales
 from fastapi.middleware.cors import CORSMiddleware
 
 # Setup logging
@@ -31,20 +34,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    logger.info(f"Incoming request: {request.method} {request.url}")
-    
-    if request.method == "POST" and "upload" in str(request.url):
-        logger.info(f"Upload request detected - Headers: {dict(request.headers)}")
-    
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(f"Request completed: {request.method} {request.url} - Status: {response.status_code} - Time: {process_time:.4f}s")
-    return response
-
 # Development CORS settings: allow frontend dev servers to call the API.
 app.add_middleware(
     CORSMiddleware,
@@ -54,16 +43,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON bodies over 1 KB for clients that accept gzip; streamed
+# responses are compressed chunk by chunk as they are sent. Parquet/Arrow
+# exports are zstd-compressed already and pass through untouched.
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Outermost, so timings include compression; slow requests and queries
+# are logged by app.metrics instead of every request
+metrics.install()
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 @app.on_event("startup")
 async def on_startup():
-    await create_db_and_tables()
+    await migrate()
+    await jobs.fail_stale_jobs()
+    jobs.start_heartbeat()
+    await backfill_sales_daily()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await jobs.stop_heartbeat()
 
 
 # include routers
 app.include_router(categories.router)
 app.include_router(products.router)
 app.include_router(sales.router)
+app.include_router(imports.router)
+app.include_router(analytics.router)
+app.include_router(restock.router)
+app.include_router(export.router)
 
 @app.get("/")
 async def root():
@@ -74,3 +85,8 @@ async def root():
 async def health():
     logger.info("Health check endpoint accessed")
     return {"status": "healthy", "message": "API is running normally"}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request and database metrics in the Prometheus text format."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
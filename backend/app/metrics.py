@@ -0,0 +1,239 @@
+"""Request and database instrumentation, served at ``GET /metrics``.
+
+``MetricsMiddleware`` times each HTTP request until its last body byte is
+sent, so streamed responses count in full. SQLAlchemy cursor events (see
+``install``) time every statement and charge it to the request running it.
+Per route the middleware keeps histograms of latency, statement count and
+database time, which ``render`` writes in the Prometheus text format.
+It also logs:
+
+- requests slower than ``SLOW_REQUEST_MS``;
+- statements slower than ``SLOW_QUERY_MS``;
+- requests that run one statement ``N_PLUS_ONE_THRESHOLD`` times or more,
+  the mark of a query issued once per row of an earlier result.
+
+Statements outside any request (import jobs, startup) are counted as
+``background``. Metrics live in process memory, so with several workers
+each one reports its own.
+"""
+import contextvars
+import logging
+import os
+import time
+from collections import Counter as Tally
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+# SQL characters shown in a log line
+LOGGED_SQL_CHARS = 300
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra=()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    """Prometheus histogram; one series per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [observations per bucket..., sum, count]; cumulated when rendered
+        self._series = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', str(float(bound)))])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', '+Inf')])} {series[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}"
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte.",
+    ("method", "route", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Database statements run per request.",
+    ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in database statements per request.",
+    ("method", "route"),
+)
+N_PLUS_ONE = Counter(
+    "http_request_n_plus_one_total", "Requests that ran one statement N_PLUS_ONE_THRESHOLD times or more.",
+    ("method", "route"),
+)
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Duration of single database statements.", ("source",),
+)
+SLOW_QUERIES = Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.", ("source",),
+)
+METRICS = (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, N_PLUS_ONE, QUERY_LATENCY, SLOW_QUERIES)
+
+
+class RequestStats:
+    """Statements run by one request so far."""
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Tally()
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def _short(statement: str) -> str:
+    text = " ".join(statement.split())
+    return text if len(text) <= LOGGED_SQL_CHARS else text[:LOGGED_SQL_CHARS] + "..."
+
+
+def record_query(statement: str, seconds: float) -> None:
+    """Account one executed statement to the current request, if any."""
+    stats = _current.get()
+    source = "request" if stats is not None else "background"
+    QUERY_LATENCY.observe(seconds, source)
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+        stats.statements[statement] += 1
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(source)
+        logger.warning(f"Slow query ({seconds * 1000:.0f} ms, {source}): {_short(statement)}")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is not None:
+        record_query(statement, time.perf_counter() - start)
+
+
+def install() -> None:
+    """Time the statements of every engine; safe to call more than once.
+
+    Listens on the ``Engine`` class, so the engines the import scripts reach
+    through their own module path are covered too. COPY and other raw
+    driver calls bypass these events.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+    REQUEST_LATENCY.observe(seconds, method, route, str(status))
+    REQUEST_QUERIES.observe(stats.queries, method, route)
+    REQUEST_DB_TIME.observe(stats.db_seconds, method, route)
+    repeated = stats.statements.most_common(1)
+    if repeated and repeated[0][1] >= N_PLUS_ONE_THRESHOLD:
+        statement, times = repeated[0]
+        N_PLUS_ONE.inc(method, route)
+        logger.warning(f"Possible N+1 in {method} {route}: one statement ran {times} times: {_short(statement)}")
+    if seconds * 1000 >= SLOW_REQUEST_MS:
+        logger.warning(
+            f"Slow request {method} {route} -> {status} in {seconds:.3f}s "
+            f"({stats.queries} queries, {stats.db_seconds:.3f}s in the database)"
+        )
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding the request histograms.
+
+    Requests are labelled with their route template (``/products/{sku}``),
+    or ``unmatched`` when no route handled them, so label values stay few.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            # the router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            observe_request(scope["method"], route, status, elapsed, stats)
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    lines = [line for metric in METRICS for line in metric.render()]
+    return "\n".join(lines) + "\n"
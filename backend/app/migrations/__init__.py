@@ -0,0 +1,86 @@
+"""Versioned schema migrations, applied in place of ``create_all``.
+
+Each ``mNNNN_<name>.py`` module in this package defines
+``async def upgrade(conn)``; versions are applied in order and recorded in
+``schema_migrations``. ``migrate`` runs every pending version in a single
+transaction (Postgres DDL is transactional, so a failed migration leaves
+the schema untouched) while holding an advisory lock, so several API
+workers starting at once apply them only once.
+
+To change the schema, add the next numbered module and mirror the change in
+``app.models``; never edit a migration that has shipped.
+"""
+import importlib
+import logging
+import pkgutil
+import re
+from typing import List, NamedTuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+MODULE_RE = re.compile(r"^m(\d{4})_(\w+)$")
+# pg_advisory_xact_lock key shared by every process running migrations
+LOCK_KEY = 7_146_523_001
+
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    module: object
+
+
+def discover() -> List[Migration]:
+    """All migrations of this package, oldest first."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = MODULE_RE.match(info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            found.append(Migration(match.group(1), match.group(2), module))
+    return sorted(found, key=lambda m: m.version)
+
+
+async def applied_versions(conn) -> set:
+    result = await conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))
+    return set(result.scalars())
+
+
+async def apply_migrations(conn) -> List[str]:
+    """Apply pending migrations on ``conn``'s transaction; return their versions."""
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+        "version VARCHAR PRIMARY KEY, "
+        "name VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now())"
+    ))
+    applied = await applied_versions(conn)
+    done = []
+    for migration in discover():
+        if migration.version in applied:
+            continue
+        logger.info(f"Applying migration {migration.version}_{migration.name}")
+        await migration.module.upgrade(conn)
+        await conn.execute(
+            text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name) VALUES (:version, :name)"),
+            {"version": migration.version, "name": migration.name},
+        )
+        done.append(migration.version)
+    return done
+
+
+async def migrate(bind=None) -> List[str]:
+    """Bring the database up to date; ``bind`` defaults to the import engine."""
+    if bind is None:
+        from ..database import import_engine as bind
+    async with bind.begin() as conn:
+        return await apply_migrations(conn)
+
+
+async def execute_all(conn, statements) -> None:
+    """Run SQL statements one at a time (asyncpg rejects multi-statement strings)."""
+    for statement in statements:
+        await conn.execute(text(statement))
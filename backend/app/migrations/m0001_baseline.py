@@ -0,0 +1,70 @@
+"""Schema as ``create_all`` built it before migrations existed.
+
+Every statement is IF NOT EXISTS, so databases created by ``create_all``
+pass through unchanged and new ones get the same tables, constraint names
+and indexes.
+"""
+from . import execute_all
+
+STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS category (
+        category_id SERIAL NOT NULL,
+        name VARCHAR NOT NULL,
+        subcategory VARCHAR,
+        PRIMARY KEY (category_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_category_category_id ON category (category_id)",
+    """CREATE TABLE IF NOT EXISTS product (
+        sku VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        category_id INTEGER,
+        stock_level INTEGER,
+        size VARCHAR,
+        prefix VARCHAR,
+        design_code VARCHAR,
+        pattern VARCHAR,
+        color VARCHAR,
+        PRIMARY KEY (sku),
+        FOREIGN KEY (category_id) REFERENCES category (category_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_product_sku ON product (sku)",
+    """CREATE TABLE IF NOT EXISTS product_sale (
+        sale_id SERIAL NOT NULL,
+        channel VARCHAR NOT NULL,
+        date DATE NOT NULL,
+        sku VARCHAR NOT NULL,
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (sale_id),
+        FOREIGN KEY (sku) REFERENCES product (sku)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_product_sale_sale_id ON product_sale (sale_id)",
+    "CREATE INDEX IF NOT EXISTS ix_product_sale_date_sale_id ON product_sale (date, sale_id)",
+    """CREATE TABLE IF NOT EXISTS sales_daily (
+        sku VARCHAR NOT NULL,
+        channel VARCHAR NOT NULL,
+        date DATE NOT NULL,
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (sku, channel, date),
+        FOREIGN KEY (sku) REFERENCES product (sku) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_sales_daily_date ON sales_daily (date)",
+    """CREATE TABLE IF NOT EXISTS import_job (
+        job_id VARCHAR NOT NULL,
+        kind VARCHAR NOT NULL,
+        filename VARCHAR,
+        status VARCHAR NOT NULL,
+        options JSON,
+        message VARCHAR,
+        error VARCHAR,
+        progress JSON,
+        report JSON,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        started_at TIMESTAMP WITH TIME ZONE,
+        finished_at TIMESTAMP WITH TIME ZONE,
+        PRIMARY KEY (job_id)
+    )""",
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
@@ -0,0 +1,23 @@
+"""Indexes for the filters and lookups the API and importers run.
+
+- product_sale (sku, date): ``/sales/{sku}`` and the sku foreign key
+- product_sale (date, channel): date-range reports split by channel
+- product (sku text_pattern_ops): ``sku LIKE 'prefix%'`` under any collation
+- product category_id / size / color: ``GET /products/`` filters
+- category (name): category lookups by name in the importers
+"""
+from . import execute_all
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_product_sale_sku_date ON product_sale (sku, date)",
+    "CREATE INDEX IF NOT EXISTS ix_product_sale_date_channel ON product_sale (date, channel)",
+    "CREATE INDEX IF NOT EXISTS ix_product_sku_pattern ON product (sku text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_product_category_id ON product (category_id)",
+    "CREATE INDEX IF NOT EXISTS ix_product_size ON product (size)",
+    "CREATE INDEX IF NOT EXISTS ix_product_color ON product (color)",
+    "CREATE INDEX IF NOT EXISTS ix_category_name ON category (name)",
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
@@ -0,0 +1,39 @@
+"""Indexes for the paginated, searchable product listing.
+
+- product (name, sku): keyset pages sorted by name
+- trigram GIN indexes on product.sku and product.name for ``ILIKE '%q%'``
+  search, when the ``pg_trgm`` extension can be installed. Without it the
+  search still works, by scanning the table; SKU prefix lookups are served
+  by ``ix_product_sku_pattern`` either way.
+"""
+import logging
+
+from sqlalchemy import text
+
+from . import execute_all
+
+logger = logging.getLogger(__name__)
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_product_name_sku ON product (name, sku)",
+]
+
+TRIGRAM_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_product_sku_trgm ON product USING gin (sku gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_product_name_trgm ON product USING gin (name gin_trgm_ops)",
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
+    available = await conn.scalar(text("SELECT count(*) FROM pg_available_extensions WHERE name = 'pg_trgm'"))
+    if not available:
+        logger.warning("pg_trgm is not available; product search will not use trigram indexes")
+        return
+    # installing an extension can still be refused (permissions); keep the rest
+    try:
+        async with conn.begin_nested():
+            await execute_all(conn, TRIGRAM_STATEMENTS)
+    except Exception as e:
+        logger.warning(f"Could not create trigram indexes for product search: {e}")
@@ -0,0 +1,21 @@
+"""Idempotency keys of ``POST /sales/batch``.
+
+One row per key, written in the same transaction as the batch's sales, with
+a hash of the request and the response that was returned, so a retried
+webhook gets the original result instead of being recorded twice.
+"""
+from . import execute_all
+
+STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS sale_batch (
+        idempotency_key VARCHAR NOT NULL,
+        request_hash VARCHAR NOT NULL,
+        response JSON,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (idempotency_key)
+    )""",
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
@@ -0,0 +1,38 @@
+"""Idempotent sales imports.
+
+``import_file`` records the sha256 of every imported file, so the same
+export cannot be ingested twice. ``product_sale.occurrence`` numbers the
+identical (sku, date, channel, quantity) rows of an import, giving each
+imported sale a natural key; the partial unique index on it lets
+overlapping exports be merged with ``ON CONFLICT DO NOTHING``. Sales
+recorded through the API leave it NULL and are never matched.
+
+Existing rows are numbered in ``sale_id`` order, i.e. treated as imported.
+"""
+from . import execute_all
+
+STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS import_file (
+        sha256 VARCHAR(64) NOT NULL,
+        kind VARCHAR NOT NULL,
+        filename VARCHAR,
+        imported_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (sha256)
+    )""",
+    "ALTER TABLE product_sale ADD COLUMN IF NOT EXISTS occurrence INTEGER",
+    """UPDATE product_sale SET occurrence = numbered.n
+    FROM (
+        SELECT sale_id, row_number() OVER (
+            PARTITION BY sku, date, channel, quantity ORDER BY sale_id
+        ) AS n
+        FROM product_sale
+    ) AS numbered
+    WHERE product_sale.sale_id = numbered.sale_id AND product_sale.occurrence IS NULL""",
+    """CREATE UNIQUE INDEX IF NOT EXISTS ux_product_sale_natural_key
+    ON product_sale (sku, date, channel, quantity, occurrence)
+    WHERE occurrence IS NOT NULL""",
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
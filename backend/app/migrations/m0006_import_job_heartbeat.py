@@ -0,0 +1,19 @@
+"""Owner and heartbeat of import jobs.
+
+Jobs run inside the API process that accepted the upload. ``owner`` names
+that process and ``heartbeat_at`` is refreshed by it while the job is
+queued or running, so a restarting worker fails only the jobs whose owner
+stopped beating instead of every unfinished job, including those still
+running in its siblings. Rows from before this migration have no
+heartbeat and count as stale.
+"""
+from . import execute_all
+
+STATEMENTS = [
+    "ALTER TABLE import_job ADD COLUMN IF NOT EXISTS owner VARCHAR",
+    "ALTER TABLE import_job ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE",
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
@@ -1,12 +1,16 @@
 from datetime import date
 from typing import Optional
-from sqlalchemy import Column, Integer, String, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Index, JSON, func, text
 from sqlalchemy.orm import declarative_base, relationship
 
 
 Base = declarative_base()
 
 
+# The schema is created and changed by app.migrations; keep these models in
+# step with it.
+
+
 class Category(Base):
     __tablename__ = "category"
     category_id = Column(Integer, primary_key=True, index=True)
@@ -14,6 +18,10 @@ class Category(Base):
     subcategory = Column(String, nullable=True)
     products = relationship("Product", back_populates="category", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_category_name", "name"),
+    )
+
 
 class Product(Base):
     __tablename__ = "product"
@@ -30,6 +38,17 @@ class Product(Base):
     category = relationship("Category", back_populates="products")
     sales = relationship("ProductSale", back_populates="product", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_product_category_id", "category_id"),
+        Index("ix_product_size", "size"),
+        Index("ix_product_color", "color"),
+        # prefix matching (sku LIKE 'ABC%') whatever the database collation
+        Index("ix_product_sku_pattern", "sku", postgresql_ops={"sku": "text_pattern_ops"}),
+        # listing sorted by name; search also has trigram indexes on sku and
+        # name when pg_trgm is installed (see migration 0003)
+        Index("ix_product_name_sku", "name", "sku"),
+    )
+
 
 class ProductSale(Base):
     __tablename__ = "product_sale"
@@ -38,4 +57,74 @@ class ProductSale(Base):
     date = Column(Date, nullable=False)
     sku = Column(String, ForeignKey("product.sku"), nullable=False)
     quantity = Column(Integer, nullable=False)
+    # nth identical (sku, date, channel, quantity) row of an import; NULL for API sales
+    occurrence = Column(Integer, nullable=True)
     product = relationship("Product", back_populates="sales")
+
+    __table_args__ = (
+        # keyset pagination of GET /sales/ walks (date, sale_id)
+        Index("ix_product_sale_date_sale_id", "date", "sale_id"),
+        Index("ix_product_sale_sku_date", "sku", "date"),
+        Index("ix_product_sale_date_channel", "date", "channel"),
+        # natural key of imported sales; re-imported rows hit it and are skipped
+        Index(
+            "ux_product_sale_natural_key", "sku", "date", "channel", "quantity", "occurrence",
+            unique=True, postgresql_where=text("occurrence IS NOT NULL"),
+        ),
+    )
+
+
+class SalesDaily(Base):
+    """Units sold per SKU, channel and day; kept in step with ``product_sale``.
+
+    Written in the same transaction as the sales it summarizes (see
+    ``app.rollup``) so time-series queries never have to scan ``product_sale``.
+    """
+    __tablename__ = "sales_daily"
+    sku = Column(String, ForeignKey("product.sku", ondelete="CASCADE"), primary_key=True)
+    channel = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # store-wide series filter on date alone
+        Index("ix_sales_daily_date", "date"),
+    )
+
+
+class ImportJob(Base):
+    __tablename__ = "import_job"
+    job_id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)  # 'products' or 'sales'
+    filename = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    options = Column(JSON, nullable=True)
+    message = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    # counters (refreshed while the job runs) and the upload endpoint's response body
+    progress = Column(JSON, nullable=True)
+    report = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # process running the job and its last sign of life, see app.jobs
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class SaleBatch(Base):
+    """Idempotency key of a ``POST /sales/batch`` request and the response it got."""
+    __tablename__ = "sale_batch"
+    idempotency_key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # sha256 of the items
+    response = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class ImportFile(Base):
+    """A file that has been imported, keyed by the sha256 of its bytes."""
+    __tablename__ = "import_file"
+    sha256 = Column(String(64), primary_key=True)
+    kind = Column(String, nullable=False)  # "sales"
+    filename = Column(String, nullable=True)
+    imported_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,78 @@
+"""Maintenance of the ``sales_daily`` rollup.
+
+Every write to ``product_sale`` also adds its quantity to the
+(sku, channel, date) row of ``sales_daily`` on the same session, so both
+tables commit or roll back together. ``rebuild_sales_daily`` recomputes the
+whole table from ``product_sale`` for existing data or after manual edits.
+"""
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import delete, exists, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .database import ImportSessionLocal
+from .models import ProductSale, SalesDaily
+
+# pg_advisory_xact_lock key held while the startup backfill checks and builds
+BACKFILL_LOCK_KEY = 7_146_523_002
+
+
+def daily_totals(sales: Iterable[dict]) -> list:
+    """Sum sale dicts (sku, channel, date, quantity) into rollup rows.
+
+    Rows come back sorted by key, so concurrent writers lock rollup rows in
+    the same order and cannot deadlock each other.
+    """
+    totals = defaultdict(int)
+    for s in sales:
+        totals[(s["sku"], s["channel"], s["date"])] += s["quantity"]
+    return [
+        {"sku": sku, "channel": channel, "date": day, "quantity": qty}
+        for (sku, channel, day), qty in sorted(totals.items())
+    ]
+
+
+async def add_sales(session, sales: Iterable[dict]) -> None:
+    """Add sales to ``sales_daily`` on ``session`` (one upsert per key)."""
+    rows = daily_totals(sales)
+    if not rows:
+        return
+    stmt = pg_insert(SalesDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SalesDaily.sku, SalesDaily.channel, SalesDaily.date],
+        set_={"quantity": SalesDaily.quantity + stmt.excluded.quantity},
+    )
+    await session.execute(stmt, rows)
+
+
+async def rebuild_sales_daily(session) -> int:
+    """Replace ``sales_daily`` with totals recomputed from ``product_sale``.
+
+    Runs on the caller's transaction; returns the number of rollup rows.
+    """
+    s = ProductSale
+    await session.execute(delete(SalesDaily))
+    totals = (
+        select(s.sku, s.channel, s.date, func.sum(s.quantity))
+        .group_by(s.sku, s.channel, s.date)
+    )
+    result = await session.execute(
+        insert(SalesDaily).from_select(["sku", "channel", "date", "quantity"], totals)
+    )
+    return result.rowcount
+
+
+async def backfill_sales_daily() -> None:
+    """Build the rollup at startup when it is empty but sales exist.
+
+    Covers databases that had sales before ``sales_daily`` was added.
+    """
+    async with ImportSessionLocal() as session:
+        # API workers start together; the first builds it, the others then see it built
+        await session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": BACKFILL_LOCK_KEY})
+        has_rollup = await session.scalar(select(exists().select_from(SalesDaily)))
+        has_sales = await session.scalar(select(exists().select_from(ProductSale)))
+        if has_sales and not has_rollup:
+            await rebuild_sales_daily(session)
+            await session.commit()
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, literal, or_, select
+from datetime import date, timedelta
+from typing import List, Optional
+from .. import models, schemas
+from ..database import get_session
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+# Same rules the frontend's analyzeSalesData used: the average is taken over
+# the last 90 days, and a product is active if it sold in the last 30 days
+# or averages more than 0.1 units a day.
+AVERAGE_WINDOW_DAYS = 90
+ACTIVE_WITHIN_DAYS = 30
+ACTIVE_MIN_DAILY_SALES = 0.1
+
+
+def product_sales_query(as_of: date, window_days: int):
+    """Per-SKU sales metrics for every product in one GROUP BY over product ⟕ product_sale."""
+    p, s = models.Product, models.ProductSale
+    since = as_of - timedelta(days=window_days)
+    last_sale = func.max(s.date)
+    recent = func.coalesce(func.sum(s.quantity).filter(s.date > since), 0)
+    average = recent / literal(float(window_days))
+    days_since = literal(as_of) - last_sale
+    return (
+        select(
+            p.sku.label("sku"),
+            func.coalesce(func.sum(s.quantity), 0).label("total_sales"),
+            last_sale.label("last_sale_date"),
+            days_since.label("days_since_last_sale"),
+            average.label("average_daily_sales"),
+            func.coalesce(or_(days_since <= ACTIVE_WITHIN_DAYS, average > ACTIVE_MIN_DAILY_SALES), False).label("is_active"),
+        )
+        .select_from(p)
+        .outerjoin(s, s.sku == p.sku)
+        .group_by(p.sku)
+    )
+
+
+@router.get("/products", response_model=List[schemas.ProductSalesAnalytics])
+async def products_sales_analytics(
+    category_id: Optional[int] = Query(None),
+    size: Optional[str] = Query(None),
+    color: Optional[str] = Query(None),
+    as_of: Optional[date] = Query(None, description="day the metrics are computed for; defaults to today"),
+    window_days: int = Query(AVERAGE_WINDOW_DAYS, ge=1, le=3650),
+    db: AsyncSession = Depends(get_session),
+):
+    """Sales totals, last sale, daily average and active flag for every product.
+
+    Products without sales are included with zero totals. Filters match the
+    ones of ``GET /products/``.
+    """
+    stmt = product_sales_query(as_of or date.today(), window_days)
+    if category_id is not None:
+        stmt = stmt.where(models.Product.category_id == category_id)
+    if size:
+        stmt = stmt.where(models.Product.size == size)
+    if color:
+        stmt = stmt.where(models.Product.color == color)
+    result = await db.execute(stmt.order_by(models.Product.sku))
+    return [dict(r) for r in result.mappings().all()]
+
+
+@router.get("/products/{sku:path}", response_model=schemas.ProductSalesAnalytics)
+async def product_sales_analytics(
+    sku: str,
+    as_of: Optional[date] = Query(None, description="day the metrics are computed for; defaults to today"),
+    window_days: int = Query(AVERAGE_WINDOW_DAYS, ge=1, le=3650),
+    db: AsyncSession = Depends(get_session),
+):
+    stmt = product_sales_query(as_of or date.today(), window_days).where(models.Product.sku == sku)
+    row = (await db.execute(stmt)).mappings().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return dict(row)
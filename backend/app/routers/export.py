@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from datetime import date
+from typing import List, Optional
+from .. import columnar, models
+from ..streaming import copy_csv_chunks
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+FORMAT_PATTERN = "^(parquet|arrow)$"
+
+
+def _export(stmt, schema, fmt: str, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        columnar.encode(copy_csv_chunks(stmt), schema, fmt),
+        media_type=columnar.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+def _require_pyarrow() -> None:
+    if not columnar.available():
+        raise HTTPException(status_code=501, detail="Columnar export needs pyarrow installed on the server")
+
+
+@router.get("/sales.{fmt}")
+async def export_sales(
+    fmt: str = Path(..., regex=FORMAT_PATTERN),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None, description="inclusive"),
+    channel: Optional[List[str]] = Query(None),
+    sku: Optional[List[str]] = Query(None),
+    category_id: Optional[int] = Query(None),
+):
+    """Every matching sale as a Parquet file or Arrow IPC stream, ordered by date.
+
+    Rows are read with ``COPY`` in chunks of a few MB and each chunk is
+    written as its own row group / record batches, so the download starts
+    at once and server memory stays flat. ``channel`` and ``sku`` may be
+    repeated.
+    """
+    _require_pyarrow()
+    sale = models.ProductSale
+    stmt = select(sale.sale_id, sale.date, sale.sku, sale.channel, sale.quantity)
+    if date_from:
+        stmt = stmt.where(sale.date >= date_from)
+    if date_to:
+        stmt = stmt.where(sale.date <= date_to)
+    if channel:
+        stmt = stmt.where(sale.channel.in_(channel))
+    if sku:
+        stmt = stmt.where(sale.sku.in_(sku))
+    if category_id is not None:
+        stmt = stmt.join(models.Product, models.Product.sku == sale.sku).where(models.Product.category_id == category_id)
+    stmt = stmt.order_by(sale.date, sale.sale_id)
+    return _export(stmt, columnar.sales_schema(), fmt, "sales")
+
+
+@router.get("/products.{fmt}")
+async def export_products(
+    fmt: str = Path(..., regex=FORMAT_PATTERN),
+    category_id: Optional[int] = Query(None),
+    size: Optional[str] = Query(None),
+    color: Optional[str] = Query(None),
+):
+    """Snapshot of every matching product as a Parquet file or Arrow IPC stream.
+
+    Includes the category name and subcategory and the attributes parsed
+    from the SKU at import (prefix, design_code, pattern, color, size).
+    """
+    _require_pyarrow()
+    p, c = models.Product, models.Category
+    stmt = (
+        select(
+            p.sku, p.name, p.category_id, c.name, c.subcategory, p.stock_level,
+            p.prefix, p.design_code, p.pattern, p.color, p.size,
+        )
+        .select_from(p)
+        .outerjoin(c, c.category_id == p.category_id)
+    )
+    if category_id is not None:
+        stmt = stmt.where(p.category_id == category_id)
+    if size:
+        stmt = stmt.where(p.size == size)
+    if color:
+        stmt = stmt.where(p.color == color)
+    stmt = stmt.order_by(p.sku)
+    return _export(stmt, columnar.products_schema(), fmt, "products")
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from ..database import get_session
+from .. import jobs
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+
+@router.get("/")
+async def list_import_jobs(
+    kind: Optional[str] = Query(None, description="Only 'products' or 'sales' jobs"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_session),
+):
+    """Most recent import jobs first, including finished ones and their reports."""
+    return await jobs.list_jobs(db, kind=kind, limit=limit)
+
+
+@router.get("/{job_id}")
+async def get_import_job(job_id: str, db: AsyncSession = Depends(get_session)):
+    """Status of one import job.
+
+    ``progress`` holds rows read out of the estimated total, the importer's
+    counters (processed, skipped, matched_skus, errors, ... for sales;
+    inserted, updated, skipped for products), throughput and ETA. Once the
+    job has succeeded ``report`` holds what the upload endpoint used to
+    return; failed jobs carry ``error``.
+    """
+    job = await jobs.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
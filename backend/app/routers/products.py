@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import func, or_, select, tuple_
 from typing import List, Optional
-from .. import models, schemas
+from .. import jobs, models, schemas
 from ..database import get_session
+from ..facets import etag_matches, get_facet_index, invalidate_facets
+from ..pagination import decode_cursor, encode_cursor, estimate_count
+from ..streaming import stream_rows
 import tempfile
 import shutil
 from pathlib import Path
@@ -15,58 +18,32 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+PRODUCTS_PAGE_SIZE = 500
+MAX_PRODUCTS_PAGE_SIZE = 5000
+
 
 @router.get('/facets', response_model=schemas.ProductFacets)
-async def get_product_facets(db: AsyncSession = Depends(get_session)):
-    """Return distinct sizes and colors present in the product table."""
-    # Use raw SQL or SQLAlchemy select with distinct
-    sizes_stmt = select(models.Product.size).distinct()
-    colors_stmt = select(models.Product.color).distinct()
-    sizes_result = await db.execute(sizes_stmt)
-    colors_result = await db.execute(colors_stmt)
-    raw_sizes = [s[0] for s in sizes_result.fetchall() if s[0] is not None and str(s[0]).strip()]
-    raw_colors = [c[0] for c in colors_result.fetchall() if c[0] is not None and str(c[0]).strip()]
-
-    # Allowed size tokens (same as importer)
-    allowed = {"XS", "S", "M", "L", "XL", "XXL", "2XL", "3XL", "F", "FF"}
-
-    sizes_set = set()
-    import re
-    for s in raw_sizes:
-        raw = str(s).strip()
-        if not raw:
-            continue
-        # handle comma or slash separation
-        parts = [p.strip() for p in re.split(r'[,/]', raw) if p.strip()]
-        for part in parts:
-            token = part.upper().replace(' ', '')
-            # map simple '2X' -> '2XL'
-            if re.match(r'^(2|3)[Xx]$', token):
-                token = token.replace('X', 'XL')
-            # accept if in allowed set or simple repeated-X form
-            if token in allowed:
-                sizes_set.add(token)
-            else:
-                # try heuristic: 'XXXL' -> '3XL'
-                if token.endswith('XL') and token.count('X') >= 2:
-                    xcount = token.count('X')
-                    if xcount == 3 and '3XL' in allowed:
-                        sizes_set.add('3XL')
-                    elif xcount == 2 and 'XXL' in allowed:
-                        sizes_set.add('XXL')
-
-    colors_set = set()
-    for c in raw_colors:
-        raw = str(c).strip()
-        if not raw:
-            continue
-        parts = [p.strip() for p in re.split(r'[,/]', raw) if p.strip()]
-        for part in parts:
-            # accept only if contains any letter (to avoid numeric codes)
-            if re.search(r'[A-Za-zก-ฮ]', part):
-                colors_set.add(part)
-
-    return schemas.ProductFacets(sizes=sorted(list(sizes_set)), colors=sorted(list(colors_set)))
+async def get_product_facets(
+    request: Request,
+    response: Response,
+    category_id: Optional[int] = Query(None),
+    size: Optional[str] = Query(None),
+    color: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_session),
+):
+    """Sizes and colors present in the product table, with product counts.
+
+    Served from the in-memory ``FacetIndex``. ``sizes`` and ``colors`` always
+    list the whole catalog; the counts follow the optional filters. The
+    response carries an ETag, and a matching ``If-None-Match`` gets a 304.
+    """
+    index = await get_facet_index(db)
+    etag = index.etag(category_id, size, color)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return {"sizes": index.sizes, "colors": index.colors, **index.counts(category_id, size, color)}
 
 
 @router.post("/", response_model=schemas.ProductRead)
@@ -78,56 +55,140 @@ async def create_product(product: schemas.ProductCreate, db: AsyncSession = Depe
     db_prod = models.Product(sku=product.sku, name=product.name, category_id=product.category_id, stock_level=product.stock_level)
     db.add(db_prod)
     await db.commit()
+    invalidate_facets()
     await db.refresh(db_prod)
     return db_prod
 
 
-@router.get("/", response_model=List[schemas.ProductRead])
+def _product_rows():
+    """Listing columns of ``product`` plus the category name, as plain rows."""
+    p, c = models.Product, models.Category
+    return (
+        select(p.sku, p.name, p.category_id, p.stock_level, c.name.label("category_name"))
+        .select_from(p)
+        .outerjoin(c, c.category_id == p.category_id)
+    )
+
+
+def _sort_keys(sort: str):
+    """Keyset columns for a listing sort and the types of their cursor values."""
+    p = models.Product
+    if sort == "name":
+        return [p.name, p.sku], (str, str)
+    if sort == "stock_level":
+        return [func.coalesce(p.stock_level, 0), p.sku], (int, str)
+    return [p.sku], (str,)
+
+
+def _sort_values(row, sort: str) -> list:
+    """Values of ``_sort_keys(sort)`` for a listing row."""
+    if sort == "name":
+        return [row["name"], row["sku"]]
+    if sort == "stock_level":
+        return [row["stock_level"] or 0, row["sku"]]
+    return [row["sku"]]
+
+
+def _like_pattern(term: str) -> str:
+    """``term`` with LIKE wildcards escaped (escape character ``\\``)."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@router.get("/", response_model=schemas.ProductPage)
 async def list_products(
     db: AsyncSession = Depends(get_session),
         category_id: Optional[int] = Query(None),
         size: Optional[str] = Query(None),
         color: Optional[str] = Query(None),
+        q: Optional[str] = Query(None, description="case-insensitive search in SKU and name"),
+        sku_prefix: Optional[str] = Query(None, description="SKUs starting with this text (case-sensitive)"),
+        sort: str = Query("sku", regex="^(sku|name|stock_level)$"),
+        order: str = Query("asc", regex="^(asc|desc)$"),
+        limit: int = Query(PRODUCTS_PAGE_SIZE, ge=1, le=MAX_PRODUCTS_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        format: str = Query("page", regex="^(page|ndjson|json)$", description="ndjson/json stream every matching product"),
 ):
-    stmt = select(models.Product).options(selectinload(models.Product.category))
+    """One page of products with their category name.
+
+    Only the listed columns are selected (category name by join) and rows
+    are returned as plain mappings. Pages are cut with a keyset condition on
+    the sort column plus ``sku``, so deep pages cost the same as the first.
+    ``q`` uses the trigram indexes when ``pg_trgm`` is installed and
+    ``sku_prefix`` the ``text_pattern_ops`` index on ``sku``.
+
+    ``format=ndjson`` or ``format=json`` streams every matching product
+    after ``cursor`` in the same order instead of one page.
+    """
+    p = models.Product
+    filtered = _product_rows()
     if category_id is not None:
-        stmt = stmt.where(models.Product.category_id == category_id)
+        filtered = filtered.where(p.category_id == category_id)
     if size:
-        stmt = stmt.where(models.Product.size == size)
+        filtered = filtered.where(p.size == size)
     if color:
-        stmt = stmt.where(models.Product.color == color)
+        filtered = filtered.where(p.color == color)
+    if q and q.strip():
+        pattern = f"%{_like_pattern(q.strip())}%"
+        filtered = filtered.where(or_(p.sku.ilike(pattern, escape="\\"), p.name.ilike(pattern, escape="\\")))
+    if sku_prefix:
+        filtered = filtered.where(p.sku.like(f"{_like_pattern(sku_prefix)}%", escape="\\"))
 
-    result = await db.execute(stmt)
-    prods = result.scalars().all()
-    # Attach category_name for convenience
-    for p in prods:
+    keys, types = _sort_keys(sort)
+    page = filtered
+    if cursor:
         try:
-            p.category_name = p.category.name if p.category is not None else None
-        except Exception:
-            p.category_name = None
-    return prods
+            after = decode_cursor(cursor, len(keys))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not all(isinstance(v, t) for v, t in zip(after, types)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        key, bound = tuple_(*keys), tuple_(*after)
+        page = page.where(key < bound if order == "desc" else key > bound)
+    page = page.order_by(*(k.desc() if order == "desc" else k for k in keys))
+    if format != "page":
+        return stream_rows(page, format)
+
+    # one extra row tells whether another page follows
+    result = await db.execute(page.limit(limit + 1))
+    rows = result.mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*_sort_values(rows[-1], sort))
+
+    # rows are already plain JSON values; skip re-validating them against the model
+    return JSONResponse({
+        "items": [dict(r) for r in rows],
+        "next_cursor": next_cursor,
+        "total_estimate": await estimate_count(db, filtered),
+    })
 
 
-@router.get("/{sku}", response_model=schemas.ProductRead)
+@router.get("/{sku:path}", response_model=schemas.ProductRead)
 async def get_product(sku: str, db: AsyncSession = Depends(get_session)):
-    prod = await db.get(models.Product, sku, options=[selectinload(models.Product.category)])
-    if not prod:
+    row = (await db.execute(_product_rows().where(models.Product.sku == sku))).mappings().first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    try:
-        prod.category_name = prod.category.name if prod.category is not None else None
-    except Exception:
-        prod.category_name = None
-    return prod
+    return dict(row)
 
 
 @router.post("/upload")
-async def upload_products_file(file: UploadFile = File(...), dry_run: bool = Query(False)):
-    """Upload an Excel file and import products (header on second row).
+async def upload_products_file(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False),
+    incremental: bool = Query(False),
+):
+    """Upload an Excel or CSV file and queue a product import (header on second row).
+
+    Returns a ``job_id`` at once; poll ``GET /imports/{job_id}`` for progress
+    and the final report.
 
     Query params:
     - dry_run: if true, importer will only simulate changes and not write to DB
+    - incremental: if true, only new or changed products are written and the
+      report lists how many were unchanged
     """
-    logger.info(f"Products upload endpoint called - filename: {file.filename}, dry_run: {dry_run}")
+    logger.info(f"Products upload endpoint called - filename: {file.filename}, dry_run: {dry_run}, incremental: {incremental}")
     
     # Validate file type
     if not file.filename:
@@ -154,25 +215,64 @@ async def upload_products_file(file: UploadFile = File(...), dry_run: bool = Que
         finally:
             file.file.close()
 
+    async def run(path, progress):
+        try:
+            return await import_products_func(path, dry_run=dry_run, progress=progress, incremental=incremental)
+        finally:
+            if not dry_run:
+                invalidate_facets()
+
     try:
-        logger.info(f"Starting products import from: {temp_path}")
-        await import_products_func(temp_path, dry_run=dry_run)
-        action = "validated" if dry_run else "imported"
-        logger.info(f"Product data {action} successfully")
-        return {"success": True, "message": f"Product data {action} successfully", "dry_run": dry_run}
+        job_id = await jobs.submit(
+            "products",
+            file.filename,
+            temp_path,
+            run,
+            summarize=lambda report: summarize_products_report(report, dry_run, incremental),
+            explain=explain_products_error,
+            options={"dry_run": dry_run, "incremental": incremental},
+        )
     except Exception as e:
-        logger.error(f"Product import failed: {str(e)}")
-        error_msg = f"Product import failed: {str(e)}"
-        if "No valid data found" in str(e):
-            error_msg = "No valid product data found in the uploaded file. Please check the file format and content."
-        elif "Column" in str(e) and "not found" in str(e):
-            error_msg = f"Required columns missing in the file: {str(e)}"
-        raise HTTPException(status_code=400, detail=error_msg)
-    finally:
-        try:
-            Path(temp_path).unlink()
-        except Exception:
-            pass
+        Path(temp_path).unlink(missing_ok=True)
+        logger.error(f"Could not queue product import: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Could not queue product import: {str(e)}")
+
+    return {
+        "success": True,
+        "message": "Product import queued",
+        "job_id": job_id,
+        "status": "queued",
+        "dry_run": dry_run,
+        "incremental": incremental,
+    }
+
 
+def summarize_products_report(report: dict, dry_run: bool, incremental: bool = False) -> dict:
+    """Response body for a finished product import, stored on its job."""
+    action = "validated" if dry_run else "imported"
+    logger.info(f"Product data {action} successfully: {report}")
+    counts = f"{report['inserted']} new, {report['updated']} updated"
+    if incremental:
+        counts += f", {report['unchanged']} unchanged"
+    body = {
+        "success": True,
+        "message": f"Product data {action} successfully ({counts})",
+        "dry_run": dry_run,
+        "inserted": report["inserted"],
+        "updated": report["updated"],
+        "skipped": report["skipped"],
+    }
+    if incremental:
+        body["unchanged"] = report["unchanged"]
+        body["changes"] = report["changes"]
+    return body
 
 
+def explain_products_error(e: Exception) -> str:
+    """User-facing message for a failed product import."""
+    error_msg = f"Product import failed: {str(e)}"
+    if "No valid data found" in str(e):
+        error_msg = "No valid product data found in the uploaded file. Please check the file format and content."
+    elif "Column" in str(e) and "not found" in str(e):
+        error_msg = f"Required columns missing in the file: {str(e)}"
+    return error_msg
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from datetime import date, timedelta
+from functools import partial
+from typing import List, Optional
+from .. import forecast, models, schemas
+from ..database import get_session
+import asyncio
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/restock", tags=["restock"])
+
+HISTORY_DAYS = 730
+MAX_HISTORY_DAYS = 3650
+
+
+async def load_demand(db: AsyncSession, as_of: date, days: int, category_id: Optional[int] = None):
+    """SKUs, their stock levels and the SKU x day demand matrix ending on ``as_of``.
+
+    Daily totals come from the ``sales_daily`` rollup, summed over channels.
+    """
+    p, daily = models.Product, models.SalesDaily
+    products = select(p.sku, p.stock_level).order_by(p.sku)
+    if category_id is not None:
+        products = products.where(p.category_id == category_id)
+    product_rows = (await db.execute(products)).all()
+    skus = [r.sku for r in product_rows]
+    stock = np.array([r.stock_level or 0 for r in product_rows], dtype=np.float64)
+
+    start = as_of - timedelta(days=days - 1)
+    sales = (
+        select(daily.sku, daily.date, func.sum(daily.quantity))
+        .where(daily.date >= start, daily.date <= as_of)
+        .group_by(daily.sku, daily.date)
+    )
+    if category_id is not None:
+        sales = sales.join(p, p.sku == daily.sku).where(p.category_id == category_id)
+    sale_rows = (await db.execute(sales)).all()
+    demand = forecast.demand_matrix(
+        skus,
+        [r[0] for r in sale_rows],
+        [(r[1] - start).days for r in sale_rows],
+        [r[2] for r in sale_rows],
+        days,
+    )
+    return skus, stock, demand
+
+
+def _finite(value: float, digits: int = 2) -> Optional[float]:
+    return round(float(value), digits) if math.isfinite(value) else None
+
+
+@router.get("/recommendations", response_model=List[schemas.RestockRecommendation])
+async def restock_recommendations(
+    method: str = Query("sma", regex="^(sma|ema)$", description="sma: moving average, ema: exponential smoothing"),
+    window_days: int = Query(forecast.DEFAULT_WINDOW_DAYS, ge=1, le=365, description="moving-average and volatility window"),
+    alpha: float = Query(forecast.DEFAULT_ALPHA, gt=0, le=1, description="smoothing factor for ema"),
+    lead_time_days: float = Query(forecast.DEFAULT_LEAD_TIME_DAYS, ge=0, le=365),
+    cover_days: float = Query(forecast.DEFAULT_COVER_DAYS, ge=0, le=365, description="days of demand an order should cover"),
+    service_z: float = Query(forecast.DEFAULT_SERVICE_Z, ge=0, le=5, description="safety-stock z-score"),
+    history_days: int = Query(HISTORY_DAYS, ge=1, le=MAX_HISTORY_DAYS),
+    as_of: Optional[date] = Query(None, description="last day of history; defaults to today"),
+    category_id: Optional[int] = Query(None),
+    only_reorder: bool = Query(False, description="only products at or below their reorder point"),
+    db: AsyncSession = Depends(get_session),
+):
+    """Forecast demand and reorder quantities for every product in one batch.
+
+    Results are ordered most urgent first (fewest days of cover). Products
+    without demand have ``days_of_cover`` null and never need reordering.
+    """
+    if window_days > history_days:
+        raise HTTPException(status_code=400, detail="window_days cannot exceed history_days")
+    skus, stock, demand = await load_demand(db, as_of or date.today(), history_days, category_id)
+    # the array work is CPU-bound; keep it off the event loop
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        None,
+        partial(
+            forecast.recommend,
+            demand,
+            stock,
+            method=method,
+            window=window_days,
+            alpha=alpha,
+            lead_time_days=lead_time_days,
+            cover_days=cover_days,
+            service_z=service_z,
+        ),
+    )
+
+    order = np.lexsort((np.arange(len(skus)), result["days_of_cover"]))
+    if only_reorder:
+        order = order[result["needs_reorder"][order]]
+    return [
+        {
+            "sku": skus[i],
+            "stock_level": int(stock[i]),
+            "daily_demand": round(float(result["daily_demand"][i]), 3),
+            "days_of_cover": _finite(result["days_of_cover"][i], 1),
+            "safety_stock": _finite(result["safety_stock"][i]),
+            "reorder_point": _finite(result["reorder_point"][i]),
+            "reorder_qty": int(result["reorder_qty"][i]),
+            "needs_reorder": bool(result["needs_reorder"][i]),
+        }
+        for i in order
+    ]
@@ -1,41 +1,270 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi import UploadFile, File, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
-from .. import models, schemas
+from sqlalchemy import Date, Integer, String, cast, column, func, insert, literal, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from collections import defaultdict
+from datetime import date
+from typing import List, Optional
+import asyncio
+import hashlib
+import json
+from .. import jobs, models, schemas
 from ..database import get_session
+from ..facets import invalidate_facets
+from ..pagination import decode_cursor, encode_cursor, estimate_count
+from ..rollup import add_sales
+from ..streaming import stream_rows
 import tempfile
 import shutil
 from pathlib import Path
-from backend.scripts.import_sales import import_sales as import_sales_func
+from ..ingest.readers import file_sha256
+from backend.scripts.import_sales import DuplicateImportError, import_sales as import_sales_func
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 
+MAX_REPORTED_BAD_ROWS = 100
+SALES_PAGE_SIZE = 500
+MAX_SALES_PAGE_SIZE = 5000
+MAX_SALE_BATCH_ITEMS = 1000
+
 
 @router.post("/", response_model=schemas.ProductSaleRead)
 async def create_sale(sale: schemas.ProductSaleCreate, db: AsyncSession = Depends(get_session)):
-    product = await db.get(models.Product, sale.sku)
-    if not product:
-        raise HTTPException(status_code=400, detail="Product sku does not exist")
-    if product.stock_level - sale.quantity < 0:
+    """Record a sale and take its quantity off the product's stock.
+
+    The stock check, the decrement and the insert are one statement: the
+    ``UPDATE`` only matches while enough stock is left and the sale is
+    inserted from its ``RETURNING`` row. Concurrent sales of the same SKU
+    queue on the product's row lock and re-check the stock after the one
+    ahead commits, so stock never goes negative. A product without a stock
+    level has none, as in ``record_sales_batch``.
+    """
+    p, s = models.Product, models.ProductSale
+    decrement = (
+        update(p)
+        .where(p.sku == sale.sku, func.coalesce(p.stock_level, 0) >= sale.quantity)
+        .values(stock_level=func.coalesce(p.stock_level, 0) - sale.quantity)
+        .returning(p.sku)
+        .cte("decrement")
+    )
+    stmt = (
+        insert(s)
+        .from_select(
+            ["channel", "date", "sku", "quantity"],
+            select(literal(sale.channel), literal(sale.date), decrement.c.sku, literal(sale.quantity)),
+        )
+        .returning(s.sale_id, s.channel, s.date, s.sku, s.quantity)
+    )
+    row = (await db.execute(stmt)).mappings().first()
+    if row is None:
+        # nothing was written; find out which condition failed
+        if await db.scalar(select(p.sku).where(p.sku == sale.sku)) is None:
+            raise HTTPException(status_code=400, detail="Product sku does not exist")
         raise HTTPException(status_code=400, detail="Insufficient stock")
-    product.stock_level = product.stock_level - sale.quantity
-    db_sale = models.ProductSale(channel=sale.channel, date=sale.date, sku=sale.sku, quantity=sale.quantity)
-    db.add(db_sale)
-    db.add(product)
+    await add_sales(db, [sale.dict()])
+    await db.commit()
+    return dict(row)
+
+
+async def record_sales_batch(db: AsyncSession, items: List[dict]) -> dict:
+    """Record the sales in ``items`` that are possible; result per item.
+
+    The products are read and row-locked in one query (in SKU order, so
+    concurrent batches cannot deadlock). Items are then taken in order while
+    their product has stock left; unknown SKUs and items beyond the stock
+    are rejected. One ``UPDATE ... FROM (VALUES ...)`` decrements every
+    affected product and one multi-row ``INSERT ... RETURNING`` adds the
+    sales. Nothing is committed here.
+    """
+    p, s = models.Product, models.ProductSale
+    skus = sorted({item["sku"] for item in items})
+    locked = await db.execute(select(p.sku, p.stock_level).where(p.sku.in_(skus)).order_by(p.sku).with_for_update())
+    stock = {sku: level or 0 for sku, level in locked}
+
+    results, accepted, taken = [], [], defaultdict(int)
+    for index, item in enumerate(items):
+        sku = item["sku"]
+        if sku not in stock:
+            status = "unknown_sku"
+        elif stock[sku] - taken[sku] < item["quantity"]:
+            status = "insufficient_stock"
+        else:
+            status = "created"
+            taken[sku] += item["quantity"]
+            accepted.append(index)
+        results.append({"index": index, "sku": sku, "status": status, "sale_id": None})
+
+    if accepted:
+        decrements = values(column("sku", String), column("quantity", Integer), name="decrements").data(sorted(taken.items()))
+        await db.execute(
+            update(p)
+            .where(p.sku == decrements.c.sku)
+            .values(stock_level=func.coalesce(p.stock_level, 0) - decrements.c.quantity)
+        )
+        sales = [items[i] for i in accepted]
+        inserted = await db.execute(insert(s).returning(s.sale_id, sort_by_parameter_order=True), sales)
+        for index, sale_id in zip(accepted, inserted.scalars()):
+            results[index]["sale_id"] = sale_id
+        await add_sales(db, sales)
+
+    return {
+        "created": len(accepted),
+        "rejected": len(items) - len(accepted),
+        "replayed": False,
+        "items": results,
+    }
+
+
+@router.post("/batch", response_model=schemas.SaleBatchResult)
+async def create_sales_batch(
+    batch: schemas.SaleBatchCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_session),
+):
+    """Record up to ``MAX_SALE_BATCH_ITEMS`` sales at once, e.g. from an order webhook.
+
+    Each item is created or rejected (``unknown_sku``, ``insufficient_stock``)
+    on its own; the created ones commit together. With an ``Idempotency-Key``
+    header the result is stored under the key in the same transaction, and
+    a retry with the same key and items gets that result back
+    (``replayed: true``) without recording anything. Reusing a key for
+    different items is a 409. A retry that arrives while the first request
+    is still running waits for it.
+    """
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="No items")
+    if len(batch.items) > MAX_SALE_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SALE_BATCH_ITEMS} items per batch")
+    items = [item.dict() for item in batch.items]
+
+    if idempotency_key:
+        request_hash = hashlib.sha256(json.dumps(items, default=str, sort_keys=True).encode()).hexdigest()
+        b = models.SaleBatch
+        # waits for a concurrent request holding the same key to finish
+        claimed = await db.scalar(
+            pg_insert(b)
+            .values(idempotency_key=idempotency_key, request_hash=request_hash)
+            .on_conflict_do_nothing()
+            .returning(b.idempotency_key)
+        )
+        if claimed is None:
+            stored = (await db.execute(select(b.request_hash, b.response).where(b.idempotency_key == idempotency_key))).one()
+            await db.rollback()
+            if stored.request_hash != request_hash:
+                raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different batch")
+            return {**stored.response, "replayed": True}
+
+    result = await record_sales_batch(db, items)
+    if idempotency_key:
+        await db.execute(update(b).where(b.idempotency_key == idempotency_key).values(response=result))
     await db.commit()
-    await db.refresh(db_sale)
-    return db_sale
+    logger.info(f"Sales batch: created={result['created']} rejected={result['rejected']}")
+    return result
+
+
+@router.get("/", response_model=schemas.ProductSalePage)
+async def list_sales(
+    limit: int = Query(SALES_PAGE_SIZE, ge=1, le=MAX_SALES_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None, description="inclusive"),
+    channel: Optional[List[str]] = Query(None),
+    sku: Optional[List[str]] = Query(None),
+    order: str = Query("desc", regex="^(asc|desc)$"),
+    format: str = Query("page", regex="^(page|ndjson|json)$", description="ndjson/json stream every matching sale"),
+    db: AsyncSession = Depends(get_session),
+):
+    """One page of sales, newest first by default.
 
+    Pages are cut on ``(date, sale_id)`` with a keyset condition rather than
+    OFFSET, so every page costs the same however deep it is. ``channel`` and
+    ``sku`` may be repeated to match several values. ``total_estimate`` is
+    the planner's estimate for the whole filtered set, not an exact count.
+
+    With ``format=ndjson`` (one sale per line) or ``format=json`` (a bare
+    array) every sale after ``cursor`` is streamed in the same order instead
+    of a page; ``limit`` does not apply.
+    """
+    sale = models.ProductSale
+    filtered = select(sale.sale_id, sale.channel, sale.date, sale.sku, sale.quantity)
+    if date_from:
+        filtered = filtered.where(sale.date >= date_from)
+    if date_to:
+        filtered = filtered.where(sale.date <= date_to)
+    if channel:
+        filtered = filtered.where(sale.channel.in_(channel))
+    if sku:
+        filtered = filtered.where(sale.sku.in_(sku))
+
+    key = tuple_(sale.date, sale.sale_id)
+    page = filtered
+    if cursor:
+        try:
+            after_date, after_id = decode_cursor(cursor, 2)
+            after = tuple_(date.fromisoformat(after_date), int(after_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page = page.where(key < after if order == "desc" else key > after)
+    if order == "desc":
+        page = page.order_by(sale.date.desc(), sale.sale_id.desc())
+    else:
+        page = page.order_by(sale.date, sale.sale_id)
+    if format != "page":
+        return stream_rows(page, format)
+
+    # one extra row tells whether another page follows
+    result = await db.execute(page.limit(limit + 1))
+    rows = result.mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["date"].isoformat(), rows[-1]["sale_id"])
+
+    return {
+        "items": [dict(r) for r in rows],
+        "next_cursor": next_cursor,
+        "total_estimate": await estimate_count(db, filtered),
+    }
 
-@router.get("/", response_model=List[schemas.ProductSaleRead])
-async def list_sales(db: AsyncSession = Depends(get_session)):
-    result = await db.execute(select(models.ProductSale))
-    return result.scalars().all()
+
+@router.get("/daily", response_model=List[schemas.SalesSeriesPoint])
+async def sales_series(
+    sku: Optional[List[str]] = Query(None),
+    channel: Optional[List[str]] = Query(None),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None, description="inclusive"),
+    interval: str = Query("day", regex="^(day|week|month)$"),
+    by_channel: bool = Query(True, description="one series per channel instead of a combined total"),
+    db: AsyncSession = Depends(get_session),
+):
+    """Units sold per day, week or month, oldest first.
+
+    Reads the ``sales_daily`` rollup, so a SKU's two-year history is a few
+    hundred rows rather than every sale. ``sku`` and ``channel`` may be
+    repeated; without ``sku`` the series covers the whole store.
+    """
+    daily = models.SalesDaily
+    period = daily.date if interval == "day" else cast(func.date_trunc(interval, daily.date), Date)
+    keys = [period.label("date")]
+    if by_channel:
+        keys.append(daily.channel.label("channel"))
+    stmt = select(*keys, func.sum(daily.quantity).label("quantity"))
+    if sku:
+        stmt = stmt.where(daily.sku.in_(sku))
+    if channel:
+        stmt = stmt.where(daily.channel.in_(channel))
+    if date_from:
+        stmt = stmt.where(daily.date >= date_from)
+    if date_to:
+        stmt = stmt.where(daily.date <= date_to)
+    stmt = stmt.group_by(*keys).order_by(*keys)
+
+    result = await db.execute(stmt)
+    return [{"channel": None, **r} for r in result.mappings().all()]
 
 
 @router.get("/{sku}", response_model=List[schemas.ProductSaleRead])
@@ -56,14 +285,21 @@ async def upload_sales_file(
     file: UploadFile = File(...),
     dry_run: bool = Query(False),
     create_missing: bool = Query(False),
+    force: bool = Query(False),
+    db: AsyncSession = Depends(get_session),
 ):
-    """Upload an Excel file from the frontend and import sales.
+    """Upload an Excel or CSV file from the frontend and queue a sales import.
+
+    Returns a ``job_id`` at once; poll ``GET /imports/{job_id}`` for progress
+    and the final report. A file that was imported before is rejected with
+    409; sales already stored are skipped either way.
 
     Query params:
     - dry_run: if true, no DB writes are performed
     - create_missing: if true, missing products are created
+    - force: if true, import a file even if it was imported before
     """
-    logger.info(f"Sales upload endpoint called - filename: {file.filename}, dry_run: {dry_run}, create_missing: {create_missing}")
+    logger.info(f"Sales upload endpoint called - filename: {file.filename}, dry_run: {dry_run}, create_missing: {create_missing}, force: {force}")
     
     # Validate file type
     if not file.filename:
@@ -80,7 +316,7 @@ async def upload_sales_file(
             detail=f"Unsupported file type. Allowed types: {', '.join(allowed_extensions)}"
         )
     
-    # save upload to a temporary file then call the async import function
+    # save upload to a temporary file; the import job deletes it when done
     suffix = file_ext or ".xlsx"
     with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
         temp_path = tmp.name
@@ -91,32 +327,95 @@ async def upload_sales_file(
         finally:
             file.file.close()
 
+    # hashed once here; the import reuses the digest to claim the file
+    sha256 = await asyncio.to_thread(file_sha256, temp_path)
+    if not force:
+        previous = await db.get(models.ImportFile, sha256)
+        if previous is not None:
+            Path(temp_path).unlink(missing_ok=True)
+            raise HTTPException(status_code=409, detail=explain_sales_error(DuplicateImportError(previous)))
+
+    async def run(path, progress):
+        try:
+            return await import_sales_func(
+                path,
+                dry_run=dry_run,
+                create_missing=create_missing,
+                progress=progress,
+                filename=file.filename,
+                force=force,
+                sha256=sha256,
+            )
+        finally:
+            # missing SKUs become new products
+            if create_missing and not dry_run:
+                invalidate_facets()
+
     try:
-        # call the import function (it is async)
-        logger.info(f"Starting sales import from: {temp_path}")
-        await import_sales_func(temp_path, dry_run=dry_run, create_missing=create_missing)
-        action = "validated" if dry_run else "imported"
-        logger.info(f"Sales data {action} successfully")
-        return {"success": True, "message": f"Sales data {action} successfully", "dry_run": dry_run, "create_missing": create_missing}
+        job_id = await jobs.submit(
+            "sales",
+            file.filename,
+            temp_path,
+            run,
+            summarize=lambda report: summarize_sales_report(report, dry_run, create_missing),
+            explain=explain_sales_error,
+            options={"dry_run": dry_run, "create_missing": create_missing, "force": force},
+        )
     except Exception as e:
-        logger.error(f"Sales import failed: {str(e)}")
-        error_msg = f"Sales import failed: {str(e)}"
-        
-        # Provide more specific error messages based on the error type
-        if "ForeignKeyViolationError" in str(e) or "violates foreign key constraint" in str(e):
-            if "product_sale_sku_fkey" in str(e):
-                error_msg = "Some products referenced in the sales data don't exist in the database. Enable 'Create missing products' option to automatically create them, or ensure all products exist before importing sales."
-        elif "No valid data found" in str(e):
-            error_msg = "No valid sales data found in the uploaded file. Please check the file format and content."
-        elif "Could not detect required columns" in str(e):
-            error_msg = "Required columns (SKU, Date, Quantity) could not be found in the file. Please check the file format."
-        elif "Column" in str(e) and "not found" in str(e):
-            error_msg = f"Required columns missing in the file: {str(e)}"
-        
-        raise HTTPException(status_code=400, detail=error_msg)
-    finally:
-        # remove temporary file
-        try:
-            Path(temp_path).unlink()
-        except Exception:
-            pass
+        Path(temp_path).unlink(missing_ok=True)
+        logger.error(f"Could not queue sales import: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Could not queue sales import: {str(e)}")
+
+    return {
+        "success": True,
+        "message": "Sales import queued",
+        "job_id": job_id,
+        "status": "queued",
+        "dry_run": dry_run,
+        "create_missing": create_missing,
+    }
+
+
+def summarize_sales_report(report: dict, dry_run: bool, create_missing: bool) -> dict:
+    """Response body for a finished sales import, stored on its job."""
+    action = "validated" if dry_run else "imported"
+    logger.info(f"Sales data {action}: processed={report['processed']} skipped={report['skipped']} errors={report['errors']}")
+    message = f"Sales data {action} successfully ({report['processed']} sales"
+    if report["duplicates"]:
+        message += f", {report['duplicates']} already imported"
+    if report["errors"]:
+        message += f", {report['errors']} rows rejected"
+    message += ")"
+    return {
+        "success": True,
+        "message": message,
+        "dry_run": dry_run,
+        "create_missing": create_missing,
+        "processed": report["processed"],
+        "skipped": report["skipped"],
+        "duplicates": report["duplicates"],
+        "created_products": report["created_products"],
+        "matched_skus": report["matched_skus"],
+        "errors": report["errors"],
+        # cap the row-level detail so a badly broken file doesn't produce a huge response
+        "bad_rows": report["bad_rows"][:MAX_REPORTED_BAD_ROWS],
+    }
+
+
+def explain_sales_error(e: Exception) -> str:
+    """User-facing message for a failed sales import."""
+    error_msg = f"Sales import failed: {str(e)}"
+    if isinstance(e, DuplicateImportError):
+        return f"{e}. Its sales are already in the database; upload with 'force' to import it again anyway."
+
+    # Provide more specific error messages based on the error type
+    if "ForeignKeyViolationError" in str(e) or "violates foreign key constraint" in str(e):
+        if "product_sale_sku_fkey" in str(e):
+            error_msg = "Some products referenced in the sales data don't exist in the database. Enable 'Create missing products' option to automatically create them, or ensure all products exist before importing sales."
+    elif "No valid data found" in str(e):
+        error_msg = "No valid sales data found in the uploaded file. Please check the file format and content."
+    elif "Could not detect required columns" in str(e):
+        error_msg = "Required columns (SKU, Date, Quantity) could not be found in the file. Please check the file format."
+    elif "Column" in str(e) and "not found" in str(e):
+        error_msg = f"Required columns missing in the file: {str(e)}"
+    return error_msg
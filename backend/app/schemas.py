@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
-from typing import List
+from typing import Dict, List
 from datetime import date
 
 
@@ -25,6 +25,12 @@ class ProductRead(ProductCreate):
     category_name: Optional[str] = None
 
 
+class ProductPage(BaseModel):
+    items: List[ProductRead]
+    next_cursor: Optional[str]  # None on the last page
+    total_estimate: Optional[int]
+
+
 class ProductSaleCreate(BaseModel):
     channel: str
     date: date
@@ -36,6 +42,64 @@ class ProductSaleRead(ProductSaleCreate):
     sale_id: int
 
 
+class SaleBatchCreate(BaseModel):
+    items: List[ProductSaleCreate]
+
+
+class SaleBatchItemResult(BaseModel):
+    index: int  # position in the request's items
+    sku: str
+    status: str  # 'created', 'unknown_sku' or 'insufficient_stock'
+    sale_id: Optional[int] = None
+
+
+class SaleBatchResult(BaseModel):
+    created: int
+    rejected: int
+    # true when this is the stored result of an earlier request with the same Idempotency-Key
+    replayed: bool = False
+    items: List[SaleBatchItemResult]
+
+
+class RestockRecommendation(BaseModel):
+    sku: str
+    stock_level: int
+    daily_demand: float
+    days_of_cover: Optional[float]  # None when there is no demand
+    safety_stock: Optional[float]
+    reorder_point: Optional[float]
+    reorder_qty: int
+    needs_reorder: bool
+
+
+class SalesSeriesPoint(BaseModel):
+    date: date  # first day of the day/week/month bucket
+    channel: Optional[str]  # None when channels are combined
+    quantity: int
+
+
+class ProductSalePage(BaseModel):
+    items: List[ProductSaleRead]
+    # pass back as ?cursor= for the next page; null on the last page
+    next_cursor: Optional[str] = None
+    # planner estimate of all matching rows, not an exact count
+    total_estimate: Optional[int] = None
+
+
 class ProductFacets(BaseModel):
     sizes: List[str]
     colors: List[str]
+    total: int  # products matching all filters
+    size_counts: Dict[str, int]
+    color_counts: Dict[str, int]
+    category_counts: Dict[int, int]
+
+
+class ProductSalesAnalytics(BaseModel):
+    sku: str
+    total_sales: int
+    last_sale_date: Optional[date] = None
+    # null when the product has never sold
+    days_since_last_sale: Optional[int] = None
+    average_daily_sales: float
+    is_active: bool
@@ -0,0 +1,183 @@
+"""Streamed response bodies for the large list and export endpoints.
+
+A paginated page is built in memory and sent in one piece; for bulk pulls
+(``format=ndjson`` or ``format=json`` on ``/sales/`` and ``/products/``) the
+rows are instead read from a server-side cursor in batches of
+``STREAM_BATCH_ROWS`` and each batch is encoded and sent before the next is
+fetched. The first bytes go out after the first batch and memory stays flat
+whatever the result size. Rows are encoded with orjson when it is installed
+and the standard library otherwise.
+
+The columnar exports read through ``copy_csv_chunks`` instead, which lets
+Postgres format the rows with ``COPY`` and hands them on in large chunks.
+"""
+import asyncio
+import contextlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Iterable, Mapping, Sequence
+
+import anyio
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+from .database import engine
+
+try:
+    import orjson
+except ImportError:  # optional; json is a drop-in, just slower
+    orjson = None
+
+STREAM_BATCH_ROWS = 1000
+COPY_CHUNK_BYTES = 8 * 2**20
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    """Compact JSON for one row."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+@contextlib.asynccontextmanager
+async def stream_connection():
+    """A connection for a streamed body that is released even if the client goes away.
+
+    Starlette cancels the body iterator when the client disconnects, which
+    would also cancel the rollback on exit and leave a connection in the
+    middle of a query in the pool. The release is shielded from that, and a
+    connection that cannot be rolled back is discarded.
+    """
+    conn = await engine.connect()
+    try:
+        yield conn
+    finally:
+        with anyio.CancelScope(shield=True):
+            try:
+                await conn.close()
+            except Exception:
+                await conn.invalidate()
+
+
+async def fetch_batches(stmt, batch_rows: int = STREAM_BATCH_ROWS) -> AsyncIterator[Sequence[Mapping]]:
+    """Rows of ``stmt`` as mappings, ``batch_rows`` at a time from a server-side cursor.
+
+    Uses its own connection so the stream does not depend on the request's
+    session staying open while the body is sent.
+    """
+    async with stream_connection() as conn:
+        # a fetch is never interrupted half-way; a disconnect lands between batches
+        with anyio.CancelScope(shield=True):
+            result = await conn.stream(stmt.execution_options(yield_per=batch_rows))
+        batches = result.mappings().partitions()
+        while True:
+            with anyio.CancelScope(shield=True):
+                batch = await anext(batches, None)
+            if batch is None:
+                break
+            yield batch
+
+
+def csv_row_boundary(data) -> int:
+    """Length of the complete CSV rows at the start of ``data``.
+
+    A newline ends a row unless it is inside a quoted value, i.e. preceded
+    by an odd number of quote characters (quotes within values are doubled).
+    """
+    end = data.rfind(b"\n")
+    while end >= 0 and data.count(b'"', 0, end) % 2:
+        end = data.rfind(b"\n", 0, end)
+    return end + 1
+
+
+async def copy_csv_chunks(stmt, chunk_bytes: int = COPY_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """Rows of ``stmt`` as CSV from ``COPY (...) TO STDOUT``, cut at row boundaries.
+
+    For bulk exports: Postgres formats the rows itself, which is several
+    times faster than fetching them through a cursor into Python objects.
+    Chunks are about ``chunk_bytes`` long and at most two are buffered ahead
+    of the consumer. Bind parameters are inlined (``COPY`` takes none).
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    pending = bytearray()
+
+    async def output(data) -> None:
+        pending.extend(data)
+        if len(pending) >= chunk_bytes:
+            cut = csv_row_boundary(pending)
+            await queue.put(bytes(pending[:cut]))
+            del pending[:cut]
+
+    async with stream_connection() as conn:
+        sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+        with anyio.CancelScope(shield=True):
+            # dates come out as YYYY-MM-DD whatever the server default
+            await conn.execute(text("SET LOCAL DateStyle TO 'ISO'"))
+            # one statement lasting as long as the download; DB_STATEMENT_TIMEOUT_MS must not cut it off
+            await conn.execute(text("SET LOCAL statement_timeout = 0"))
+            raw = (await conn.get_raw_connection()).driver_connection
+
+        async def run() -> None:
+            try:
+                await raw.copy_from_query(sql, output=output, format="csv")
+                if pending:
+                    await queue.put(bytes(pending))
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        task = asyncio.create_task(run())
+        try:
+            while (chunk := await queue.get()) is not None:
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            if not task.done():
+                # the client went away mid-export; a half-read COPY leaves
+                # the connection unusable, so it is not returned to the pool
+                with anyio.CancelScope(shield=True):
+                    task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await task
+                    await conn.invalidate()
+
+
+async def ndjson_body(batches: AsyncIterator[Iterable[Mapping]]) -> AsyncIterator[bytes]:
+    """One JSON object per line, one chunk per batch."""
+    async for batch in batches:
+        chunk = b"".join(dumps(dict(row)) + b"\n" for row in batch)
+        if chunk:
+            yield chunk
+
+
+async def json_array_body(batches: AsyncIterator[Iterable[Mapping]]) -> AsyncIterator[bytes]:
+    """A single JSON array, sent one batch of elements at a time."""
+    separator = b"["
+    async for batch in batches:
+        parts = []
+        for row in batch:
+            parts.append(separator)
+            parts.append(dumps(dict(row)))
+            separator = b","
+        if parts:
+            yield b"".join(parts)
+    # an empty result never sent the opening bracket
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def stream_rows(stmt, fmt: str) -> StreamingResponse:
+    """Streaming response with every row of ``stmt`` as NDJSON (``ndjson``) or a JSON array (``json``)."""
+    if fmt == "ndjson":
+        return StreamingResponse(ndjson_body(fetch_batches(stmt)), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(json_array_body(fetch_batches(stmt)), media_type="application/json")
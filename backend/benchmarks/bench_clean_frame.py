@@ -0,0 +1,92 @@
+"""Benchmark footer/empty-row cleaning on a synthetic 100k-row export.
+
+Compares the row-wise ``df.apply(..., axis=1)`` filtering the importers used
+before with ``app.ingest.readers.clean_frame`` and checks both keep the
+same rows.
+
+    python backend/benchmarks/bench_clean_frame.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.ingest.readers import clean_frame
+
+
+def legacy_clean(df: pd.DataFrame) -> pd.DataFrame:
+    cols = {c: c.strip() for c in df.columns}
+    df = df.rename(columns=cols)
+    mask_footer = df.apply(lambda r: r.astype(str).str.contains('Exported by|Date Time', case=False, na=False).any(), axis=1)
+    if mask_footer.any():
+        df = df.loc[~mask_footer]
+
+    def row_all_empty(row):
+        for v in row:
+            if not (pd.isna(v) or (isinstance(v, str) and v.strip() == "")):
+                return False
+        return True
+
+    return df.loc[~df.apply(row_all_empty, axis=1)]
+
+
+def make_sheet(rows: int, seed: int = 0) -> pd.DataFrame:
+    """A sales-export shaped frame with scattered empty rows and a footer."""
+    rng = np.random.default_rng(seed)
+    skus = np.array([f"SC-{i:04d}-SS-PI-F" for i in range(3000)], dtype=object)
+    channels = np.array(["TIKTOK - PAJARA OFFICIAL", "Shopee - PAJARA OFFICIAL", "LINE", "Facebook PAJARA"], dtype=object)
+    df = pd.DataFrame({
+        "ประเภท ": np.full(rows, "ขายออก", dtype=object),
+        "รายการ": rng.integers(10**11, 10**12, rows).astype(str).astype(object),
+        "ช่องทางการขาย": channels[rng.integers(0, len(channels), rows)],
+        "วันที่ทำรายการ": np.array([f"{d}/9/2025" for d in rng.integers(1, 29, rows)], dtype=object),
+        "รหัสสินค้า": skus[rng.integers(0, len(skus), rows)],
+        "ชื่อสินค้า": np.full(rows, "ชุดนอน Pajara Pajamas (Lite) ลายชินจัง", dtype=object),
+        "จำนวน": rng.integers(1, 4, rows).astype(float),
+        "หมวดหมู่": np.full(rows, "ชุดนอน Lite CRAYON SHINCHAN", dtype=object),
+    })
+    blank = rng.choice(rows, size=rows // 200, replace=False)
+    df.iloc[blank] = np.nan
+    df.iloc[blank[:10], 1] = "   "
+    footer = pd.DataFrame(
+        [[np.nan] * df.shape[1], [np.nan, "Exported by", "someone@example.com"] + [np.nan] * (df.shape[1] - 3),
+         [np.nan, "Date Time", "25/9/2025 09:25+07:00"] + [np.nan] * (df.shape[1] - 3)],
+        columns=df.columns,
+    )
+    return pd.concat([df, footer], ignore_index=True)
+
+
+def timed(fn, df, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sheet footer/empty-row cleaning")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_sheet(args.rows)
+    legacy_time, legacy_out = timed(legacy_clean, df, max(1, args.repeat // 3))
+    new_time, new_out = timed(clean_frame, df, args.repeat)
+    pd.testing.assert_frame_equal(legacy_out, new_out)
+
+    print(f"rows={len(df)} kept={len(new_out)}")
+    print(f"row-wise apply : {legacy_time * 1000:9.1f} ms")
+    print(f"clean_frame    : {new_time * 1000:9.1f} ms")
+    print(f"speed-up       : {legacy_time / new_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
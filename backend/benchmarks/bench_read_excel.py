@@ -0,0 +1,75 @@
+"""Peak memory of reading a sales export: ``pd.read_excel`` vs the streaming reader.
+
+Writes synthetic exports of the given sizes (header on the second row,
+footer at the end) and reports the tracemalloc peak of loading each one
+whole versus iterating ``app.ingest.readers.iter_excel_frames``.
+
+    python backend/benchmarks/bench_read_excel.py --rows 20000 80000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from app.ingest.readers import clean_frame, iter_excel_frames
+from bench_clean_frame import make_sheet
+
+
+def write_export(path: str, rows: int) -> None:
+    df = make_sheet(rows)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["รายงานการขาย"])
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append([None if pd.isna(v) else v for v in row])
+    wb.save(path)
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, elapsed, peak / 2**20
+
+
+def read_whole(path: str) -> int:
+    return len(clean_frame(pd.read_excel(path, engine="openpyxl", header=1)))
+
+
+def read_streaming(path: str) -> int:
+    return sum(len(chunk) for chunk in iter_excel_frames(path, header_row=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of sheet readers")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 80_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"sales_{rows}.xlsx")
+            write_export(path, rows)
+            whole_rows, whole_time, whole_peak = measure(lambda: read_whole(path))
+            stream_rows, stream_time, stream_peak = measure(lambda: read_streaming(path))
+            assert whole_rows == stream_rows
+            print(f"rows={rows:>8} kept={stream_rows}")
+            print(f"  read_excel        : {whole_time:7.2f} s  peak {whole_peak:8.1f} MiB")
+            print(f"  iter_excel_frames : {stream_time:7.2f} s  peak {stream_peak:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
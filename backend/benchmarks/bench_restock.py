@@ -0,0 +1,64 @@
+"""Time of the restock engine on a synthetic SKU x day sales history.
+
+Builds sparse daily sales for ``--skus`` products over ``--days`` days
+(each SKU sells on roughly ``--density`` of the days), then times building
+the demand matrix from (sku, day, qty) triples and ``recommend`` with both
+demand methods. The target is under a second for 20k SKUs x 730 days.
+
+    python backend/benchmarks/bench_restock.py --skus 20000 --days 730
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.forecast import demand_matrix, recommend
+
+
+def make_history(skus: int, days: int, density: float, seed: int = 0):
+    """Parallel (sku, day, qty) arrays like the rows of ``sales_daily``."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"SKU-{i:06d}" for i in range(skus)], dtype=object)
+    cells = rng.random((skus, days)) < density
+    rows, cols = np.nonzero(cells)
+    qty = rng.poisson(3, len(rows)) + 1
+    stock = rng.integers(0, 200, skus)
+    return names, names[rows], cols, qty, stock
+
+
+def timed(fn, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized restock engine")
+    parser.add_argument("--skus", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--density", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    names, sale_skus, sale_days, qty, stock = make_history(args.skus, args.days, args.density)
+    print(f"skus={args.skus} days={args.days} sales rows={len(sale_skus)}")
+
+    demand, build = timed(lambda: demand_matrix(names, sale_skus, sale_days, qty, args.days), args.repeat)
+    print(f"  demand_matrix     : {build:7.3f} s  ({demand.nbytes / 2**20:.0f} MiB)")
+    for method in ("sma", "ema"):
+        result, elapsed = timed(lambda: recommend(demand, stock, method=method), args.repeat)
+        flagged = int(result["needs_reorder"].sum())
+        print(f"  recommend({method})    : {elapsed:7.3f} s  reorder={flagged}")
+        print(f"  total ({method})       : {build + elapsed:7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,42 +4,26 @@ import sys
 from typing import Optional
 
 import pandas as pd
-from sqlalchemy import select
 
 # make sure project root is on path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from app.database import AsyncSessionLocal, engine
-from app.models import Category, Base
+from backend.app.database import ImportSessionLocal
+from backend.app.migrations import migrate
+from backend.app.ingest.categories import CategoryResolver
+from backend.app.ingest.readers import clean_frame
 
 
 def read_excel(path: str):
     # Try reading with pandas and infer header names
     df = pd.read_excel(path, engine="openpyxl")
-    # Normalize column names
-    cols = {c: c.strip() for c in df.columns}
-    df.rename(columns=cols, inplace=True)
-    # Drop trailing export metadata rows (e.g. rows containing 'Exported by' or 'Date Time')
-    # and drop rows that are entirely empty
-    # First, remove rows that contain those footer markers anywhere
-    mask_footer = df.apply(lambda r: r.astype(str).str.contains('Exported by|Date Time', case=False, na=False).any(), axis=1)
-    if mask_footer.any():
-        df = df.loc[~mask_footer]
-
-    # Drop rows where all values are NaN or empty strings
-    def row_all_empty(row):
-        for v in row:
-            if not (pd.isna(v) or (isinstance(v, str) and v.strip() == "")):
-                return False
-        return True
-
-    df = df.loc[~df.apply(row_all_empty, axis=1)]
-    return df
+    # Normalize column names and drop trailing export metadata rows
+    # (e.g. 'Exported by' / 'Date Time') as well as entirely empty rows
+    return clean_frame(df)
 
 
 async def ensure_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await migrate()
 
 
 async def import_categories(path: str):
@@ -61,39 +45,29 @@ async def import_categories(path: str):
     if id_col is None or name_col is None:
         raise ValueError("Could not detect required columns in Excel file")
 
-    async with AsyncSessionLocal() as session:
-        # insert entries, row by row; treat empty subcategory as null
-        for _, row in df.iterrows():
-            name = str(row[name_col]).strip() if not pd.isna(row[name_col]) else None
-            sub_name = None
-            if subcol and not pd.isna(row[subcol]):
-                v = str(row[subcol]).strip()
-                if v:
-                    sub_name = v
-
-            # skip empty names
-            if not name:
-                continue
-
-            # check existing by exact (name, subcategory)
-            stmt = select(Category).where(Category.name == name)
-            result = await session.execute(stmt)
-            existing = result.scalars().all()
-            matched = None
-            for e in existing:
-                if e.subcategory == sub_name:
-                    matched = e
-                    break
-
-            if matched:
+    # treat empty subcategory as null; skip empty names
+    pairs = []
+    for _, row in df.iterrows():
+        name = str(row[name_col]).strip() if not pd.isna(row[name_col]) else None
+        sub_name = None
+        if subcol and not pd.isna(row[subcol]):
+            v = str(row[subcol]).strip()
+            if v:
+                sub_name = v
+        if name:
+            pairs.append((name, sub_name))
+
+    async with ImportSessionLocal() as session:
+        # existing categories are matched on the exact (name, subcategory)
+        resolver = await CategoryResolver.from_session(session, fallback=False)
+        for name, sub_name in dict.fromkeys(pairs):
+            if (name, sub_name) in resolver:
                 print(f"Skipping existing: {name} / {sub_name}")
-                continue
-
-            new_cat = Category(name=name, subcategory=sub_name)
-            session.add(new_cat)
-            await session.commit()
-            await session.refresh(new_cat)
-            print(f"Inserted: {new_cat.category_id} - {new_cat.name} / {new_cat.subcategory}")
+        created = await resolver.create(session, pairs)
+        await session.commit()
+    for category_id, name, sub_name in created:
+        print(f"Inserted: {category_id} - {name} / {sub_name}")
+    return created
 
 
 def main():
@@ -1,132 +1,28 @@
 import asyncio
 import os
 import sys
-from typing import Optional
 
 import pandas as pd
-from sqlalchemy import select, text
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 # ensure project root is importable
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from app.database import AsyncSessionLocal, engine
-from app.models import Category, Product, Base
+from backend.app.database import ImportSessionLocal
+from backend.app.models import Product
+from backend.app.ingest.categories import CategoryResolver
+from backend.app.ingest.normalize import normalize_product_frame
+from backend.app.ingest.pipeline import parse_chunks
+from backend.app.ingest.readers import estimate_rows
 
-import re
 
-# Allowed size tokens (normalized form)
-ALLOWED_SIZES = {"XS", "S", "M", "L", "XL", "XXL", "2XL", "3XL", "F", "FF"}
+# Rows per INSERT ... ON CONFLICT statement. Product has 9 columns, so this
+# stays well below the 32767 bind-parameter limit of the Postgres protocol.
+UPSERT_BATCH_SIZE = 1000
 
 
-def normalize_size(raw: Optional[str]) -> Optional[str]:
-    """Normalize a raw size string and return a canonical token if allowed.
-
-    Rules:
-    - Trim and uppercase.
-    - Replace common separators/spaces.
-    - Map common synonyms (e.g. "XXL" and "2XL").
-    - If the result contains only digits (e.g., "42") or looks like a numeric range, return None.
-    - Only return values in ALLOWED_SIZES.
-    """
-    if not raw:
-        return None
-    s = str(raw).strip().upper()
-    if not s:
-        return None
-    # Take first part if slash or comma separated
-    if '/' in s:
-        s = s.split('/')[0].strip()
-    if ',' in s:
-        s = s.split(',')[0].strip()
-    # Remove whitespace
-    s = s.replace(' ', '')
-    # Common normalization: allow both XXL and 2XL -> normalize to XXL and include 2XL as allowed
-    # Convert forms like '2XL' -> '2XL' (kept), 'XXL' -> 'XXL'
-    # If string is purely numeric or looks like a numeric-range, ignore
-    if re.fullmatch(r"\d+(?:[-–]\d+)?", s):
-        return None
-    # Standardize some common variants
-    # Map 'XXL' and synonyms: keep as-is
-    if s in ALLOWED_SIZES:
-        return s
-    # Try to map repeated X forms like 'XXXXL' to nearest known token (simple heuristic)
-    if s.endswith('XL') and s.count('X') >= 2:
-        # e.g. 'XXXL' or 'XXXXL' -> '3XL' if 3 Xs, else cap to '3XL'
-        xcount = s.count('X')
-        if xcount == 3:
-            return '3XL' if '3XL' in ALLOWED_SIZES else None
-        if xcount == 2:
-            return 'XXL' if 'XXL' in ALLOWED_SIZES else None
-    # Map one-size tokens
-    if s in ('ONE', 'ONESIZE', 'OS'):
-        return 'F' if 'F' in ALLOWED_SIZES else None
-    # Accept forms like '2X' or '2XL' normalize to '2XL'
-    m = re.match(r'^(2|3)[Xx](?:L)?$', s)
-    if m:
-        tok = (m.group(1) + 'XL').upper()
-        if tok in ALLOWED_SIZES:
-            return tok
-    return None
-
-
-def normalize_color(raw: Optional[str]) -> Optional[str]:
-    """Return a cleaned color string or None.
-
-    Rules:
-    - Trim; if value is numeric-only (e.g., '01', '123') return None.
-    - If contains letters, return trimmed string (preserve original case except surrounding whitespace).
-    - If comma-separated, take first token.
-    """
-    if not raw:
-        return None
-    s = str(raw).strip()
-    if not s:
-        return None
-    # If comma-separated, take first non-empty
-    if ',' in s:
-        parts = [p.strip() for p in s.split(',') if p.strip()]
-        s = parts[0] if parts else s
-    if '/' in s:
-        s = s.split('/')[0].strip()
-    # If contains any letter, accept. If only digits or punctuation, reject.
-    if re.search(r'[A-Za-zก-ฮ]', s):
-        return s
-    # If it's something like '01' or '123' reject
-    if re.fullmatch(r'[\d\W_]+', s):
-        return None
-    # If contains digits but also letters, accept (e.g., 'Red1')
-    if re.search(r'\d', s) and not re.search(r'[A-Za-zก-ฮ]', s):
-        return None
-    return s
-
-
-def read_excel(path: str):
-    # Header is on second row (index 1)
-    df = pd.read_excel(path, engine="openpyxl", header=1)
-    # Normalize column names
-    cols = {c: c.strip() for c in df.columns}
-    df.rename(columns=cols, inplace=True)
-    # Drop footer metadata and empty rows
-    mask_footer = df.apply(lambda r: r.astype(str).str.contains('Exported by|Date Time', case=False, na=False).any(), axis=1)
-    if mask_footer.any():
-        df = df.loc[~mask_footer]
-
-    def row_all_empty(row):
-        for v in row:
-            if not (pd.isna(v) or (isinstance(v, str) and v.strip() == "")):
-                return False
-        return True
-
-    df = df.loc[~df.apply(row_all_empty, axis=1)]
-    return df
-
-
-async def import_products(path: str, dry_run: bool = False):
-    df = read_excel(path)
-
-    # no mappings are loaded; importer will not populate human-readable name columns
-
-    # detect columns
+def detect_product_columns(df: pd.DataFrame):
     sku_col = None
     name_col = None
     cat_col = None
@@ -146,165 +42,223 @@ async def import_products(path: str, dry_run: bool = False):
             qty_col = c
 
     if not all([sku_col, name_col, cat_col, qty_col]):
-        raise ValueError("Could not detect required columns in product Excel file")
-
-    async with AsyncSessionLocal() as session:
-        for _, row in df.iterrows():
-            sku = str(row[sku_col]).strip() if not pd.isna(row[sku_col]) else None
-            if not sku:
-                continue
-            prod_name = str(row[name_col]).strip() if not pd.isna(row[name_col]) else None
-
-            raw_cat = str(row[cat_col]).strip() if not pd.isna(row[cat_col]) else ""
-            sub_name = None
-            if subcol and not pd.isna(row[subcol]):
-                s = str(row[subcol]).strip()
-                if s:
-                    sub_name = s
-
-            # Special-case: some category fields contain combined 'แถม คริสต์มาส' => main 'แถม', sub 'คริสต์มาส'
-            if raw_cat.startswith("แถม") and (not sub_name):
-                parts = raw_cat.split()
-                if len(parts) > 1:
-                    main_cat = parts[0]
-                    sub_name = " ".join(parts[1:])
-                else:
-                    main_cat = raw_cat
+        raise ValueError("Could not detect required columns in product file")
+    return {"sku": sku_col, "name": name_col, "category": cat_col, "subcategory": subcol, "quantity": qty_col}
+
+
+def merge_product_row(old: dict, new: dict) -> dict:
+    """Apply ``new`` on top of ``old`` with the importer's update rules.
+
+    Name, prefix, design code, pattern and color are only overwritten when the
+    incoming value is present; category, stock and size always follow the
+    latest row. This is the Python twin of the ON CONFLICT clause in
+    ``bulk_upsert_products`` and is used to fold repeated SKUs within a file.
+    """
+    merged = dict(new)
+    for key in ("name", "prefix", "design_code", "pattern", "color"):
+        merged[key] = new.get(key) or old.get(key)
+    if not merged["name"]:
+        merged["name"] = ""
+    return merged
+
+
+def fold_duplicate_skus(rows):
+    """Collapse rows sharing a SKU into one, keeping first-seen order.
+
+    A single INSERT ... ON CONFLICT cannot touch the same row twice, so later
+    occurrences are merged into the earlier one exactly as a sequential
+    import would have applied them.
+    """
+    folded = {}
+    for r in rows:
+        prev = folded.get(r["sku"])
+        folded[r["sku"]] = merge_product_row(prev, r) if prev is not None else r
+    return list(folded.values())
+
+
+async def resolve_categories(session, resolver: CategoryResolver, rows, dry_run: bool) -> None:
+    """Set ``category_id`` on every row, creating missing categories in one insert.
+
+    Each distinct (main_cat, sub_name) pair is resolved once per import. New
+    categories are flushed, not committed, so they share the import's
+    transaction. In dry-run mode nothing is written and their rows get None.
+    """
+    pairs = [(r["main_cat"], r["sub_name"]) for r in rows]
+    if dry_run:
+        for name, sub_name in resolver.missing(pairs):
+            print(f"Would create category: {name} / {sub_name}")
+            resolver.add(name, sub_name, None)
+    else:
+        for category_id, name, sub_name in await resolver.create(session, pairs):
+            print(f"Created category: {category_id} - {name} / {sub_name}")
+    for row, (name, sub_name) in zip(rows, pairs):
+        row["category_id"] = resolver.resolve(name, sub_name)
+
+
+PRODUCT_FIELDS = ("sku", "name", "category_id", "stock_level", "size", "prefix", "design_code", "pattern", "color")
+
+
+def _product_values(row: dict) -> dict:
+    return {k: row[k] for k in PRODUCT_FIELDS}
+
+
+def changed_fields(current: dict, row: dict) -> list:
+    """Columns an import of ``row`` would change on the stored product ``current``.
+
+    Applies the update rules of ``merge_product_row``, so an empty name or
+    color in the file is not a change. An empty list means the row can be
+    skipped.
+    """
+    merged = _product_values(merge_product_row(current, row))
+    return [k for k in PRODUCT_FIELDS if merged[k] != current[k]]
+
+
+async def fetch_stored_products(session, skus, batch_size: int = UPSERT_BATCH_SIZE) -> dict:
+    """Current column values of the products among ``skus``, keyed by SKU."""
+    columns = [getattr(Product, k) for k in PRODUCT_FIELDS]
+    stored = {}
+    for start in range(0, len(skus), batch_size):
+        res = await session.execute(select(*columns).where(Product.sku.in_(skus[start:start + batch_size])))
+        stored.update((row.sku, dict(row._mapping)) for row in res)
+    return stored
+
+
+async def skip_unchanged_products(session, rows, seen, report: dict) -> list:
+    """Drop rows that would leave their stored product as it is.
+
+    One snapshot query per chunk replaces the blind upsert of every row:
+    unchanged products are counted in ``report["unchanged"]`` and the
+    columns that do change are tallied in ``report["changes"]``. SKUs in
+    ``seen`` were counted by an earlier chunk and are not counted again.
+    """
+    stored = await fetch_stored_products(session, [r["sku"] for r in rows])
+    pending = []
+    for row in rows:
+        current = stored.get(row["sku"])
+        fields = changed_fields(current, row) if current is not None else None
+        if fields == []:
+            if row["sku"] not in seen:
+                report["unchanged"] += 1
+            continue
+        pending.append(row)
+        if fields and row["sku"] not in seen:
+            for field in fields:
+                report["changes"][field] = report["changes"].get(field, 0) + 1
+    return pending
+
+
+async def bulk_upsert_products(session, rows, batch_size: int = UPSERT_BATCH_SIZE):
+    """Write product rows with batched INSERT ... ON CONFLICT (sku) DO UPDATE.
+
+    Rows must already carry ``category_id`` and be free of duplicate SKUs
+    (see ``fold_duplicate_skus``). Returns ``(inserted, updated)``; the
+    caller owns the transaction.
+    """
+    inserted = 0
+    updated = 0
+    for start in range(0, len(rows), batch_size):
+        batch = [_product_values(r) for r in rows[start:start + batch_size]]
+        stmt = pg_insert(Product).values(batch)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.sku],
+            set_={
+                "name": func.coalesce(func.nullif(excluded.name, ""), Product.name),
+                "category_id": excluded.category_id,
+                "stock_level": excluded.stock_level,
+                "size": excluded.size,
+                "prefix": func.coalesce(excluded.prefix, Product.prefix),
+                "design_code": func.coalesce(excluded.design_code, Product.design_code),
+                "pattern": func.coalesce(excluded.pattern, Product.pattern),
+                "color": func.coalesce(excluded.color, Product.color),
+            },
+        ).returning(Product.sku, literal_column("(xmax = 0)").label("inserted"))
+        res = await session.execute(stmt)
+        for _, was_inserted in res.all():
+            if was_inserted:
+                inserted += 1
             else:
-                main_cat = raw_cat
-
-            # parse qty as int from float
-            qty = 0
-            if not pd.isna(row[qty_col]):
-                try:
-                    qty = int(float(row[qty_col]))
-                except Exception:
-                    qty = 0
-
-            # parse SKU from the back so we don't accidentally assign color into pattern
-            def extract_size(sku_str: str) -> Optional[str]:
-                if not sku_str:
-                    return None
-                parts = sku_str.split("-")
-                last = parts[-1].strip()
-                # size is the last dash-separated segment (do not split on '/')
-                if last == "":
-                    return None
-                return last
-
-            size_val = extract_size(sku)
-            size_val = normalize_size(size_val)
-            sku_parts = [p.strip() for p in sku.split("-") if p.strip() != ""]
-            prefix_val = sku_parts[0] if len(sku_parts) > 0 else None
-            design_val = sku_parts[1] if len(sku_parts) > 1 else None
-
-            # work from the back: base_parts are everything except the size segment
-            base_parts = sku_parts[:-1] if len(sku_parts) >= 2 else sku_parts
-            pattern_val = None
-            color_val = None
-
-            if base_parts:
-                last_base = base_parts[-1]
-                # do NOT split last_base on '/'; treat it as the full color code
-                if last_base != size_val:
-                    color_val = last_base
-            # normalize color (ignore numeric-only color codes)
-            color_val = normalize_color(color_val)
-
-            # Try to detect an explicit pattern that sits before the color (if present)
-            if len(base_parts) >= 3:
-                candidate = base_parts[-2]
-                # avoid treating numeric design codes as pattern (e.g. '0049')
-                if candidate and not candidate.isdigit():
-                    pattern_val = pattern_val or candidate
-
-            # guard: if pattern was inferred but equals the color, drop it
-            if pattern_val and color_val and pattern_val == color_val:
-                pattern_val = None
-            # also avoid color equal to size
-            if color_val and size_val and color_val == size_val:
-                color_val = None
-
-
-            # find or create category
-            stmt = select(Category).where(Category.name == main_cat)
-            res = await session.execute(stmt)
-            candidates = res.scalars().all()
-            cat_obj = None
-            for c in candidates:
-                if c.subcategory == sub_name:
-                    cat_obj = c
-                    break
-
-            if cat_obj is None:
-                # try match with null subcategory
-                for c in candidates:
-                    if c.subcategory is None:
-                        cat_obj = c
-                        break
-
-            if cat_obj is None:
-                if dry_run:
-                    print(f"Would create category: {main_cat} / {sub_name}")
-                    # create a lightweight stub to use for messaging (no category_id)
-                    class _Stub:
-                        def __init__(self, name, sub):
-                            self.category_id = None
-                            self.name = name
-                            self.subcategory = sub
-
-                    cat_obj = _Stub(main_cat, sub_name)
-                else:
-                    # create new category entry
-                    cat_obj = Category(name=main_cat, subcategory=sub_name)
-                    session.add(cat_obj)
-                    await session.commit()
-                    await session.refresh(cat_obj)
-                    print(f"Created category: {cat_obj.category_id} - {cat_obj.name} / {cat_obj.subcategory}")
-
-            # upsert product
-            prod = await session.get(Product, sku)
-            if prod:
-                if dry_run:
-                    print(f"Would update product: {prod.sku} -> category {cat_obj.name} / {cat_obj.subcategory}, stock {qty}, size {size_val}")
-                else:
-                    prod.name = prod_name or prod.name
-                    prod.category_id = cat_obj.category_id
-                    prod.stock_level = qty
-                    prod.size = size_val
-                    # update parsed sku parts as well
-                    prod.prefix = prefix_val or prod.prefix
-                    prod.design_code = design_val or prod.design_code
-                    # only update pattern if it is present and distinct from color
-                    if pattern_val and pattern_val != (color_val or prod.pattern):
-                        prod.pattern = pattern_val
-                    prod.color = color_val or prod.color
-                    session.add(prod)
-                    await session.commit()
-                    await session.refresh(prod)
-                    print(f"Updated product: {prod.sku} -> category {prod.category_id}, stock {prod.stock_level}, size {prod.size}, prefix {prod.prefix}, design {prod.design_code}, pattern {prod.pattern}, color {prod.color}")
+                updated += 1
+    return inserted, updated
+
+
+async def import_products(path: str, dry_run: bool = False, progress=None, incremental: bool = False):
+    """Import products from a stock export and return insert/update counts.
+
+    The sheet is streamed in chunks of ``READ_CHUNK_ROWS`` rows, so memory
+    stays flat however large the export is, and parsed in the worker
+    processes of ``app.ingest.pipeline`` so the event loop stays free. Each
+    chunk is written with batched upserts and the whole file is committed
+    once. An ``ImportProgress`` passed as ``progress`` is updated after every
+    chunk.
+
+    With ``incremental`` each chunk is compared against the stored products
+    first and only new or changed rows are written; the report then counts
+    the ``unchanged`` ones and how often each column ``changes``.
+    """
+    report = {"rows": 0, "skipped": 0, "inserted": 0, "updated": 0, "duplicates": 0, "unchanged": 0, "changes": {}}
+    # SKUs already handled by an earlier row, so repeats across chunks are
+    # reported as duplicates rather than as fresh inserts/updates
+    seen = set()
+    rows_read = 0
+    if progress is not None:
+        progress.start(estimate_rows(path, header_row=1))
+
+    async with ImportSessionLocal() as session:
+        categories = await CategoryResolver.from_session(session)
+        async for chunk in parse_chunks(path, detect_product_columns, normalize_product_frame, header_row=1):
+            rows = chunk.records()
+            report["rows"] += len(rows)
+            report["skipped"] += chunk.skipped
+
+            await resolve_categories(session, categories, rows, dry_run)
+
+            unique_rows = fold_duplicate_skus(rows)
+            repeats = sum(1 for r in unique_rows if r["sku"] in seen)
+            report["duplicates"] += len(rows) - len(unique_rows) + repeats
+            chunk_skus = [r["sku"] for r in unique_rows]
+
+            if incremental:
+                unique_rows = await skip_unchanged_products(session, unique_rows, seen, report)
+                repeats = sum(1 for r in unique_rows if r["sku"] in seen)
+
+            if dry_run:
+                skus = [r["sku"] for r in unique_rows if r["sku"] not in seen]
+                existing = set()
+                for start in range(0, len(skus), UPSERT_BATCH_SIZE):
+                    res = await session.execute(select(Product.sku).where(Product.sku.in_(skus[start:start + UPSERT_BATCH_SIZE])))
+                    existing.update(res.scalars().all())
+                report["updated"] += len(existing)
+                report["inserted"] += len(skus) - len(existing)
             else:
-                if dry_run:
-                    print(f"Would insert product: {sku} -> category {cat_obj.name} / {cat_obj.subcategory}, stock {qty}, size {size_val}")
-                else:
-                    # avoid storing pattern equal to color
-                    if pattern_val and color_val and pattern_val == color_val:
-                        store_pattern = None
-                    else:
-                        store_pattern = pattern_val
-                    prod = Product(sku=sku, name=prod_name or "", category_id=cat_obj.category_id, stock_level=qty, size=size_val, prefix=prefix_val, design_code=design_val, pattern=store_pattern, color=color_val)
-                    # no mapping/population of prefix_name/pattern_name/color_name per user request
-                    session.add(prod)
-                    await session.commit()
-                    await session.refresh(prod)
-                    print(f"Inserted product: {prod.sku} -> category {prod.category_id}, stock {prod.stock_level}, size {prod.size}, prefix {prod.prefix}, design {prod.design_code}, pattern {prod.pattern}, color {prod.color}")
+                inserted, updated = await bulk_upsert_products(session, unique_rows)
+                report["inserted"] += inserted
+                # repeats were written by an earlier chunk, so they always come back as updates
+                report["updated"] += updated - repeats
+            seen.update(chunk_skus)
+            rows_read += chunk.rows
+            if progress is not None:
+                progress.update(rows_read, report)
+
+        if dry_run:
+            print(f"Would insert {report['inserted']} and update {report['updated']} products")
+            if incremental:
+                print(f"Unchanged: {report['unchanged']}, changed columns: {report['changes']}")
+            return report
+        await session.commit()
+
+    print(f"Import complete. Inserted: {report['inserted']}, Updated: {report['updated']}, Skipped: {report['skipped']}, Duplicates: {report['duplicates']}")
+    if incremental:
+        print(f"Unchanged: {report['unchanged']}, changed columns: {report['changes']}")
+    return report
 
 
 def main():
     import argparse
-    parser = argparse.ArgumentParser(description="Import products from Excel into DB (header on second row)")
-    parser.add_argument("file", help="Path to Excel file (.xlsx)")
+    parser = argparse.ArgumentParser(description="Import products from an Excel or CSV export into DB")
+    parser.add_argument("file", help="Path to Excel (.xlsx) or CSV file")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be done without writing to the database")
+    parser.add_argument("--incremental", action="store_true", help="Only write products that are new or changed")
     args = parser.parse_args()
 
     # reconstruct path robustly: prefer argparse value if it points to an existing file
@@ -321,7 +275,7 @@ def main():
         file_path = raw_path.strip().strip('"').strip("'")
 
     async def _run():
-        await import_products(file_path, dry_run=args.dry_run)
+        await import_products(file_path, dry_run=args.dry_run, incremental=args.incremental)
 
     asyncio.run(_run())
 
@@ -1,40 +1,23 @@
 import asyncio
 import os
 import sys
-from datetime import datetime
+from functools import partial
 from typing import Optional
 
 import pandas as pd
-from sqlalchemy import select
+from sqlalchemy import column, select, table, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 # make project root importable
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from app.database import AsyncSessionLocal
-from app.models import ProductSale, Product
-
-
-def read_excel(path: str) -> pd.DataFrame:
-    # Header is on second row in the exports this project uses
-    df = pd.read_excel(path, engine="openpyxl", header=1)
-    # strip column names
-    cols = {c: c.strip() for c in df.columns}
-    df.rename(columns=cols, inplace=True)
-
-    # drop footer rows that contain export metadata
-    mask_footer = df.apply(lambda r: r.astype(str).str.contains('Exported by|Date Time', case=False, na=False).any(), axis=1)
-    if mask_footer.any():
-        df = df.loc[~mask_footer]
-
-    # drop fully empty rows
-    def row_all_empty(row):
-        for v in row:
-            if not (pd.isna(v) or (isinstance(v, str) and v.strip() == "")):
-                return False
-        return True
-
-    df = df.loc[~df.apply(row_all_empty, axis=1)]
-    return df
+from backend.app.database import ImportSessionLocal
+from backend.app.models import ImportFile, ProductSale, Product
+from backend.app.ingest.normalize import normalize_sales_frame
+from backend.app.ingest.pipeline import parse_chunks
+from backend.app.ingest.readers import estimate_rows, file_sha256
+from backend.app.ingest.sku_resolver import SkuResolver
+from backend.app.rollup import add_sales
 
 
 def detect_columns(df: pd.DataFrame):
@@ -64,223 +47,289 @@ def detect_columns(df: pd.DataFrame):
     return col_map
 
 
-def normalize_channel(raw: Optional[str]) -> str:
-    if raw is None or (isinstance(raw, float) and pd.isna(raw)):
-        return "unknown"
-    s = str(raw).strip()
-    if s == "":
-        return "unknown"
-    # Examples of raw values: "TIKTOK - PAJARA OFFICIAL", "Facebook PAJARA", "Shopee"
-    # Strategy: split on common separators, remove tokens like 'PAJARA' and 'OFFICIAL', then
-    # return the remaining channel name (preserve case except trim).
-    # split on hyphen first, otherwise split on slash or multiple spaces
-    parts = [p.strip() for p in s.replace("/", " - ").split("-") if p.strip()]
-    # take the first non-empty part as the candidate (this often contains the actual channel)
-    candidate = parts[0] if parts else s
-    # remove tokens 'PAJARA' and 'OFFICIAL' from candidate or trailing tokens
-    tokens = [t.strip() for t in candidate.split() if t.strip()]
-    filtered = [t for t in tokens if t.upper() not in ("PAJARA", "OFFICIAL")]
-    if filtered:
-        return " ".join(filtered)
-    # if nothing left after filtering, fallback to 'unknown'
-    return "unknown"
-
-
-def parse_date(raw) -> Optional[datetime.date]:
-    if pd.isna(raw):
-        return None
-    if isinstance(raw, datetime):
-        return raw.date()
-    # pandas may parse dates as Timestamp
-    try:
-        parsed = pd.to_datetime(raw, errors="coerce")
-        if pd.isna(parsed):
-            return None
-        return parsed.date()
-    except Exception:
-        return None
-
-
-async def import_sales(path: str, dry_run: bool = False, create_missing: bool = False):
-    df = read_excel(path)
+def detect_required_columns(df: pd.DataFrame):
+    """``detect_columns``, raising when sku, quantity or date is missing."""
     cols = detect_columns(df)
-
     if not cols["sku"] or not cols["quantity"] or not cols["date"]:
-        raise ValueError("Could not detect required columns (sku, quantity, date) in sales Excel file")
-
-    print(f"Starting sales import: {len(df)} rows, dry_run={dry_run}, create_missing={create_missing}")
-    
-    processed = 0
-    skipped = 0
-    created_products = 0
-    matched_skus = 0
-    errors = 0
-
-    async with AsyncSessionLocal() as session:
-        for _, row in df.iterrows():
-            sku = None
-            if not pd.isna(row[cols["sku"]]):
-                sku = str(row[cols["sku"]]).strip()
-            if not sku or sku == "nan":
-                # skip rows without sku
-                skipped += 1
-                continue
-
-            qty = 0
-            if not pd.isna(row[cols["quantity"]]):
-                try:
-                    qty = int(float(row[cols["quantity"]]))
-                except Exception:
-                    qty = 0
-
-            chan = normalize_channel(row[cols["channel"]]) if cols.get("channel") else "unknown"
-            date_val = parse_date(row[cols["date"]])
-            if date_val is None:
-                # if date missing, skip the row
-                skipped += 1
-                continue
-
-            # ensure product exists
-            prod = await session.get(Product, sku)
-            original_sku = sku  # Keep track of the original SKU from sales data
-            
-            # Enhanced fallback matching for SKUs with suffixes
-            if prod is None:
-                print(f"Product not found for exact SKU: {sku}, attempting fallback matching...")
-                try:
-                    # Try multiple matching strategies:
-                    
-                    # Strategy 1: Find products whose SKU starts with the sales SKU
-                    # (e.g., 'SC-0020-SS-PI-FF' matches 'SC-0020-SS-PI-FF\CL')
-                    stmt = select(Product).where(Product.sku.like(f"{sku}%"))
-                    res = await session.execute(stmt)
-                    candidates = res.scalars().all()
-                    
-                    if candidates:
-                        print(f"Found {len(candidates)} candidates using prefix match: {[p.sku for p in candidates]}")
-                        
-                        if len(candidates) == 1:
-                            prod = candidates[0]
-                            sku = prod.sku  # Use the actual SKU for the sale record
-                            matched_skus += 1
-                            print(f"Matched '{original_sku}' to '{sku}'")
-                        else:
-                            # Multiple candidates: prefer exact prefix matches with common suffixes
-                            # Priority: \CL > /CL > -CL > others, then by shortest length
-                            priority_suffixes = [r'\CL', '/CL', '-CL']
-                            best_candidate = None
-                            
-                            for suffix in priority_suffixes:
-                                exact_match = next((p for p in candidates if p.sku == f"{original_sku}{suffix}"), None)
-                                if exact_match:
-                                    best_candidate = exact_match
-                                    break
-                            
-                            if not best_candidate:
-                                # No priority suffix match, choose shortest SKU (likely most basic variant)
-                                candidates.sort(key=lambda p: len(p.sku))
-                                best_candidate = candidates[0]
-                            
-                            prod = best_candidate
-                            sku = prod.sku  # Use the actual SKU for the sale record
-                            matched_skus += 1
-                            print(f"Multiple matches found, selected '{sku}' for '{original_sku}'")
-                    
-                    # Strategy 2: If no prefix matches, try finding products where sales SKU is a prefix
-                    # (e.g., handle cases where sales has 'ABC-123-XL' but DB has 'ABC-123')
-                    if prod is None:
-                        stmt = select(Product).where(Product.sku.like(f"%{sku.split('-')[0]}%"))
-                        res = await session.execute(stmt)
-                        broad_candidates = res.scalars().all()
-                        
-                        # Filter to those that could be matches (same base pattern)
-                        potential_matches = []
-                        sku_parts = sku.split('-')
-                        for candidate in broad_candidates:
-                            candidate_parts = candidate.sku.replace('\\', '-').replace('/', '-').split('-')
-                            # Check if major parts match (allowing for extra suffixes)
-                            if len(candidate_parts) >= len(sku_parts):
-                                match = True
-                                for i, part in enumerate(sku_parts):
-                                    if i < len(candidate_parts) and candidate_parts[i] != part:
-                                        match = False
-                                        break
-                                if match:
-                                    potential_matches.append(candidate)
-                        
-                        if potential_matches:
-                            print(f"Found {len(potential_matches)} potential matches: {[p.sku for p in potential_matches]}")
-                            potential_matches.sort(key=lambda p: len(p.sku))
-                            prod = potential_matches[0]
-                            sku = prod.sku
-                            matched_skus += 1
-                            print(f"Broad match: '{original_sku}' to '{sku}'")
-                        
-                except Exception as e:
-                    print(f"Error during fallback matching: {e}")
-                    prod = None
-
-            if prod is None:
-                # If product not found, check if we should create it or skip
-                if create_missing:
-                    if dry_run:
-                        # report what would be created/inserted in dry-run mode
-                        print(f"Would create product SKU={sku} (minimal) and insert sale: sku={sku}, date={date_val}, qty={qty}, channel={chan}")
-                        continue
+        raise ValueError("Could not detect required columns (sku, quantity, date) in sales file")
+    return cols
+
+
+# Sheet row (0-based) holding the column headers in Excel exports; data
+# starts right after it. CSV headers are located by iter_frames.
+HEADER_ROW = 1
+# Sales rows written per COPY / multi-row INSERT. Each chunk runs in its own
+# savepoint so a bad row only costs a retry of its chunk.
+SALES_CHUNK_SIZE = 5000
+SALE_COLUMNS = ("channel", "date", "sku", "quantity", "occurrence")
+# Natural key of an imported sale (unique index ux_product_sale_natural_key)
+SALE_KEY = ("sku", "date", "channel", "quantity", "occurrence")
+# Session-local table each chunk is copied into before it is merged
+STAGE_TABLE = "product_sale_stage"
+
+
+class DuplicateImportError(ValueError):
+    """The uploaded file has been imported before."""
+
+    def __init__(self, previous: ImportFile):
+        self.previous = previous
+        when = previous.imported_at.strftime("%Y-%m-%d %H:%M")
+        super().__init__(f"File already imported as '{previous.filename}' on {when}")
+
+
+async def resolve_skus(session, resolver: SkuResolver, skus, create_missing: bool = False, dry_run: bool = False):
+    """Map each distinct sales SKU to a catalog SKU (or None).
+
+    ``skus`` must be in first-appearance order. Matching runs against the
+    in-memory ``resolver``, which is built once per import and shared by
+    every chunk of the file. With ``create_missing`` an unmatched SKU gets a minimal product right
+    away and joins the resolver, so later SKUs can still match it the way the
+    old row-by-row import did. Returns ``(resolved, created)``.
+    """
+    resolved = {}
+    created = []
+    for sku in skus:
+        match = resolver.resolve(sku)
+        if match is not None:
+            if match != sku:
+                print(f"Matched '{sku}' to '{match}'")
+        elif create_missing and not dry_run:
+            # Create minimal product record so sales can be linked
+            await session.execute(
+                pg_insert(Product)
+                .values(sku=sku, name=f"Auto-created for {sku}", stock_level=0)
+                .on_conflict_do_nothing(index_elements=[Product.sku])
+            )
+            resolver.add(sku)
+            match = sku
+            created.append(sku)
+            print(f"Created missing product: {sku}")
+        resolved[sku] = match
+    return resolved, created
+
+
+def number_occurrences(sales, counts: dict) -> None:
+    """Set each sale's ``occurrence``: 1 + the identical rows before it in the file.
+
+    ``counts`` carries the tally from chunk to chunk. Numbering is stable, so
+    an export that overlaps an earlier one yields the same natural keys for
+    the rows they share.
+    """
+    for s in sales:
+        key = (s["sku"], s["date"], s["channel"], s["quantity"])
+        counts[key] = s["occurrence"] = counts.get(key, 0) + 1
+
+
+def _skip_known(stmt):
+    """Make a product_sale insert skip rows whose natural key is already stored."""
+    return stmt.on_conflict_do_nothing(
+        index_elements=[getattr(ProductSale, c) for c in SALE_KEY],
+        index_where=ProductSale.occurrence.isnot(None),
+    ).returning(ProductSale.channel, ProductSale.date, ProductSale.sku, ProductSale.quantity)
+
+
+async def _copy_sales(session, records):
+    """COPY sale tuples into the staging table and merge them into product_sale.
+
+    Returns the rows that were actually inserted.
+    """
+    await session.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} "
+        "(channel VARCHAR, date DATE, sku VARCHAR, quantity INTEGER, occurrence INTEGER) ON COMMIT DROP"
+    ))
+    await session.execute(text(f"TRUNCATE {STAGE_TABLE}"))
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(STAGE_TABLE, records=records, columns=list(SALE_COLUMNS))
+    stage = table(STAGE_TABLE, *(column(c) for c in SALE_COLUMNS))
+    res = await session.execute(_skip_known(pg_insert(ProductSale).from_select(list(SALE_COLUMNS), select(stage))))
+    return res.mappings().all()
+
+
+async def write_sales_chunk(session, chunk) -> int:
+    """Insert one chunk of sales and add the new ones to the ``sales_daily`` rollup.
+
+    Sales go in with COPY into a staging table on asyncpg, multi-row INSERT
+    elsewhere; either way rows already imported (same natural key) are
+    skipped, and only inserted rows reach the rollup. Both writes share the
+    caller's savepoint. Returns the number of sales inserted.
+    """
+    conn = await session.connection()
+    if conn.dialect.driver == "asyncpg":
+        inserted = await _copy_sales(session, [tuple(s[c] for c in SALE_COLUMNS) for s in chunk])
+    else:
+        stmt = _skip_known(pg_insert(ProductSale).values([{c: s[c] for c in SALE_COLUMNS} for s in chunk]))
+        inserted = (await session.execute(stmt)).mappings().all()
+    await add_sales(session, inserted)
+    return len(inserted)
+
+
+async def insert_sales(session, sales, chunk_size: int = SALES_CHUNK_SIZE):
+    """Write sales in chunks inside savepoints; return (inserted, bad_rows).
+
+    ``inserted`` leaves out sales that were already imported. When a chunk
+    fails its savepoint is rolled back and its rows are retried one by one,
+    so only the offending rows are reported and dropped.
+    """
+    inserted = 0
+    bad_rows = []
+    for start in range(0, len(sales), chunk_size):
+        chunk = sales[start:start + chunk_size]
+        try:
+            async with session.begin_nested():
+                inserted += await write_sales_chunk(session, chunk)
+            continue
+        except Exception as e:
+            print(f"Chunk starting at line {chunk[0]['line']} failed ({e}); retrying row by row")
+
+        for sale in chunk:
+            try:
+                async with session.begin_nested():
+                    inserted += await write_sales_chunk(session, [sale])
+            except Exception as e:
+                bad_rows.append({"line": sale["line"], "sku": sale["sku"], "error": str(e)})
+                print(f"ERROR: Failed to insert sale for SKU {sale['sku']} (line {sale['line']}): {e}")
+    return inserted, bad_rows
+
+
+async def claim_import_file(session, sha256: str, filename: Optional[str], dry_run: bool = False) -> Optional[ImportFile]:
+    """Record a file as imported; return its earlier import if it has one.
+
+    The row is written on the import's transaction, so it commits with the
+    sales and a failed import can be retried. An import of the same file
+    running concurrently waits on the row until the first one finishes. A
+    dry run only looks.
+    """
+    if not dry_run:
+        res = await session.execute(
+            pg_insert(ImportFile)
+            .values(sha256=sha256, kind="sales", filename=filename)
+            .on_conflict_do_nothing(index_elements=[ImportFile.sha256])
+            .returning(ImportFile.sha256)
+        )
+        if res.first() is not None:
+            return None
+    return await session.get(ImportFile, sha256)
+
+
+async def import_sales(
+    path: str,
+    dry_run: bool = False,
+    create_missing: bool = False,
+    progress=None,
+    filename: Optional[str] = None,
+    force: bool = False,
+    sha256: Optional[str] = None,
+):
+    """Import a sales export and return a summary report.
+
+    The sheet is streamed in chunks, so memory stays flat whatever the file
+    size, and parsed in the worker processes of ``app.ingest.pipeline`` so
+    the event loop stays free. Product SKUs are loaded once; for each chunk
+    the new SKUs are resolved and the sales written, all inside a single
+    transaction. Rows
+    that cannot be written are listed under ``bad_rows`` instead of aborting
+    the import. An ``ImportProgress`` passed as ``progress`` is updated after
+    every chunk.
+
+    Imports are idempotent. A file whose sha256 was imported before raises
+    ``DuplicateImportError`` unless ``force`` is set, and sales already
+    stored under the same natural key (see ``number_occurrences``) are
+    skipped and counted as ``duplicates``, so overlapping exports merge.
+    Callers that already hashed the file pass the digest as ``sha256``.
+    """
+    report = {
+        "processed": 0,
+        "skipped": 0,
+        "duplicates": 0,
+        "created_products": 0,
+        "matched_skus": 0,
+        "errors": 0,
+        "bad_rows": [],
+    }
+    rows = 0
+    occurrences = {}
+    if sha256 is None:
+        sha256 = await asyncio.to_thread(file_sha256, path)
+    report["sha256"] = sha256
+    if progress is not None:
+        progress.start(estimate_rows(path, header_row=HEADER_ROW))
+
+    async with ImportSessionLocal() as session:
+        previous = await claim_import_file(session, sha256, filename or os.path.basename(path), dry_run)
+        if previous is not None and not force:
+            raise DuplicateImportError(previous)
+        resolver = None
+        resolved = {}
+        chunks = parse_chunks(
+            path,
+            detect_required_columns,
+            partial(normalize_sales_frame, first_line=1),
+            header_row=HEADER_ROW,
+            chunk_size=SALES_CHUNK_SIZE,
+        )
+        async for chunk in chunks:
+            if resolver is None:
+                print(f"Starting sales import: dry_run={dry_run}, create_missing={create_missing}")
+                resolver = await SkuResolver.from_session(session)
+
+            rows += chunk.rows
+            report["skipped"] += chunk.skipped
+            sales = chunk.records()
+
+            new_skus = dict.fromkeys(s["sku"] for s in sales if s["sku"] not in resolved)
+            chunk_resolved, created = await resolve_skus(session, resolver, new_skus, create_missing, dry_run)
+            resolved.update(chunk_resolved)
+            report["created_products"] += len(created)
+
+            to_write = []
+            for sale in sales:
+                original_sku = sale["sku"]
+                match = resolved.get(original_sku)
+                if match is None:
+                    if create_missing:
+                        # dry run: report what would be created/inserted
+                        print(f"Would create product SKU={original_sku} (minimal) and insert sale: sku={original_sku}, date={sale['date']}, qty={sale['quantity']}, channel={sale['channel']}")
                     else:
-                        # Create minimal product record so sales can be linked
-                        prod = Product(sku=sku, name=f"Auto-created for {sku}", stock_level=0)
-                        session.add(prod)
-                        await session.flush()  # Ensure it's available for the sale insert
-                        created_products += 1
-                        print(f"Created missing product: {sku}")
-                else:
-                    # Product not found and create_missing=False, skip this sale
-                    error_msg = f"Product not found for SKU: {sku}. Use create_missing=True to auto-create missing products."
-                    print(f"SKIPPING SALE: {error_msg}")
-                    skipped += 1
-                    if not dry_run:
-                        # In real mode, we might want to collect these errors for reporting
-                        pass
+                        print(f"SKIPPING SALE: Product not found for SKU: {original_sku}. Use create_missing=True to auto-create missing products.")
+                        report["skipped"] += 1
                     continue
+                if match != original_sku:
+                    report["matched_skus"] += 1
+                    sale["sku"] = match
+                to_write.append(sale)
 
+            number_occurrences(to_write, occurrences)
             if dry_run:
-                action_msg = f"Would insert sale: sku={sku}"
-                if sku != original_sku:
-                    action_msg += f" (matched from {original_sku})"
-                action_msg += f", date={date_val}, qty={qty}, channel={chan}"
-                print(action_msg)
-                processed += 1
+                report["processed"] += len(to_write)
             else:
-                try:
-                    sale = ProductSale(channel=chan, date=date_val, sku=sku, quantity=qty)
-                    session.add(sale)
-                    await session.commit()
-                    processed += 1
-                    success_msg = f"Inserted sale sku={sku}"
-                    if sku != original_sku:
-                        success_msg += f" (matched from {original_sku})"
-                    success_msg += f" date={date_val} qty={qty} channel={chan}"
-                    print(success_msg)
-                except Exception as e:
-                    await session.rollback()
-                    error_msg = f"Failed to insert sale for SKU {sku}: {str(e)}"
-                    print(f"ERROR: {error_msg}")
-                    errors += 1
-                    # Continue with next row instead of failing completely
-                    continue
+                processed, bad_rows = await insert_sales(session, to_write)
+                report["processed"] += processed
+                report["duplicates"] += len(to_write) - processed - len(bad_rows)
+                report["bad_rows"].extend(bad_rows)
+                report["errors"] = len(report["bad_rows"])
+
+            if progress is not None:
+                progress.update(rows, report)
+
+        if dry_run:
+            print(f"Would insert {report['processed']} sales")
+        else:
+            await session.commit()
 
     # Print summary
-    print(f"Import complete. Processed: {processed}, Skipped: {skipped}, Created products: {created_products}, Matched SKUs: {matched_skus}, Errors: {errors}")
+    print(f"Import complete. Rows: {rows}, Processed: {report['processed']}, Skipped: {report['skipped']}, Duplicates: {report['duplicates']}, Created products: {report['created_products']}, Matched SKUs: {report['matched_skus']}, Errors: {report['errors']}")
+    return report
 
 
 def main():
     import argparse
 
-    parser = argparse.ArgumentParser(description="Import sales from Excel into DB (header on second row)")
-    parser.add_argument("file", help="Path to Excel file (.xlsx)")
+    parser = argparse.ArgumentParser(description="Import sales from an Excel or CSV export into DB")
+    parser.add_argument("file", help="Path to Excel (.xlsx) or CSV file")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be done without writing to the database")
     parser.add_argument("--create-missing", action="store_true", help="Create minimal Product records when SKU not found")
+    parser.add_argument("--force", action="store_true", help="Import even if this file was imported before (known sales are still skipped)")
     args = parser.parse_args()
 
     file_path = args.file
@@ -295,7 +344,7 @@ def main():
         file_path = raw_path.strip().strip('"').strip("'")
 
     async def _run():
-        await import_sales(file_path, dry_run=args.dry_run, create_missing=args.create_missing)
+        await import_sales(file_path, dry_run=args.dry_run, create_missing=args.create_missing, force=args.force)
 
     asyncio.run(_run())
 
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import sys
+
+from sqlalchemy import text
+
+# make project root importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.app.database import import_engine
+from backend.app.migrations import MIGRATIONS_TABLE, applied_versions, discover, migrate
+
+
+async def status():
+    """Print every migration and whether it has been applied."""
+    async with import_engine.connect() as conn:
+        has_table = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": MIGRATIONS_TABLE})
+        applied = await applied_versions(conn) if has_table else set()
+    for m in discover():
+        print(f"{m.version}_{m.name}: {'applied' if m.version in applied else 'pending'}")
+
+
+async def upgrade():
+    done = await migrate()
+    print(f"Applied {len(done)} migration(s): {', '.join(done)}" if done else "Database is up to date")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="List migrations and whether they are applied, without changing anything")
+    args = parser.parse_args()
+    asyncio.run(status() if args.status else upgrade())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import asyncio
+import os
+import sys
+
+# make project root importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.app.database import ImportSessionLocal
+from backend.app.migrations import migrate
+from backend.app.rollup import rebuild_sales_daily
+
+
+async def rebuild():
+    """Recompute the ``sales_daily`` rollup from ``product_sale`` in one transaction."""
+    await migrate()
+    async with ImportSessionLocal() as session:
+        rows = await rebuild_sales_daily(session)
+        await session.commit()
+    print(f"Rebuilt sales_daily: {rows} rows")
+    return rows
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill or rebuild the sales_daily rollup from product_sale")
+    parser.parse_args()
+    asyncio.run(rebuild())
+
+
+if __name__ == "__main__":
+    main()
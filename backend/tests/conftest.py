@@ -0,0 +1,86 @@
+"""Fixtures for tests that run against Postgres.
+
+Mark such a module with ``pytestmark = pytest.mark.db``; its tests are
+skipped unless ``DATABASE_URL`` points at Postgres. Each scenario runs in
+its own event loop through ``run_db`` inside ``async with database():``,
+which applies pending migrations, or ``seed_products``, which also creates
+throwaway products and removes them with their sales and rollup rows
+afterwards.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import delete
+
+from backend.app import models
+from backend.app.database import AsyncSessionLocal, engine, import_engine
+from backend.app.migrations import migrate
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "db: needs a Postgres database in DATABASE_URL")
+
+
+def pytest_collection_modifyitems(config, items):
+    if DATABASE_URL and DATABASE_URL.startswith("postgresql"):
+        return
+    skip = pytest.mark.skip(reason="needs DATABASE_URL pointing at Postgres")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+
+async def _dispose_pools(close: bool = True) -> None:
+    for e in (engine, import_engine):
+        await e.dispose(close=close)
+
+
+@pytest.fixture(scope="session")
+def run_db():
+    """Run a coroutine in a fresh event loop; skip when the database is down."""
+    def run(coro):
+        try:
+            return asyncio.run(coro)
+        except OSError as e:
+            pytest.skip(f"database unavailable: {e}")
+    return run
+
+
+@pytest.fixture(scope="session")
+def database():
+    """``async with database():`` around a scenario on a migrated database."""
+    @asynccontextmanager
+    async def migrated():
+        # pooled connections belong to the event loop of an earlier scenario
+        await _dispose_pools(close=False)
+        await migrate()
+        try:
+            yield
+        finally:
+            await _dispose_pools()
+    return migrated
+
+
+@pytest.fixture(scope="session")
+def seed_products(database):
+    """``async with seed_products({sku: stock_level, ...}) as skus:`` around a scenario."""
+    @asynccontextmanager
+    async def seed(stock: dict):
+        async with database():
+            skus = list(stock)
+            async with AsyncSessionLocal() as db:
+                db.add_all([models.Product(sku=sku, name="test product", stock_level=n) for sku, n in stock.items()])
+                await db.commit()
+            try:
+                yield skus
+            finally:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(delete(models.SalesDaily).where(models.SalesDaily.sku.in_(skus)))
+                    await db.execute(delete(models.ProductSale).where(models.ProductSale.sku.in_(skus)))
+                    await db.execute(delete(models.Product).where(models.Product.sku.in_(skus)))
+                    await db.commit()
+    return seed
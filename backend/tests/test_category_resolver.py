@@ -0,0 +1,76 @@
+import asyncio
+
+from backend.app.ingest.categories import CategoryResolver
+
+ROWS = [
+    (3, "เสื้อ", None),
+    (1, "เสื้อ", "ยืด"),
+    (7, "กางเกง", "ขาสั้น"),
+    (9, "เสื้อ", "ยืด"),  # duplicate pair: the lowest id wins
+]
+
+
+def test_exact_match_then_fallback_to_main_category():
+    r = CategoryResolver(ROWS)
+    assert r.resolve("เสื้อ", "ยืด") == 1
+    assert r.resolve("เสื้อ", None) == 3
+    assert r.resolve("เสื้อ", "โปโล") == 3
+    assert r.resolve("กางเกง", "ขายาว") is None
+    assert r.resolve("หมวก", None) is None
+
+
+def test_exact_only():
+    r = CategoryResolver(ROWS, fallback=False)
+    assert r.resolve("เสื้อ", "โปโล") is None
+    assert r.missing([("เสื้อ", "โปโล"), ("เสื้อ", "ยืด"), ("เสื้อ", "โปโล")]) == [("เสื้อ", "โปโล")]
+
+
+def test_missing_is_distinct_in_first_seen_order():
+    r = CategoryResolver(ROWS)
+    pairs = [("หมวก", None), ("เสื้อ", "โปโล"), ("กางเกง", "ขายาว"), ("หมวก", None), ("กางเกง", "ขาสั้น")]
+    assert r.missing(pairs) == [("หมวก", None), ("กางเกง", "ขายาว")]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    """Records executed statements; hands out ids for inserted categories."""
+
+    def __init__(self, next_id=100):
+        self.next_id = next_id
+        self.calls = []
+
+    async def execute(self, stmt):
+        params = stmt.compile().params
+        # multi-row VALUES binds name_m0, subcategory_m0, name_m1, ...
+        names = sorted((k for k in params if k.startswith("name_m")), key=lambda k: int(k[len("name_m"):]))
+        rows = [(self.next_id + i, params[n], params[n.replace("name", "subcategory")]) for i, n in enumerate(names)]
+        self.calls.append(rows)
+        self.next_id += len(rows)
+        return FakeResult(rows)
+
+
+def test_create_inserts_missing_pairs_in_one_statement():
+    r = CategoryResolver(ROWS)
+    session = FakeSession()
+    pairs = [("หมวก", None), ("เสื้อ", "ยืด"), ("กางเกง", "ขายาว"), ("หมวก", None)] * 1000
+    created = asyncio.run(r.create(session, pairs))
+    assert created == [(100, "หมวก", None), (101, "กางเกง", "ขายาว")]
+    assert len(session.calls) == 1
+    assert r.resolve("หมวก", "อะไรก็ได้") == 100
+    # nothing left to create
+    assert asyncio.run(r.create(session, pairs)) == []
+    assert len(session.calls) == 1
+
+
+def test_missing_main_category_covers_later_subcategories():
+    r = CategoryResolver([])
+    pairs = [("หมวก", "แก๊ป"), ("หมวก", None), ("หมวก", "บักเก็ต"), ("หมวก", "แก๊ป")]
+    assert r.missing(pairs) == [("หมวก", "แก๊ป"), ("หมวก", None)]
+    assert CategoryResolver([], fallback=False).missing(pairs) == [("หมวก", "แก๊ป"), ("หมวก", None), ("หมวก", "บักเก็ต")]
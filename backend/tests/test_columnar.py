@@ -0,0 +1,56 @@
+import asyncio
+import io
+from datetime import date
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from backend.app.columnar import encode, parse_csv, products_schema, sales_schema
+
+SALES_CSV = [b"1,2024-09-25,A-1,web,2\n2,2024-09-26,A-2,\xe0\xb8\xa3\xe0\xb9\x89\xe0\xb8\xb2\xe0\xb8\x99,1\n", b"3,2024-09-27,A-3,web,5\n"]
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def body(*parts, schema, fmt) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in encode(chunks(*parts), schema, fmt)])
+    return asyncio.run(run())
+
+
+def test_parse_csv_types_and_nulls():
+    # Postgres CSV: NULL is an empty field, an empty string is ""
+    table = parse_csv(b'A-1,"multi\nline",,,,3,,,,"",M\n', products_schema())
+    assert table.schema == products_schema()
+    row = table.to_pylist()[0]
+    assert row["name"] == "multi\nline"
+    assert row["category_id"] is None and row["category_name"] is None
+    assert row["color"] == "" and row["size"] == "M" and row["stock_level"] == 3
+
+
+def test_parquet_one_row_group_per_chunk():
+    data = body(*SALES_CSV, schema=sales_schema(), fmt="parquet")
+    f = pq.ParquetFile(io.BytesIO(data))
+    assert f.num_row_groups == 2
+    table = f.read()
+    assert table.schema == sales_schema()
+    assert table.column("date").to_pylist() == [date(2024, 9, 25), date(2024, 9, 26), date(2024, 9, 27)]
+    assert table.column("channel").to_pylist() == ["web", "ร้าน", "web"]
+
+
+def test_arrow_stream():
+    data = body(*SALES_CSV, schema=sales_schema(), fmt="arrow")
+    table = pa.ipc.open_stream(data).read_all()
+    assert table.column("quantity").to_pylist() == [2, 1, 5]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_empty_export_is_a_valid_file(fmt):
+    data = body(schema=sales_schema(), fmt=fmt)
+    table = pq.read_table(io.BytesIO(data)) if fmt == "parquet" else pa.ipc.open_stream(data).read_all()
+    assert table.num_rows == 0 and table.schema == sales_schema()
@@ -0,0 +1,13 @@
+import sys
+
+from backend.app import database, rollup
+from backend.app.main import app  # noqa: F401  (loads every router and the scripts they use)
+from backend.scripts import import_categories, import_products, import_sales, rebuild_sales_daily
+
+
+def test_app_and_scripts_share_one_database_module():
+    # a second copy under another module path would build its own engines and pools
+    assert "app.database" not in sys.modules
+    for module in (import_products, import_sales, import_categories, rebuild_sales_daily, rollup):
+        assert module.ImportSessionLocal is database.ImportSessionLocal
+    assert database.ImportSessionLocal.kw["bind"] is database.import_engine
@@ -0,0 +1,99 @@
+import itertools
+import random
+
+from backend.app.facets import FacetIndex, color_tokens, etag_matches, size_tokens
+
+
+def test_size_tokens():
+    assert size_tokens("S/M") == {"S", "M"}
+    assert size_tokens(" xl , 2x ") == {"XL", "2XL"}
+    assert size_tokens("XXXL") == {"3XL"}
+    assert size_tokens("free") == set()
+    assert size_tokens(None) == set()
+
+
+def test_color_tokens_drop_numeric_codes():
+    assert color_tokens("BK/ดำ, 01") == {"BK", "ดำ"}
+    assert color_tokens("") == set()
+
+
+ROWS = [
+    (1, "S/M", "Black"),
+    (1, "M", "White"),
+    (2, "L", "Black"),
+    (None, "M", None),
+]
+
+
+def test_facet_lists_and_unfiltered_counts():
+    index = FacetIndex(ROWS)
+    assert index.sizes == ["L", "M", "S"]
+    assert index.colors == ["Black", "White"]
+    counts = index.counts()
+    assert counts["total"] == 4
+    assert counts["size_counts"] == {"L": 1, "M": 3, "S": 1}
+    assert counts["category_counts"] == {1: 2, 2: 1}
+
+
+def test_counts_exclude_own_facet_filter():
+    counts = FacetIndex(ROWS).counts(category_id=1, size="m")
+    assert counts["total"] == 2
+    # sizes ignore the size filter but keep the category filter
+    assert counts["size_counts"] == {"M": 2, "S": 1}
+    assert counts["color_counts"] == {"Black": 1, "White": 1}
+    # categories ignore the category filter
+    assert counts["category_counts"] == {1: 2}
+
+
+def test_etag_follows_content_and_filters():
+    a, b = FacetIndex(ROWS), FacetIndex(list(reversed(ROWS)))
+    assert a.etag(None, None, None) == b.etag(None, None, None)
+    assert a.etag(1, None, None) != a.etag(None, None, None)
+    assert FacetIndex(ROWS[:3]).etag(None, None, None) != a.etag(None, None, None)
+
+
+def brute_force_counts(rows, category_id, size, color):
+    entries = [(cat, size_tokens(s), color_tokens(c)) for cat, s, c in rows]
+    sizes, colors, categories, total = {}, {}, {}, 0
+    for cat, s, c in entries:
+        in_cat = category_id is None or cat == category_id
+        in_size = size is None or size in s
+        in_color = color is None or color in c
+        if in_cat and in_color:
+            for token in s:
+                sizes[token] = sizes.get(token, 0) + 1
+        if in_cat and in_size:
+            for token in c:
+                colors[token] = colors.get(token, 0) + 1
+        if in_size and in_color and cat is not None:
+            categories[cat] = categories.get(cat, 0) + 1
+        total += in_cat and in_size and in_color
+    return {
+        "total": total,
+        "size_counts": dict(sorted(sizes.items())),
+        "color_counts": dict(sorted(colors.items())),
+        "category_counts": dict(sorted(categories.items())),
+    }
+
+
+def test_counts_match_a_full_scan():
+    rng = random.Random(7)
+    rows = [
+        (rng.choice([None, 1, 2, 3]), rng.choice(["S", "M/L", "XL", "", None]), rng.choice(["Black", "White/Red", None]))
+        for _ in range(300)
+    ]
+    index = FacetIndex(rows)
+    combinations = list(itertools.product([None, 1, 3, 9], [None, "M", "XXL"], [None, "Red", "Pink"]))
+    # twice, so the second pass reads the counts kept for single filters
+    for category_id, size, color in combinations * 2:
+        assert index.counts(category_id, size, color) == brute_force_counts(rows, category_id, size, color)
+
+
+def test_etag_matches_parses_the_header():
+    etag = '"abc-1"'
+    assert etag_matches('"abc-1"', etag)
+    assert etag_matches('"zzz", W/"abc-1"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abc-12"', etag)
+    assert not etag_matches('"xabc-1", "abc-1x"', etag)
+    assert not etag_matches(None, etag)
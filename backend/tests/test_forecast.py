@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from backend.app.forecast import demand_matrix, ema_demand, recommend, sma_demand
+
+
+def test_demand_matrix_places_sales_and_ignores_unknown():
+    demand = demand_matrix(["A", "B"], ["B", "A", "Z", "A"], [0, 2, 1, 5], [4, 1, 9, 7], days=3)
+    assert demand.tolist() == [[0, 0, 1], [4, 0, 0]]
+
+
+def test_ema_matches_recursive_smoothing():
+    rng = np.random.default_rng(1)
+    demand = rng.poisson(2, (5, 60)).astype(np.float32)
+    alpha = 0.3
+    level = demand[:, 0].astype(np.float64)
+    for t in range(1, demand.shape[1]):
+        level = alpha * demand[:, t] + (1 - alpha) * level
+    np.testing.assert_allclose(ema_demand(demand, alpha), level, rtol=1e-5)
+
+
+def test_sma_uses_last_window():
+    demand = np.array([[10, 0, 2, 4]], dtype=np.float32)
+    assert sma_demand(demand, 2).tolist() == [3.0]
+    assert sma_demand(demand, 10).tolist() == [4.0]
+
+
+def test_recommend_reorder_point_and_quantity():
+    # steady 2 units/day: no volatility, so no safety stock
+    demand = np.full((3, 30), 2, dtype=np.float32)
+    demand[2] = 0
+    out = recommend(demand, [10, 100, 5], window=30, lead_time_days=14, cover_days=30)
+    assert out["daily_demand"].tolist() == [2.0, 2.0, 0.0]
+    assert out["days_of_cover"][:2].tolist() == [5.0, 50.0]
+    assert np.isinf(out["days_of_cover"][2])
+    assert out["reorder_point"].tolist() == [28.0, 28.0, 0.0]
+    assert out["needs_reorder"].tolist() == [True, False, False]
+    # order up to 2 * (14 + 30) = 88 units
+    assert out["reorder_qty"].tolist() == [78, 0, 0]
+
+
+def test_recommend_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        recommend(np.zeros((1, 5), dtype=np.float32), [0], method="arima")
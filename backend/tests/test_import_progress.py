@@ -0,0 +1,45 @@
+import openpyxl
+
+from backend.app.ingest import progress as progress_module
+from backend.app.ingest.progress import ImportProgress
+from backend.app.ingest.readers import estimate_rows
+
+
+def test_snapshot_throughput_and_eta(monkeypatch):
+    clock = iter([100.0, 104.0])
+    monkeypatch.setattr(progress_module.time, "monotonic", lambda: next(clock))
+
+    progress = ImportProgress()
+    progress.start(total_rows=1000)
+    progress.update(200, {"processed": 190, "skipped": 10, "bad_rows": [{"line": 3}], "dry_run": False})
+    snap = progress.snapshot()
+
+    assert snap["rows_read"] == 200
+    assert snap["processed"] == 190 and snap["skipped"] == 10
+    assert "bad_rows" not in snap and "dry_run" not in snap
+    assert snap["rows_per_second"] == 50.0
+    assert snap["eta_seconds"] == 16.0
+
+
+def test_snapshot_before_start():
+    snap = ImportProgress().snapshot()
+    assert snap["rows_read"] == 0
+    assert snap["rows_per_second"] is None and snap["eta_seconds"] is None
+
+
+def test_estimate_rows(tmp_path):
+    xlsx = tmp_path / "sales.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["title"])
+    ws.append(["sku", "qty"])
+    for i in range(250):
+        ws.append([f"SKU-{i}", i])
+    wb.save(xlsx)
+    assert estimate_rows(str(xlsx), header_row=1) == 250
+
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("sku,qty\n" + "".join(f"SKU-{i:06d},1\n" for i in range(100_000)))
+    assert abs(estimate_rows(str(csv_path)) - 100_001) < 1000
+
+    assert estimate_rows(str(tmp_path / "missing.xlsx")) is None
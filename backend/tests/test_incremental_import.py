@@ -0,0 +1,45 @@
+import asyncio
+
+from backend.scripts import import_products
+from backend.scripts.import_products import changed_fields, skip_unchanged_products
+
+STORED = {
+    "sku": "TS-01-RED-L", "name": "เสื้อยืด", "category_id": 4, "stock_level": 12,
+    "size": "L", "prefix": "TS", "design_code": "01", "pattern": None, "color": "RED",
+}
+
+
+def row(**changes):
+    return {**STORED, "main_cat": "เสื้อ", "sub_name": None, **changes}
+
+
+def test_same_row_changes_nothing():
+    assert changed_fields(STORED, row()) == []
+
+
+def test_empty_incoming_values_keep_the_stored_ones():
+    assert changed_fields(STORED, row(name="", color=None, pattern=None)) == []
+
+
+def test_changed_columns_are_listed():
+    assert changed_fields(STORED, row(stock_level=11, category_id=5)) == ["category_id", "stock_level"]
+    # size always follows the file, even when it is empty
+    assert changed_fields(STORED, row(size=None)) == ["size"]
+
+
+def test_skip_unchanged_products(monkeypatch):
+    async def fetch(session, skus):
+        return {STORED["sku"]: STORED, "OLD-1": {**STORED, "sku": "OLD-1"}}
+
+    monkeypatch.setattr(import_products, "fetch_stored_products", fetch)
+    rows = [row(), row(sku="OLD-1", stock_level=0), row(sku="NEW-1")]
+    report = {"unchanged": 0, "changes": {}}
+    pending = asyncio.run(skip_unchanged_products(None, rows, set(), report))
+    assert [r["sku"] for r in pending] == ["OLD-1", "NEW-1"]
+    assert report == {"unchanged": 1, "changes": {"stock_level": 1}}
+
+    # SKUs counted by an earlier chunk are written if changed but not counted again
+    report = {"unchanged": 0, "changes": {}}
+    pending = asyncio.run(skip_unchanged_products(None, rows, {STORED["sku"], "OLD-1"}, report))
+    assert [r["sku"] for r in pending] == ["OLD-1", "NEW-1"]
+    assert report == {"unchanged": 0, "changes": {}}
@@ -0,0 +1,126 @@
+"""EXPLAIN checks that the hot queries use the indexes from the migrations.
+
+Needs a Postgres database in ``DATABASE_URL``; skipped otherwise. Everything
+runs in one transaction that is rolled back, so the database is left as it
+was (the migrations included, on an empty database).
+"""
+import asyncio
+import json
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from backend.app import models
+from backend.app.migrations import apply_migrations
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+pytestmark = pytest.mark.db
+
+SEED = [
+    """INSERT INTO category (name, subcategory)
+       SELECT 'zz-cat-' || i, NULL FROM generate_series(1, 2000) i""",
+    """INSERT INTO product (sku, name, category_id, stock_level, size, color)
+       SELECT 'ZZ-' || lpad(i::text, 6, '0'), 'test product',
+              (SELECT min(category_id) FROM category WHERE name LIKE 'zz-cat-%') + i % 2000,
+              10, 'zz-size-' || i % 500, 'zz-color-' || i % 700
+       FROM generate_series(1, 20000) i""",
+    """INSERT INTO product_sale (channel, date, sku, quantity)
+       SELECT 'zz-chan-' || i % 40, DATE '2023-01-01' + i % 730, 'ZZ-' || lpad((i % 20000 + 1)::text, 6, '0'), 1
+       FROM generate_series(1, 60000) i""",
+    "ANALYZE category",
+    "ANALYZE product",
+    "ANALYZE product_sale",
+]
+
+
+def index_names(plan) -> set:
+    """Every index a JSON plan scans."""
+    found = set()
+    if isinstance(plan, dict):
+        if "Index Name" in plan:
+            found.add(plan["Index Name"])
+        for value in plan.values():
+            found |= index_names(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            found |= index_names(value)
+    return found
+
+
+async def explain(conn, stmt) -> set:
+    sql = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    plan = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+    return index_names(json.loads(plan) if isinstance(plan, str) else plan)
+
+
+async def plans():
+    engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+    p, s, c = models.Product, models.ProductSale, models.Category
+    queries = {
+        "sales_by_sku": select(s).where(s.sku == "ZZ-000042"),
+        "sales_by_sku_and_dates": select(s.date, s.quantity).where(
+            s.sku == "ZZ-000042", s.date >= date(2023, 6, 1), s.date < date(2023, 7, 1)
+        ),
+        "sales_by_day_and_channel": select(s).where(s.date == date(2023, 3, 1), s.channel == "zz-chan-7"),
+        "products_by_category": select(p).where(p.category_id == select(c.category_id).where(c.name == "zz-cat-5").scalar_subquery()),
+        "products_by_size": select(p).where(p.size == "zz-size-5"),
+        "products_by_color": select(p).where(p.color == "zz-color-5"),
+        "category_by_name": select(c).where(c.name == "zz-cat-5"),
+        "sku_prefix": select(p.sku).where(p.sku.like("ZZ-00004%")),
+        "products_page_by_name": select(p.sku, p.name)
+        .where(tuple_(p.name, p.sku) > tuple_("test product", "ZZ-010000"))
+        .order_by(p.name, p.sku)
+        .limit(501),
+    }
+    try:
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            try:
+                await apply_migrations(conn)
+                for statement in SEED:
+                    await conn.execute(text(statement))
+                collation = (await conn.execute(text(
+                    "SELECT datcollate FROM pg_database WHERE datname = current_database()"
+                ))).scalar()
+                return collation, {name: await explain(conn, q) for name, q in queries.items()}
+            finally:
+                await trans.rollback()
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def query_plans():
+    try:
+        return asyncio.run(plans())
+    except OSError as e:
+        pytest.skip(f"database unavailable: {e}")
+
+
+@pytest.mark.parametrize("query, index", [
+    ("sales_by_sku", "ix_product_sale_sku_date"),
+    ("sales_by_sku_and_dates", "ix_product_sale_sku_date"),
+    ("sales_by_day_and_channel", "ix_product_sale_date_channel"),
+    ("products_by_category", "ix_product_category_id"),
+    ("products_by_size", "ix_product_size"),
+    ("products_by_color", "ix_product_color"),
+    ("category_by_name", "ix_category_name"),
+    ("products_page_by_name", "ix_product_name_sku"),
+])
+def test_query_uses_index(query_plans, query, index):
+    _, indexes = query_plans
+    assert index in indexes[query]
+
+
+def test_sku_prefix_uses_pattern_index(query_plans):
+    collation, indexes = query_plans
+    if collation in ("C", "POSIX"):
+        # under the C collation every btree on sku serves LIKE 'prefix%'
+        assert indexes["sku_prefix"] & {"ix_product_sku_pattern", "ix_product_sku", "product_pkey"}
+    else:
+        assert "ix_product_sku_pattern" in indexes["sku_prefix"]
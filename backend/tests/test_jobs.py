@@ -0,0 +1,84 @@
+"""Import jobs survive sibling workers restarting and report progress from the row."""
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from backend.app import jobs, models
+from backend.app.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.db
+
+
+async def scenario(database, tag: str):
+    now = jobs._now()
+    beating = {
+        f"{tag}-fresh": ("running", now),
+        f"{tag}-stale": ("running", now - timedelta(seconds=jobs.IMPORT_STALE_SECONDS + 1)),
+        f"{tag}-legacy": ("queued", None),
+    }
+    job_ids = list(beating)
+    out = {}
+    async with database():
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add_all([
+                    models.ImportJob(
+                        job_id=job_id, kind="sales", status=status, created_at=now,
+                        owner="other-worker", heartbeat_at=heartbeat,
+                    )
+                    for job_id, (status, heartbeat) in beating.items()
+                ])
+                await db.commit()
+
+            # a job of this process, still waiting for its import to read more rows
+            release = asyncio.Event()
+
+            async def run(path, progress):
+                progress.start(total_rows=10)
+                progress.update(4, {"processed": 4})
+                await release.wait()
+                return {"processed": 10}
+
+            own = await jobs.submit(
+                "sales", "own.csv", "/nonexistent/own.csv", run,
+                lambda report: {"message": "done", **report}, str,
+            )
+            job_ids.append(own)
+            while own not in jobs._live or jobs._live[own].rows_read == 0:
+                await asyncio.sleep(0.01)
+            await jobs.beat()
+
+            async with AsyncSessionLocal() as db:
+                rows = {job_id: await db.get(models.ImportJob, job_id) for job_id in job_ids}
+                out["status"] = {job_id: row.status for job_id, row in rows.items()}
+                out["own"] = (rows[own].owner, rows[own].progress)
+            release.set()
+            while own in jobs._live:
+                await asyncio.sleep(0.01)
+        finally:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(models.ImportJob).where(models.ImportJob.job_id.in_(job_ids)))
+                await db.commit()
+    return own, out
+
+
+@pytest.fixture(scope="module")
+def results(run_db, database):
+    return run_db(scenario(database, uuid.uuid4().hex[:8]))
+
+
+def test_only_jobs_without_a_recent_heartbeat_are_failed(results):
+    own, out = results
+    status = {job_id.rsplit("-", 1)[-1]: s for job_id, s in out["status"].items() if job_id != own}
+    assert status == {"fresh": "running", "stale": "failed", "legacy": "failed"}
+    assert out["status"][own] == "running"
+
+
+def test_heartbeat_stores_progress(results):
+    _, out = results
+    owner, progress = out["own"]
+    assert owner == jobs.WORKER_ID
+    assert progress["rows_read"] == 4 and progress["processed"] == 4
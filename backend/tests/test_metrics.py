@@ -0,0 +1,119 @@
+import asyncio
+import logging
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import text
+
+from backend.app import metrics
+from backend.app.database import AsyncSessionLocal
+from backend.app.metrics import Histogram, MetricsMiddleware, record_query
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics-test/items/{item_id}")
+async def item(item_id: int):
+    record_query("SELECT * FROM product WHERE sku = $1", 0.002)
+    return {"item_id": item_id}
+
+
+@app.get("/metrics-test/loop")
+async def loop():
+    record_query("SELECT * FROM category", 0.001)
+    for _ in range(metrics.N_PLUS_ONE_THRESHOLD):
+        record_query("SELECT * FROM product WHERE category_id = $1", 0.001)
+    return {}
+
+
+@app.get("/metrics-test/db")
+async def db_queries():
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 2"))
+    return {}
+
+
+@app.get("/metrics-test/missing")
+async def missing():
+    raise HTTPException(status_code=404)
+
+
+def get(*paths):
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+    return asyncio.run(run())
+
+
+def sample(name: str, **labels) -> float:
+    """Value of one series in the rendered metrics."""
+    wanted = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+    for line in metrics.render().splitlines():
+        if line.startswith(name + wanted + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("t_seconds", "test", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        h.observe(value, "/x")
+    assert list(h.render())[2:] == [
+        't_seconds_bucket{route="/x",le="0.1"} 1',
+        't_seconds_bucket{route="/x",le="1.0"} 3',
+        't_seconds_bucket{route="/x",le="+Inf"} 4',
+        't_seconds_sum{route="/x"} 4.25',
+        't_seconds_count{route="/x"} 4',
+    ]
+
+
+def test_requests_are_labelled_by_route_template():
+    route = "/metrics-test/items/{item_id}"
+    before = sample("http_request_duration_seconds_count", method="GET", route=route, status="200")
+    get("/metrics-test/items/1", "/metrics-test/items/2", "/metrics-test/nowhere", "/metrics-test/missing")
+    assert sample("http_request_duration_seconds_count", method="GET", route=route, status="200") == before + 2
+    assert sample("http_request_db_seconds_sum", method="GET", route=route) >= 0.004
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert sample("http_request_duration_seconds_count", method="GET", route="/metrics-test/missing", status="404") >= 1
+
+
+def test_repeated_statement_is_flagged(caplog):
+    before = sample("http_request_n_plus_one_total", method="GET", route="/metrics-test/loop")
+    with caplog.at_level(logging.WARNING, logger=metrics.__name__):
+        get("/metrics-test/loop", "/metrics-test/items/3")
+    assert sample("http_request_n_plus_one_total", method="GET", route="/metrics-test/loop") == before + 1
+    flagged = [r.getMessage() for r in caplog.records if "N+1" in r.getMessage()]
+    assert len(flagged) == 1 and "category_id" in flagged[0]
+
+
+def test_slow_queries_are_logged(caplog, monkeypatch):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 100)
+    with caplog.at_level(logging.WARNING, logger=metrics.__name__):
+        record_query("SELECT pg_sleep(1)", 0.5)
+        record_query("SELECT 1", 0.001)
+    assert [r.getMessage() for r in caplog.records] == ["Slow query (500 ms, background): SELECT pg_sleep(1)"]
+
+
+@pytest.mark.db
+def test_engine_statements_are_charged_to_their_route(run_db, database):
+    """Through the Engine events and asyncpg's greenlets, not record_query."""
+    metrics.install()
+    route = "/metrics-test/db"
+    requests = sample("http_request_db_queries_count", method="GET", route=route)
+    queries = sample("http_request_db_queries_sum", method="GET", route=route)
+
+    async def scenario():
+        async with database():
+            # connect outside the request, so first-connect statements are not counted
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("SELECT 0"))
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                return await client.get(route)
+
+    assert run_db(scenario()).status_code == 200
+    assert sample("http_request_db_queries_count", method="GET", route=route) == requests + 1
+    assert sample("http_request_db_queries_sum", method="GET", route=route) == queries + 2
+    assert sample("http_request_db_seconds_count", method="GET", route=route) == requests + 1
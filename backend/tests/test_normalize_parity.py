@@ -0,0 +1,358 @@
+"""The vectorized parsers must agree row for row with the per-row helpers.
+
+The per-row helpers below are frozen copies of the row-at-a-time parsers the
+import scripts used before ``app.ingest.normalize``; they are kept only as
+the reference here and must not be changed along with the vectorized code.
+"""
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.app.ingest.normalize import (
+    ALLOWED_SIZES,
+    normalize_channel_series,
+    normalize_color_series,
+    normalize_product_frame,
+    normalize_sales_frame,
+    normalize_size_series,
+    frame_records,
+)
+
+
+def normalize_size(raw: Optional[str]) -> Optional[str]:
+    """Normalize a raw size string and return a canonical token if allowed.
+
+    Rules:
+    - Trim and uppercase.
+    - Replace common separators/spaces.
+    - Map common synonyms (e.g. "XXL" and "2XL").
+    - If the result contains only digits (e.g., "42") or looks like a numeric range, return None.
+    - Only return values in ALLOWED_SIZES.
+    """
+    if not raw:
+        return None
+    s = str(raw).strip().upper()
+    if not s:
+        return None
+    # Take first part if slash or comma separated
+    if '/' in s:
+        s = s.split('/')[0].strip()
+    if ',' in s:
+        s = s.split(',')[0].strip()
+    # Remove whitespace
+    s = s.replace(' ', '')
+    # Common normalization: allow both XXL and 2XL -> normalize to XXL and include 2XL as allowed
+    # Convert forms like '2XL' -> '2XL' (kept), 'XXL' -> 'XXL'
+    # If string is purely numeric or looks like a numeric-range, ignore
+    if re.fullmatch(r"\d+(?:[-–]\d+)?", s):
+        return None
+    # Standardize some common variants
+    # Map 'XXL' and synonyms: keep as-is
+    if s in ALLOWED_SIZES:
+        return s
+    # Try to map repeated X forms like 'XXXXL' to nearest known token (simple heuristic)
+    if s.endswith('XL') and s.count('X') >= 2:
+        # e.g. 'XXXL' or 'XXXXL' -> '3XL' if 3 Xs, else cap to '3XL'
+        xcount = s.count('X')
+        if xcount == 3:
+            return '3XL' if '3XL' in ALLOWED_SIZES else None
+        if xcount == 2:
+            return 'XXL' if 'XXL' in ALLOWED_SIZES else None
+    # Map one-size tokens
+    if s in ('ONE', 'ONESIZE', 'OS'):
+        return 'F' if 'F' in ALLOWED_SIZES else None
+    # Accept forms like '2X' or '2XL' normalize to '2XL'
+    m = re.match(r'^(2|3)[Xx](?:L)?$', s)
+    if m:
+        tok = (m.group(1) + 'XL').upper()
+        if tok in ALLOWED_SIZES:
+            return tok
+    return None
+
+
+def normalize_color(raw: Optional[str]) -> Optional[str]:
+    """Return a cleaned color string or None.
+
+    Rules:
+    - Trim; if value is numeric-only (e.g., '01', '123') return None.
+    - If contains letters, return trimmed string (preserve original case except surrounding whitespace).
+    - If comma-separated, take first token.
+    """
+    if not raw:
+        return None
+    s = str(raw).strip()
+    if not s:
+        return None
+    # If comma-separated, take first non-empty
+    if ',' in s:
+        parts = [p.strip() for p in s.split(',') if p.strip()]
+        s = parts[0] if parts else s
+    if '/' in s:
+        s = s.split('/')[0].strip()
+    # If contains any letter, accept. If only digits or punctuation, reject.
+    if re.search(r'[A-Za-zก-ฮ]', s):
+        return s
+    # If it's something like '01' or '123' reject
+    if re.fullmatch(r'[\d\W_]+', s):
+        return None
+    # If contains digits but also letters, accept (e.g., 'Red1')
+    if re.search(r'\d', s) and not re.search(r'[A-Za-zก-ฮ]', s):
+        return None
+    return s
+
+
+def parse_product_row(row, cols) -> Optional[dict]:
+    """Turn one sheet row into a product dict, or None when the row has no SKU.
+
+    The dict carries the normalized product columns plus the raw category
+    pair (``main_cat``/``sub_name``) that still has to be resolved to an id.
+    """
+    sku = str(row[cols["sku"]]).strip() if not pd.isna(row[cols["sku"]]) else None
+    if not sku:
+        return None
+    prod_name = str(row[cols["name"]]).strip() if not pd.isna(row[cols["name"]]) else None
+
+    raw_cat = str(row[cols["category"]]).strip() if not pd.isna(row[cols["category"]]) else ""
+    sub_name = None
+    subcol = cols["subcategory"]
+    if subcol and not pd.isna(row[subcol]):
+        s = str(row[subcol]).strip()
+        if s:
+            sub_name = s
+
+    # Special-case: some category fields contain combined 'แถม คริสต์มาส' => main 'แถม', sub 'คริสต์มาส'
+    if raw_cat.startswith("แถม") and (not sub_name):
+        parts = raw_cat.split()
+        if len(parts) > 1:
+            main_cat = parts[0]
+            sub_name = " ".join(parts[1:])
+        else:
+            main_cat = raw_cat
+    else:
+        main_cat = raw_cat
+
+    # parse qty as int from float
+    qty = 0
+    if not pd.isna(row[cols["quantity"]]):
+        try:
+            qty = int(float(row[cols["quantity"]]))
+        except Exception:
+            qty = 0
+
+    # parse SKU from the back so we don't accidentally assign color into pattern
+    def extract_size(sku_str: str) -> Optional[str]:
+        if not sku_str:
+            return None
+        parts = sku_str.split("-")
+        last = parts[-1].strip()
+        # size is the last dash-separated segment (do not split on '/')
+        if last == "":
+            return None
+        return last
+
+    size_val = normalize_size(extract_size(sku))
+    sku_parts = [p.strip() for p in sku.split("-") if p.strip() != ""]
+    prefix_val = sku_parts[0] if len(sku_parts) > 0 else None
+    design_val = sku_parts[1] if len(sku_parts) > 1 else None
+
+    # work from the back: base_parts are everything except the size segment
+    base_parts = sku_parts[:-1] if len(sku_parts) >= 2 else sku_parts
+    pattern_val = None
+    color_val = None
+
+    if base_parts:
+        last_base = base_parts[-1]
+        # do NOT split last_base on '/'; treat it as the full color code
+        if last_base != size_val:
+            color_val = last_base
+    # normalize color (ignore numeric-only color codes)
+    color_val = normalize_color(color_val)
+
+    # Try to detect an explicit pattern that sits before the color (if present)
+    if len(base_parts) >= 3:
+        candidate = base_parts[-2]
+        # avoid treating numeric design codes as pattern (e.g. '0049')
+        if candidate and not candidate.isdigit():
+            pattern_val = pattern_val or candidate
+
+    # guard: if pattern was inferred but equals the color, drop it
+    if pattern_val and color_val and pattern_val == color_val:
+        pattern_val = None
+    # also avoid color equal to size
+    if color_val and size_val and color_val == size_val:
+        color_val = None
+
+    return {
+        "sku": sku,
+        "name": prod_name or "",
+        "main_cat": main_cat,
+        "sub_name": sub_name,
+        "stock_level": qty,
+        "size": size_val,
+        "prefix": prefix_val,
+        "design_code": design_val,
+        "pattern": pattern_val,
+        "color": color_val,
+    }
+
+
+def normalize_channel(raw: Optional[str]) -> str:
+    if raw is None or (isinstance(raw, float) and pd.isna(raw)):
+        return "unknown"
+    s = str(raw).strip()
+    if s == "":
+        return "unknown"
+    # Examples of raw values: "TIKTOK - PAJARA OFFICIAL", "Facebook PAJARA", "Shopee"
+    # Strategy: split on common separators, remove tokens like 'PAJARA' and 'OFFICIAL', then
+    # return the remaining channel name (preserve case except trim).
+    # split on hyphen first, otherwise split on slash or multiple spaces
+    parts = [p.strip() for p in s.replace("/", " - ").split("-") if p.strip()]
+    # take the first non-empty part as the candidate (this often contains the actual channel)
+    candidate = parts[0] if parts else s
+    # remove tokens 'PAJARA' and 'OFFICIAL' from candidate or trailing tokens
+    tokens = [t.strip() for t in candidate.split() if t.strip()]
+    filtered = [t for t in tokens if t.upper() not in ("PAJARA", "OFFICIAL")]
+    if filtered:
+        return " ".join(filtered)
+    # if nothing left after filtering, fallback to 'unknown'
+    return "unknown"
+
+
+def parse_date(raw) -> Optional[datetime.date]:
+    if pd.isna(raw):
+        return None
+    if isinstance(raw, datetime):
+        return raw.date()
+    # pandas may parse dates as Timestamp
+    try:
+        parsed = pd.to_datetime(raw, errors="coerce")
+        if pd.isna(parsed):
+            return None
+        return parsed.date()
+    except Exception:
+        return None
+
+
+def parse_sale_row(row, cols, line: int) -> Optional[dict]:
+    """Parse one sheet row into a sale dict, or None when it must be skipped."""
+    sku = None
+    if not pd.isna(row[cols["sku"]]):
+        sku = str(row[cols["sku"]]).strip()
+    if not sku or sku == "nan":
+        # skip rows without sku
+        return None
+
+    qty = 0
+    if not pd.isna(row[cols["quantity"]]):
+        try:
+            qty = int(float(row[cols["quantity"]]))
+        except Exception:
+            qty = 0
+
+    chan = normalize_channel(row[cols["channel"]]) if cols.get("channel") else "unknown"
+    date_val = parse_date(row[cols["date"]])
+    if date_val is None:
+        # if date missing, skip the row
+        return None
+
+    return {"line": line, "sku": sku, "date": date_val, "quantity": qty, "channel": chan}
+
+
+CORPUS = Path(__file__).parent / "data" / "sku_corpus.txt"
+
+# hand-written oddities on top of the real SKUs
+EDGE_SKUS = [
+    "A", "A-", "-A", "A--B", " A - B - C ", "A-B-C-D-E-F-G", "0049-0049-0049",
+    "X-1-RE-RE-M", "X-1-M-M", "X-1-PI-PI", "X-1-DK/BU-2XL", "X-1-BU/-XXXL",
+    "X-1-, ,-F", "X-1-01-XL", "X-1-ABC-2X", "X-1-ABC-3x", "X-1-ABC-one size",
+    "X-1-ABC-42-44", "X-1-ABC-4–6", "X-1-ABC-xxxxl", "X-1-ABC-s,m", "X-1-ABC-m/l",
+    "X-1-สีแดง-L", "X-1-ะ-L", "X-1-_-L", "X-1-/X-L", "X-1-a,b-L", "SKU 1 - 2",
+]
+
+SIZE_CASES = {
+    None: None, "": None, " ": None, "s": "S", " m ": "M", "XL/XXL": "XL", "L,XL": "L",
+    "2 XL": "2XL", "42": None, "40-42": None, "1–2": None, "XXL": "XXL", "XXXL": "3XL",
+    "XXXXL": None, "xxl": "XXL", "2x": "2XL", "3X": "3XL", "2XL": "2XL", "4XL": None,
+    "one": "F", "ONE SIZE": "F", "os": "F", "F": "F", "FF": "FF", "free": None,
+    "/": None, ",": None, "M/": "M", "/M": None,
+}
+
+COLOR_CASES = [
+    None, "", " ", "RE", " bu ", "01", "123", "RE,BU", " , BU", ",,", ", ,", "DK/BU",
+    "/BU", "BU/", "Red1", "สีแดง", "ะ", "_", "-", "1-2", "é", "a b", "01/RE",
+]
+
+CHANNEL_CASES = [
+    "TIKTOK - PAJARA OFFICIAL", "Shopee - PAJARA OFFICIAL", "LINE", "LINE ", "Facebook PAJARA",
+    "Lazada - PAJARA OFFICIAL", "Event", "TIKTOK", "หน้าร้าน", "Instagram pajara.official",
+    "LINE MyShop - PAJARA OFFICIAL", "KetShopWeb", "Facebook PJR WISE WEAR", "PAJARA",
+    "pajara official", "/", "-", " - ", "--x", "a/b", "Shopee/PAJARA", "", " ", None,
+    float("nan"), 123, 1.5,
+]
+
+
+def _corpus():
+    lines = CORPUS.read_text(encoding="utf-8").splitlines()
+    return [l for l in lines if l and not l.startswith("#")] + EDGE_SKUS
+
+
+def test_size_normalization():
+    expected = list(SIZE_CASES.values())
+    assert normalize_size_series(pd.Series(list(SIZE_CASES), dtype=object)).tolist() == expected
+    assert [normalize_size(v) for v in SIZE_CASES] == expected
+
+
+def test_color_parity():
+    assert normalize_color_series(pd.Series(COLOR_CASES, dtype=object)).tolist() == [normalize_color(v) for v in COLOR_CASES]
+
+
+def test_channel_parity():
+    got = normalize_channel_series(pd.Series(CHANNEL_CASES, dtype=object)).tolist()
+    assert got == [normalize_channel(v) for v in CHANNEL_CASES]
+
+
+def test_product_frame_parity_on_sku_corpus():
+    skus = _corpus()
+    n = len(skus)
+    rng = np.random.default_rng(7)
+    qty = rng.integers(0, 50, n).astype(float)
+    qty[::17] = np.nan
+    categories = np.array(["ชุดนอน Lite Doraemon", "แถม คริสต์มาส", "แถม", "  T-Shirt MHA ", None], dtype=object)
+    subs = np.array([None, "", " ถุง ", None], dtype=object)
+    df = pd.DataFrame({
+        "รหัสสินค้า": skus,
+        "ชื่อสินค้า": [f"name {i}" if i % 11 else None for i in range(n)],
+        "หมวดหมู่": categories[np.arange(n) % len(categories)],
+        "หมวดหมู่ย่อย": subs[np.arange(n) % len(subs)],
+        "จำนวน": qty,
+    })
+    df.loc[5, "รหัสสินค้า"] = None
+    df.loc[6, "รหัสสินค้า"] = "   "
+    cols = {"sku": "รหัสสินค้า", "name": "ชื่อสินค้า", "category": "หมวดหมู่", "subcategory": "หมวดหมู่ย่อย", "quantity": "จำนวน"}
+
+    expected = [r for r in (parse_product_row(row, cols) for _, row in df.iterrows()) if r is not None]
+    frame, skipped = normalize_product_frame(df, cols)
+    assert skipped == n - len(expected)
+    assert frame_records(frame) == expected
+
+
+def test_sales_frame_parity():
+    raw_dates = ["25/9/2024", "1/8/2025", datetime(2025, 1, 2, 10, 30), "not a date", None, "2025-02-03"]
+    skus = _corpus()[:600] + [None, "", "nan", " 12 ", 12345]
+    n = len(skus)
+    df = pd.DataFrame({
+        "วันที่ทำรายการ": [raw_dates[i % len(raw_dates)] for i in range(n)],
+        "รหัสสินค้า": skus,
+        "จำนวน": [("2" if i % 5 == 0 else i % 4) if i % 9 else None for i in range(n)],
+        "ช่องทางการขาย": [CHANNEL_CASES[i % len(CHANNEL_CASES)] for i in range(n)],
+    })
+    cols = {"date": "วันที่ทำรายการ", "sku": "รหัสสินค้า", "quantity": "จำนวน", "channel": "ช่องทางการขาย"}
+
+    expected = [r for r in (parse_sale_row(row, cols, line=i + 3) for i, (_, row) in enumerate(df.iterrows())) if r is not None]
+    frame, skipped = normalize_sales_frame(df, cols, first_line=3)
+    assert skipped == n - len(expected)
+    assert frame_records(frame) == expected
@@ -0,0 +1,76 @@
+"""Parsing in the worker pool must match inline parsing and keep the API responsive."""
+import asyncio
+import time
+from functools import partial
+
+import httpx
+import openpyxl
+import pytest
+
+from backend.app.ingest.normalize import normalize_sales_frame
+from backend.app.ingest.pipeline import parse_chunks
+from backend.app.main import app
+from backend.scripts.import_sales import detect_required_columns
+
+ROWS = 8_000
+CHANNELS = ["TIKTOK - PAJARA OFFICIAL", "Shopee - PAJARA OFFICIAL", "LINE", "Facebook PAJARA"]
+
+
+@pytest.fixture(scope="module")
+def sales_export(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pipeline") / "sales.xlsx"
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["รายงานการขาย"])
+    ws.append(["ประเภท", "รายการ", "ช่องทางการขาย", "วันที่ทำรายการ", "รหัสสินค้า", "ชื่อสินค้า", "จำนวน", "หมวดหมู่"])
+    for i in range(ROWS):
+        ws.append([
+            "ขายออก", f"{240925000000 + i}", CHANNELS[i % 4], f"{i % 28 + 1}/9/2024",
+            f"SC-{i % 3000:04d}-SS-PI-{'SML'[i % 3]}", "ชุดนอน Pajara", i % 3 + 1, "ชุดนอน",
+        ])
+    ws.append(["Exported by", "someone@example.com"])
+    wb.save(path)
+    return str(path)
+
+
+async def collect(path, inline):
+    normalize = partial(normalize_sales_frame, first_line=1)
+    return [chunk async for chunk in parse_chunks(path, detect_required_columns, normalize, header_row=1, chunk_size=2000, inline=inline)]
+
+
+def test_pool_matches_inline(sales_export):
+    pooled = asyncio.run(collect(sales_export, inline=False))
+    inline = asyncio.run(collect(sales_export, inline=True))
+    assert [c.rows for c in pooled] == [c.rows for c in inline]
+    assert sum(c.rows for c in pooled) == ROWS
+    assert [c.records() for c in pooled] == [c.records() for c in inline]
+
+
+def test_bad_file_error_comes_back(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("a,b\n1,2\n")
+    with pytest.raises(ValueError, match="Could not detect required columns"):
+        asyncio.run(collect(str(path), inline=False))
+
+
+def test_health_stays_fast_while_parsing(sales_export):
+    async def run():
+        # warm the pool first so only parsing, not process start-up, overlaps the probes
+        await collect(sales_export, inline=False)
+
+        latencies = []
+        parsing = asyncio.create_task(collect(sales_export, inline=False))
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            while not parsing.done():
+                start = time.perf_counter()
+                r = await client.get("/health")
+                latencies.append(time.perf_counter() - start)
+                assert r.status_code == 200
+                await asyncio.sleep(0.02)
+        chunks = await parsing
+        return latencies, chunks
+
+    latencies, chunks = asyncio.run(run())
+    assert sum(c.rows for c in chunks) == ROWS
+    assert len(latencies) > 10
+    assert max(latencies) < 0.25
@@ -0,0 +1,97 @@
+"""The streaming readers must yield the rows ``pd.read_excel`` + ``clean_frame`` keep."""
+import csv
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+
+from backend.app.ingest.readers import clean_frame, detect_encoding, iter_excel_frames, iter_frames
+
+
+TITLE = ["รายงานการขาย"]
+HEADER = [" รหัสสินค้า ", "จำนวน", "วันที่ทำรายการ", None]
+FOOTER = [[], ["Exported by", "someone@example.com"], ["Date Time", "25/9/2025 09:25+07:00"]]
+
+
+def write_export(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in [TITLE, HEADER, *rows, *FOOTER]:
+        ws.append(row)
+    wb.save(path)
+
+
+def write_csv(path, rows, encoding, title=True):
+    with open(path, "w", encoding=encoding, newline="") as f:
+        writer = csv.writer(f)
+        for row in [TITLE] * title + [HEADER, *rows, *FOOTER]:
+            writer.writerow(["" if v is None else v for v in row])
+
+
+SALES_ROWS = [
+    ["SC-0001-M", 2, "25/9/2024", None],
+    [None, None, None, None],
+    ["0049-RE-L", 1, "1/10/2024", None],
+    ["   ", None, None, None],
+    ["SC-0002-ดำ-F", 3, "2/10/2024", None],
+]
+
+
+def test_chunks_match_read_excel(tmp_path):
+    rows = []
+    for i in range(23):
+        if i % 7 == 3:
+            rows.append([None, None, None, None])
+        elif i % 7 == 5:
+            rows.append(["   ", None, None, None])
+        else:
+            rows.append([f"SC-{i:04d}-M", i % 3 + 1, "25/9/2024" if i % 2 else datetime(2024, 9, i + 1), None])
+    path = tmp_path / "sales.xlsx"
+    write_export(path, rows)
+
+    chunks = list(iter_excel_frames(str(path), header_row=1, chunk_size=4))
+    assert len(chunks) == 7
+    assert all(len(c) <= 4 for c in chunks)
+
+    streamed = pd.concat(chunks)
+    expected = clean_frame(pd.read_excel(path, engine="openpyxl", header=1))
+    assert list(streamed.columns) == ["รหัสสินค้า", "จำนวน", "วันที่ทำรายการ", "Unnamed: 3"]
+    # labels are 0-based sheet rows: read_excel's data-row index past the title and header
+    assert list(streamed.index) == [i + 2 for i in expected.index]
+    for col in ["รหัสสินค้า", "จำนวน", "วันที่ทำรายการ"]:
+        assert streamed[col].tolist() == expected[col].tolist()
+
+
+def test_empty_sheet_still_yields_columns(tmp_path):
+    path = tmp_path / "empty.xlsx"
+    write_export(path, [])
+    chunks = list(iter_excel_frames(str(path), header_row=1))
+    assert len(chunks) == 1
+    assert chunks[0].empty
+    assert "รหัสสินค้า" in chunks[0].columns
+
+
+def test_detect_encoding(tmp_path):
+    for encoding, expected in [("utf-8-sig", "utf-8-sig"), ("utf-8", "utf-8"), ("tis-620", "cp874"), ("cp874", "cp874")]:
+        path = tmp_path / f"{encoding}.csv"
+        write_csv(path, SALES_ROWS, encoding)
+        assert detect_encoding(str(path)) == expected
+
+
+def test_csv_matches_excel(tmp_path):
+    xlsx = tmp_path / "sales.xlsx"
+    write_export(xlsx, SALES_ROWS)
+    excel = pd.concat(iter_frames(str(xlsx), header_row=1))
+
+    for encoding in ["utf-8-sig", "tis-620"]:
+        for title in [True, False]:
+            path = tmp_path / f"sales-{encoding}-{title}.csv"
+            write_csv(path, SALES_ROWS, encoding, title=title)
+            chunks = list(iter_frames(str(path), chunk_size=2))
+            assert len(chunks) == 4
+            frame = pd.concat(chunks)
+            assert list(frame.columns) == list(excel.columns)
+            assert list(frame.index) == [i - (not title) for i in excel.index]
+            assert frame["รหัสสินค้า"].tolist() == ["SC-0001-M", "0049-RE-L", "SC-0002-ดำ-F"]
+            assert frame["จำนวน"].tolist() == ["2", "1", "3"]
+            assert frame["วันที่ทำรายการ"].tolist() == excel["วันที่ทำรายการ"].tolist()
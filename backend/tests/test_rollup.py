@@ -0,0 +1,22 @@
+from datetime import date
+
+from backend.app.rollup import daily_totals
+
+
+def test_daily_totals_sums_per_key_in_key_order():
+    d1, d2 = date(2025, 1, 2), date(2025, 1, 1)
+    sales = [
+        {"line": 3, "sku": "B", "channel": "Shopee", "date": d1, "quantity": 2},
+        {"line": 4, "sku": "A", "channel": "Shopee", "date": d1, "quantity": 1},
+        {"line": 5, "sku": "B", "channel": "Shopee", "date": d1, "quantity": 3},
+        {"line": 6, "sku": "B", "channel": "TIKTOK", "date": d2, "quantity": -1},
+    ]
+    assert daily_totals(sales) == [
+        {"sku": "A", "channel": "Shopee", "date": d1, "quantity": 1},
+        {"sku": "B", "channel": "Shopee", "date": d1, "quantity": 5},
+        {"sku": "B", "channel": "TIKTOK", "date": d2, "quantity": -1},
+    ]
+
+
+def test_daily_totals_empty():
+    assert daily_totals([]) == []
@@ -0,0 +1,116 @@
+"""POST /sales/batch: per-item results, stock limits and idempotent retries."""
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import delete, func, select, update
+
+from backend.app import models
+from backend.app.database import AsyncSessionLocal
+from backend.app.main import app
+
+pytestmark = pytest.mark.db
+
+
+def sale(sku: str, quantity: int, channel: str = "Shopee") -> dict:
+    return {"channel": channel, "date": "2025-01-01", "sku": sku, "quantity": quantity}
+
+
+async def scenario(seed_products, tag: str):
+    a, b, missing = f"BATCH-{tag}-A", f"BATCH-{tag}-B", f"BATCH-{tag}-MISSING"
+    keys = [f"{tag}-1", f"{tag}-2"]
+    out = {}
+    async with seed_products({a: 5, b: 10}):
+        try:
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                items = [sale(a, 3), sale(b, 4), sale(a, 3), sale(missing, 1), sale(a, 2, "TikTok")]
+                first = await client.post("/sales/batch", json={"items": items}, headers={"Idempotency-Key": keys[0]})
+                retry = await client.post("/sales/batch", json={"items": items}, headers={"Idempotency-Key": keys[0]})
+                reused = await client.post("/sales/batch", json={"items": items[:1]}, headers={"Idempotency-Key": keys[0]})
+                # concurrent deliveries of one webhook
+                burst = await asyncio.gather(*(
+                    client.post("/sales/batch", json={"items": [sale(b, 1)]}, headers={"Idempotency-Key": keys[1]})
+                    for _ in range(20)
+                ))
+                out.update(first=first, retry=retry, reused=reused, burst=burst)
+            async with AsyncSessionLocal() as db:
+                p, s, d = models.Product, models.ProductSale, models.SalesDaily
+                out["stock"] = dict((await db.execute(select(p.sku, p.stock_level).where(p.sku.in_([a, b])))).all())
+                out["sold"] = dict((await db.execute(
+                    select(s.sku, func.sum(s.quantity)).where(s.sku.in_([a, b])).group_by(s.sku)
+                )).all())
+                out["rolled_up"] = dict((await db.execute(
+                    select(d.sku, func.sum(d.quantity)).where(d.sku.in_([a, b])).group_by(d.sku)
+                )).all())
+        finally:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(models.SaleBatch).where(models.SaleBatch.idempotency_key.in_(keys)))
+                await db.commit()
+    return a, b, out
+
+
+@pytest.fixture(scope="module")
+def results(run_db, seed_products):
+    return run_db(scenario(seed_products, uuid.uuid4().hex[:8]))
+
+
+def test_items_are_taken_in_order_while_stock_lasts(results):
+    a, b, out = results
+    body = out["first"].json()
+    assert out["first"].status_code == 200
+    assert [i["status"] for i in body["items"]] == [
+        "created", "created", "insufficient_stock", "unknown_sku", "created",
+    ]
+    assert [i["index"] for i in body["items"]] == [0, 1, 2, 3, 4]
+    assert (body["created"], body["rejected"], body["replayed"]) == (3, 2, False)
+    assert all((i["sale_id"] is not None) == (i["status"] == "created") for i in body["items"])
+
+
+def test_retry_with_same_key_is_replayed(results):
+    _, _, out = results
+    assert out["retry"].status_code == 200
+    assert out["retry"].json() == {**out["first"].json(), "replayed": True}
+    assert out["reused"].status_code == 409
+
+
+def test_concurrent_retries_record_once(results):
+    _, _, out = results
+    bodies = [r.json() for r in out["burst"]]
+    assert all(r.status_code == 200 for r in out["burst"])
+    assert len({body["items"][0]["sale_id"] for body in bodies}) == 1
+    assert sum(not body["replayed"] for body in bodies) == 1
+
+
+def test_stock_and_rollup(results):
+    a, b, out = results
+    assert out["stock"] == {a: 0, b: 5}
+    assert out["sold"] == {a: 5, b: 5}
+    assert out["rolled_up"] == out["sold"]
+
+
+async def null_stock(seed_products, tag: str):
+    single, batch = f"NULLSTOCK-{tag}-S", f"NULLSTOCK-{tag}-B"
+    async with seed_products({single: 0, batch: 0}) as skus:
+        async with AsyncSessionLocal() as db:
+            # the ORM would fill in the column default for None
+            await db.execute(update(models.Product).where(models.Product.sku.in_(skus)).values(stock_level=None))
+            await db.commit()
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            statuses = {
+                "single": [(await client.post("/sales/", json=sale(single, q))).status_code for q in (1, 0)],
+                "batch": [
+                    item["status"]
+                    for item in (await client.post("/sales/batch", json={"items": [sale(batch, 1), sale(batch, 0)]})).json()["items"]
+                ],
+            }
+        async with AsyncSessionLocal() as db:
+            p = models.Product
+            stock = dict((await db.execute(select(p.sku, p.stock_level).where(p.sku.in_([single, batch])))).all())
+    return statuses, stock[single], stock[batch]
+
+
+def test_single_and_batch_sales_treat_missing_stock_as_zero(run_db, seed_products):
+    statuses, single_stock, batch_stock = run_db(null_stock(seed_products, uuid.uuid4().hex[:8]))
+    assert statuses == {"single": [400, 200], "batch": ["insufficient_stock", "created"]}
+    assert single_stock == batch_stock == 0
@@ -0,0 +1,42 @@
+"""Load test: many concurrent sales of one SKU never oversell it."""
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from backend.app import models
+from backend.app.database import AsyncSessionLocal
+from backend.app.main import app
+
+pytestmark = pytest.mark.db
+
+STOCK = 100
+ORDERS = 300
+
+
+async def fire_sales(seed_products, sku: str):
+    async with seed_products({sku: STOCK}):
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            sale = {"channel": "load-test", "date": "2025-01-01", "sku": sku, "quantity": 1}
+            responses = await asyncio.gather(*(client.post("/sales/", json=sale) for _ in range(ORDERS)))
+        async with AsyncSessionLocal() as db:
+            stock = await db.scalar(select(models.Product.stock_level).where(models.Product.sku == sku))
+            sold = await db.scalar(select(func.sum(models.ProductSale.quantity)).where(models.ProductSale.sku == sku))
+            rolled_up = await db.scalar(select(func.sum(models.SalesDaily.quantity)).where(models.SalesDaily.sku == sku))
+        return responses, stock, sold, rolled_up
+
+
+def test_concurrent_sales_never_oversell(run_db, seed_products):
+    responses, stock, sold, rolled_up = run_db(fire_sales(seed_products, f"LOADTEST-{uuid.uuid4().hex[:8]}"))
+
+    ok = [r for r in responses if r.status_code == 200]
+    rejected = [r for r in responses if r.status_code == 400]
+    assert len(ok) == STOCK
+    assert len(rejected) == ORDERS - STOCK
+    assert all(r.json()["detail"] == "Insufficient stock" for r in rejected)
+    assert len({r.json()["sale_id"] for r in ok}) == STOCK
+    assert stock == 0
+    assert sold == STOCK
+    assert rolled_up == STOCK
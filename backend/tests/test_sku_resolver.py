@@ -0,0 +1,49 @@
+from backend.app.ingest.sku_resolver import SkuResolver
+
+
+CATALOG = [
+    "SC-0020-SS-PI-FF\\CL",
+    "SC-0020-SS-PI-FF/CL",
+    "SC-0020-SS-PI-FF-CL",
+    "SC-0020-SS-PI-FF/QC",
+    "SC-0053-SL-YE-F/CL",
+    "SC-0053-SL-YE-F/QC",
+    "SC-0053-SL-YE-F-X",
+    "KF-0016-DRS-GE-F/QC",
+    "ABC-123-XL",
+    "ABC-123-XXL",
+    "PJR-0007-02",
+]
+
+
+def test_exact_and_single_prefix_match():
+    r = SkuResolver(CATALOG)
+    assert r.resolve("PJR-0007-02") == "PJR-0007-02"
+    assert r.resolve("KF-0016-DRS-GE-F") == "KF-0016-DRS-GE-F/QC"
+
+
+def test_priority_suffixes_then_shortest():
+    r = SkuResolver(CATALOG)
+    assert r.resolve("SC-0020-SS-PI-FF") == "SC-0020-SS-PI-FF\\CL"
+    assert r.resolve("SC-0053-SL-YE-F") == "SC-0053-SL-YE-F/CL"
+    r = SkuResolver([s for s in CATALOG if not s.endswith("CL")])
+    # no CL variant: shortest wins, ties broken alphabetically
+    assert r.resolve("SC-0053-SL-YE-F") == "SC-0053-SL-YE-F-X"
+    assert r.resolve("SC-0020-SS-PI-FF") == "SC-0020-SS-PI-FF/QC"
+
+
+def test_leading_parts_match():
+    r = SkuResolver(CATALOG)
+    assert r.resolve("ABC-12") == "ABC-123-XL"
+    assert r.resolve("ABC-123-S") is None
+    # parts split on '/' too
+    assert r.resolve("SC-0053-SL-YE-F-QC") == "SC-0053-SL-YE-F/QC"
+    assert r.resolve("ZZZ-1") is None
+
+
+def test_added_skus_are_visible_and_invalidate_cache():
+    r = SkuResolver(CATALOG)
+    assert r.resolve("NEW-1") is None
+    r.add("NEW-1-M")
+    assert r.resolve("NEW-1") == "NEW-1-M"
+    assert "NEW-1-M" in r
@@ -0,0 +1,61 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+
+from backend.app import streaming
+from backend.app.streaming import json_array_body, ndjson_body
+
+
+async def batches(*groups):
+    for group in groups:
+        yield group
+
+
+def collect(body) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in body])
+    return asyncio.run(run())
+
+
+SALES = [
+    {"sale_id": 1, "date": date(2024, 9, 25), "sku": "A-1", "channel": "ร้าน", "quantity": 2},
+    {"sale_id": 2, "date": date(2024, 9, 26), "sku": "A-2", "channel": "web", "quantity": 1},
+    {"sale_id": 3, "date": date(2024, 9, 27), "sku": "A-3", "channel": "web", "quantity": 5},
+]
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(streaming, "orjson", None)
+    elif streaming.orjson is None:
+        pytest.skip("orjson not installed")
+
+
+def test_ndjson_one_row_per_line(encoder):
+    body = collect(ndjson_body(batches(SALES[:2], [], SALES[2:])))
+    lines = body.decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{**s, "date": s["date"].isoformat()} for s in SALES]
+
+
+def test_json_array_is_one_document(encoder):
+    body = collect(json_array_body(batches(SALES[:1], SALES[1:])))
+    assert json.loads(body) == [{**s, "date": s["date"].isoformat()} for s in SALES]
+
+
+def test_json_array_empty(encoder):
+    assert collect(json_array_body(batches())) == b"[]"
+    assert collect(json_array_body(batches([], []))) == b"[]"
+
+
+@pytest.mark.parametrize("data, cut", [
+    (b"1,a\n2,b\n3,c", 8),
+    (b"1,a\n2,b\n", 8),
+    (b"1,a", 0),
+    (b'1,"x\ny"\n2,"z\n', 8),  # newline inside an open quoted value is not a row end
+    (b'1,"say ""hi""\n"\n2,b\n', 20),
+])
+def test_csv_row_boundary(data, cut):
+    assert streaming.csv_row_boundary(data) == cut
@@ -5,12 +5,13 @@ import { useRouter } from "next/navigation"
 
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
+import { Button } from "@/components/ui/button"
 import { Progress } from "@/components/ui/progress"
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
 import { Tabs, TabsList, TabsTrigger, TabsContent } from "@/components/ui/tabs"
 
 import { AlertTriangle, Package, DollarSign, BarChart3, PieChart, Target, Truck, Clock, TrendingUp } from "lucide-react"
-import { getProducts, getCategories, setDataSource, getDataSource, getAllSales, analyzeSalesData } from '@/lib/api'
+import { getProducts, getCategories, setDataSource, getDataSource, getSalesAnalytics } from '@/lib/api'
 import { Product } from '@/components/stock/stock-management'
 
 export function InventorySummary() {
@@ -29,6 +30,10 @@ export function InventorySummary() {
   })
   const [salesData, setSalesData] = useState<Map<string, any>>(new Map())
   const [loadingSales, setLoadingSales] = useState(false)
+  // keyset cursor of the next /products/ page; null once every page is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [totalEstimate, setTotalEstimate] = useState<number | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   // Persist and apply data source when it changes
   useEffect(() => {
@@ -39,6 +44,93 @@ export function InventorySummary() {
     // The loadData effect will trigger automatically when dataSource changes
   }, [dataSource])
 
+  // Derived stock and sales metrics for a page of products
+  const enhanceProducts = (productsData: Product[], currentSalesData: Map<string, any>) =>
+    productsData.map(p => {
+      const product = p as any // Type assertion to access optional properties
+      
+      // Get sales analysis if available
+      const sku = p.sku || String(p.id || '')
+      const salesAnalysis = currentSalesData.get(sku)
+      
+      // Use real sales data when available, otherwise generate mock data
+      let dailySalesRate = 0
+      let daysUntilStockout = 999
+      let salesTrend: 'increasing' | 'stable' | 'decreasing' = 'stable'
+      let daysSinceLastSale = 999
+      
+      if (salesAnalysis && dataSource === 'pajara') {
+        // Use real sales analysis for pajara
+        dailySalesRate = salesAnalysis.averageDailySales
+        const stockLevel = p.stock_level || p.quantity || 0
+        daysUntilStockout = dailySalesRate > 0 ? Math.floor(stockLevel / dailySalesRate) : 999
+        daysSinceLastSale = salesAnalysis.daysSinceLastSale
+        
+        if (daysSinceLastSale <= 7) {
+          salesTrend = 'increasing'
+        } else if (daysSinceLastSale <= 30) {
+          salesTrend = 'stable'
+        } else {
+          salesTrend = 'decreasing'
+        }
+      } else {
+        // Use mock data for other sources or when sales data is not available
+        dailySalesRate = product.daily_sales_rate || Math.random() * 5 + 0.5
+        const stockLevel = p.stock_level || p.quantity || 0
+        daysUntilStockout = dailySalesRate > 0 ? Math.floor(stockLevel / dailySalesRate) : 999
+        daysSinceLastSale = Math.floor(Math.random() * 120)
+        
+        salesTrend = daysSinceLastSale > 90 ? 'decreasing' :
+                    daysUntilStockout < 7 ? 'increasing' : 
+                    daysUntilStockout < 30 ? 'stable' : 'decreasing'
+      }
+      
+      const leadTime = product.lead_time_days || 14
+      const stockLevel = p.stock_level || p.quantity || 0
+      const reorderPoint = Math.max(p.low_stock_threshold || 0, leadTime * dailySalesRate)
+      
+      const isSlowMoving = daysSinceLastSale > 60
+      const isDeadStock = daysSinceLastSale > 90
+      
+      // Calculate total sales volume
+      const monthlySales = product.monthly_sales || Math.floor(dailySalesRate * 30)
+      const totalSalesValue = monthlySales * (Math.random() * 100 + 20)
+
+      return {
+        ...p,
+        quantity: stockLevel, // Normalize quantity field
+        daily_sales_rate: dailySalesRate,
+        days_until_stockout: daysUntilStockout,
+        reorder_point: reorderPoint,
+        sales_trend: salesTrend,
+        lead_time_days: leadTime,
+        monthly_sales: monthlySales,
+        total_sales_value: totalSalesValue,
+        days_since_last_sale: daysSinceLastSale,
+        is_slow_moving: isSlowMoving,
+        is_dead_stock: isDeadStock
+      } as Product & {
+        total_sales_value: number,
+        days_since_last_sale: number,
+        is_slow_moving: boolean,
+        is_dead_stock: boolean
+      }
+    })
+
+  const loadMoreProducts = async () => {
+    if (!nextCursor || loadingMore) return
+    try {
+      setLoadingMore(true)
+      const productsPage = await getProducts(undefined, nextCursor)
+      setProducts(prev => [...prev, ...enhanceProducts(productsPage.items, salesData)])
+      setNextCursor(productsPage.next_cursor)
+    } catch (error) {
+      console.error('Failed to load more products:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   // Load data
   useEffect(() => {
     const loadData = async () => {
@@ -50,23 +142,8 @@ export function InventorySummary() {
         if (dataSource === 'pajara') {
           try {
             setLoadingSales(true)
-            const sales = await getAllSales()
-            
-            // Group sales by SKU and analyze each
-            const salesGrouped: { [sku: string]: any[] } = {}
-            for (const sale of sales) {
-              if (!salesGrouped[sale.sku]) {
-                salesGrouped[sale.sku] = []
-              }
-              salesGrouped[sale.sku].push(sale)
-            }
-            
-            // Analyze each product's sales
-            for (const [sku, productSales] of Object.entries(salesGrouped)) {
-              const analysis = analyzeSalesData(productSales)
-              currentSalesData.set(sku, analysis)
-            }
-            
+            // Per-SKU sales metrics, aggregated by the backend
+            currentSalesData = await getSalesAnalytics()
             setSalesData(currentSalesData)
           } catch (error) {
             console.error('Failed to load sales data:', error)
@@ -75,7 +152,8 @@ export function InventorySummary() {
           }
         }
         
-        const [productsData, categoriesData] = await Promise.all([
+        // First page only; "Load more" fetches the next ones by cursor
+        const [productsPage, categoriesData] = await Promise.all([
           getProducts(),
           getCategories()
         ])
@@ -89,78 +167,11 @@ export function InventorySummary() {
           }))
         
         // Enhance products with calculated metrics
-        const enhancedProducts = productsData.map(p => {
-          const product = p as any // Type assertion to access optional properties
-          
-          // Get sales analysis if available
-          const sku = p.sku || String(p.id || '')
-          const salesAnalysis = currentSalesData.get(sku)
-          
-          // Use real sales data when available, otherwise generate mock data
-          let dailySalesRate = 0
-          let daysUntilStockout = 999
-          let salesTrend: 'increasing' | 'stable' | 'decreasing' = 'stable'
-          let daysSinceLastSale = 999
-          
-          if (salesAnalysis && dataSource === 'pajara') {
-            // Use real sales analysis for pajara
-            dailySalesRate = salesAnalysis.averageDailySales
-            const stockLevel = p.stock_level || p.quantity || 0
-            daysUntilStockout = dailySalesRate > 0 ? Math.floor(stockLevel / dailySalesRate) : 999
-            daysSinceLastSale = salesAnalysis.daysSinceLastSale
-            
-            if (daysSinceLastSale <= 7) {
-              salesTrend = 'increasing'
-            } else if (daysSinceLastSale <= 30) {
-              salesTrend = 'stable'
-            } else {
-              salesTrend = 'decreasing'
-            }
-          } else {
-            // Use mock data for other sources or when sales data is not available
-            dailySalesRate = product.daily_sales_rate || Math.random() * 5 + 0.5
-            const stockLevel = p.stock_level || p.quantity || 0
-            daysUntilStockout = dailySalesRate > 0 ? Math.floor(stockLevel / dailySalesRate) : 999
-            daysSinceLastSale = Math.floor(Math.random() * 120)
-            
-            salesTrend = daysSinceLastSale > 90 ? 'decreasing' :
-                        daysUntilStockout < 7 ? 'increasing' : 
-                        daysUntilStockout < 30 ? 'stable' : 'decreasing'
-          }
-          
-          const leadTime = product.lead_time_days || 14
-          const stockLevel = p.stock_level || p.quantity || 0
-          const reorderPoint = Math.max(p.low_stock_threshold || 0, leadTime * dailySalesRate)
-          
-          const isSlowMoving = daysSinceLastSale > 60
-          const isDeadStock = daysSinceLastSale > 90
-          
-          // Calculate total sales volume
-          const monthlySales = product.monthly_sales || Math.floor(dailySalesRate * 30)
-          const totalSalesValue = monthlySales * (Math.random() * 100 + 20)
-
-          return {
-            ...p,
-            quantity: stockLevel, // Normalize quantity field
-            daily_sales_rate: dailySalesRate,
-            days_until_stockout: daysUntilStockout,
-            reorder_point: reorderPoint,
-            sales_trend: salesTrend,
-            lead_time_days: leadTime,
-            monthly_sales: monthlySales,
-            total_sales_value: totalSalesValue,
-            days_since_last_sale: daysSinceLastSale,
-            is_slow_moving: isSlowMoving,
-            is_dead_stock: isDeadStock
-          } as Product & {
-            total_sales_value: number,
-            days_since_last_sale: number,
-            is_slow_moving: boolean,
-            is_dead_stock: boolean
-          }
-        })
+        const enhancedProducts = enhanceProducts(productsPage.items, currentSalesData)
         
         setProducts(enhancedProducts)
+        setNextCursor(productsPage.next_cursor)
+        setTotalEstimate(productsPage.total_estimate)
         setCategories(validCategories)
       } catch (error) {
         console.error('Failed to load inventory data:', error)
@@ -299,6 +310,17 @@ export function InventorySummary() {
               </span>
             )}
           </p>
+          {nextCursor && (
+            <div className="mt-2 flex items-center gap-2 text-sm text-muted-foreground">
+              <span>
+                Figures cover the first {products.length.toLocaleString()}
+                {totalEstimate != null && <> of about {Math.max(totalEstimate, products.length).toLocaleString()}</>} products
+              </span>
+              <Button size="sm" variant="outline" onClick={loadMoreProducts} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load more products'}
+              </Button>
+            </div>
+          )}
         </div>
         <div className="flex items-center gap-2">
           <Select value={selectedCategory} onValueChange={setSelectedCategory}>
@@ -10,7 +10,7 @@ import { Badge } from "@/components/ui/badge"
 import { ArrowLeft, TrendingUp, TrendingDown, Package, DollarSign, BarChart3 } from "lucide-react"
 
 
-import { apiFetch, getDataSource } from '@/lib/api'
+import { apiFetch, getDataSource, getSalesSeries, type SalesSeriesPoint } from '@/lib/api'
 import { useAppToast } from '@/lib/use-toast'
 import type { Product } from "@/components/stock/stock-management"
 
@@ -35,6 +35,7 @@ export function ProductDetails({ productId }: ProductDetailsProps) {
   const [error, setError] = useState<string | null>(null)
   const [sales, setSales] = useState<Sale[]>([])
   const [loadingSales, setLoadingSales] = useState(true)
+  const [monthlySales, setMonthlySales] = useState<SalesSeriesPoint[]>([])
 
   // Channel color mapping for consistent visualization
   const channelColors = {
@@ -66,8 +67,12 @@ export function ProductDetails({ productId }: ProductDetailsProps) {
       
       // Only fetch real data if using pajara backend
       if (getDataSource() === 'pajara') {
-        // Use the new dedicated endpoint to fetch sales for a single SKU
-        const res = await apiFetch(`/sales/${encodeURIComponent(productSku)}`)
+        // Use the new dedicated endpoint to fetch sales for a single SKU;
+        // the chart reads monthly totals from the sales_daily rollup
+        const [res, monthly] = await Promise.all([
+          apiFetch(`/sales/${encodeURIComponent(productSku)}`),
+          getSalesSeries({ sku: [productSku], interval: 'month' })
+        ])
         if (!res.ok) throw new Error('Failed to fetch sales for SKU')
         const skuSales: Sale[] = await res.json()
 
@@ -75,9 +80,11 @@ export function ProductDetails({ productId }: ProductDetailsProps) {
         skuSales.sort((a, b) => new Date(b.date).getTime() - new Date(a.date).getTime())
 
         setSales(skuSales)
+        setMonthlySales(monthly)
       } else {
         // Not using backend: do not generate mock sales. Clear sales so UI shows empty state.
         setSales([])
+        setMonthlySales([])
       }
     } catch (err: any) {
       console.error('Error fetching sales:', err)
@@ -88,6 +95,7 @@ export function ProductDetails({ productId }: ProductDetailsProps) {
       })
       // Do not fallback to mock sales data; clear sales so UI remains accurate
       setSales([])
+      setMonthlySales([])
     } finally {
       setLoadingSales(false)
     }
@@ -109,23 +117,20 @@ export function ProductDetails({ productId }: ProductDetailsProps) {
 
   // Prepare chart data for monthly sales over time
   const prepareSalesChartData = () => {
-    if (sales.length === 0) return []
+    if (monthlySales.length === 0) return []
 
-    // Group sales by month and channel
+    // Pivot the monthly (month, channel) totals into one entry per month
     const salesByMonth: Record<string, Record<string, number>> = {}
     
-    sales.forEach(sale => {
-      // Create month key (YYYY-MM format)
-      const saleDate = new Date(sale.date)
-      const monthKey = `${saleDate.getFullYear()}-${String(saleDate.getMonth() + 1).padStart(2, '0')}`
+    monthlySales.forEach(point => {
+      // Month key (YYYY-MM format)
+      const monthKey = point.date.slice(0, 7)
+      const channel = point.channel ?? 'unknown'
       
       if (!salesByMonth[monthKey]) {
         salesByMonth[monthKey] = {}
       }
-      if (!salesByMonth[monthKey][sale.channel]) {
-        salesByMonth[monthKey][sale.channel] = 0
-      }
-      salesByMonth[monthKey][sale.channel] += sale.quantity
+      salesByMonth[monthKey][channel] = (salesByMonth[monthKey][channel] || 0) + point.quantity
     })
 
     // Convert to chart format with proper month names
@@ -159,18 +164,10 @@ export function ProductDetails({ productId }: ProductDetailsProps) {
       // Use real backend data if pajara source is selected
       if (getDataSource() === 'pajara') {
         try {
-          // First, get all products and find the one with matching ID
-          const res = await apiFetch('/products/')
-          if (!res.ok) throw new Error('Failed to fetch products')
-          const products: Product[] = await res.json()
-          
-          const foundProduct = products.find(p => p.id?.toString() === productId || p.sku === productId)
-          
-          if (!foundProduct) {
-            throw new Error('Product not found')
-          }
-          
-          productData = foundProduct
+          // Backend products are keyed by SKU
+          const res = await apiFetch(`/products/${encodeURIComponent(productId)}`)
+          if (!res.ok) throw new Error(res.status === 404 ? 'Product not found' : 'Failed to fetch product')
+          productData = await res.json()
         } catch (backendError) {
           console.error('Backend fetch failed, using mock data:', backendError)
           // Fallback to mock data
@@ -312,7 +309,7 @@ export function ProductDetails({ productId }: ProductDetailsProps) {
   })
   
   const chartData = prepareSalesChartData()
-  const uniqueChannels = Array.from(new Set(sales.map(sale => sale.channel)))
+  const uniqueChannels = Array.from(new Set(monthlySales.map(point => point.channel ?? 'unknown')))
   
   // Debug logging
   console.log('Sales data:', sales.length, 'sales')
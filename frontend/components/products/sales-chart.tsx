@@ -4,7 +4,7 @@ import { useState, useEffect } from "react"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { ChartContainer, ChartTooltip, ChartTooltipContent } from "@/components/ui/chart"
 import { Line, LineChart, XAxis, YAxis, CartesianGrid, ResponsiveContainer, Bar, BarChart } from "recharts"
-import { apiFetch } from "@/lib/api"
+import { getSalesSeries, type SalesSeriesPoint } from "@/lib/api"
 
 interface SalesChartProps {
   productId: string
@@ -21,27 +21,41 @@ interface SalesRecord {
   sale_date: string
 }
 
+interface ChartPoint {
+  month: string
+  sales: number
+  revenue?: number
+  sortKey: string
+}
+
 export function SalesChart({ productId, salesData: propSalesData, refreshTrigger }: SalesChartProps) {
-  const [salesData, setSalesData] = useState<SalesRecord[]>([])
+  const [monthlySales, setMonthlySales] = useState<SalesSeriesPoint[]>([])
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [isDark, setIsDark] = useState(false)
 
-    // Do not generate mock sales data. If `propSalesData` is provided from the parent
-    // (backend), use it. Otherwise, keep local state empty and show the empty state.
+    // If `propSalesData` is provided from the parent, chart it. Otherwise load the
+    // product's monthly totals from the sales_daily rollup (one row per month).
     useEffect(() => {
-      // If parent provided sales data, avoid local fetching/generation.
       if (Array.isArray(propSalesData)) {
-        setSalesData(propSalesData as SalesRecord[])
-        setLoading(false)
-        setError(null)
-      } else {
-        // Clear any previously set local data so mock data is never used.
-        setSalesData([])
+        setMonthlySales([])
         setLoading(false)
         setError(null)
+        return
       }
-    }, [propSalesData, refreshTrigger])
+      let cancelled = false
+      setLoading(true)
+      setError(null)
+      getSalesSeries({ sku: [productId], interval: 'month', by_channel: false })
+        .then(points => { if (!cancelled) setMonthlySales(points) })
+        .catch(err => {
+          if (cancelled) return
+          setMonthlySales([])
+          setError(err instanceof Error ? err.message : 'Failed to load sales data')
+        })
+        .finally(() => { if (!cancelled) setLoading(false) })
+      return () => { cancelled = true }
+    }, [productId, propSalesData, refreshTrigger])
 
   // Detect dark mode for chart color adjustments
   useEffect(() => {
@@ -62,21 +76,26 @@ export function SalesChart({ productId, salesData: propSalesData, refreshTrigger
     return () => { if (mq && mq.removeEventListener) mq.removeEventListener('change', listener) }
   }, [])
 
-  // Transform real sales data into chart format
-  const transformSalesData = (sales: SalesRecord[]) => {
+  const monthLabel = (monthKey: string) => {
+    const [year, month] = monthKey.split('-')
+    return new Date(parseInt(year), parseInt(month) - 1, 1)
+      .toLocaleDateString('en-US', { month: 'short', year: 'numeric' })
+  }
+
+  // Transform sales records passed by the parent into chart format
+  const transformSalesData = (sales: SalesRecord[]): ChartPoint[] => {
     // Add proper array validation
     if (!Array.isArray(sales) || sales.length === 0) return []
     
-    // Group sales by month
-    const monthlyData: { [key: string]: { sales: number, revenue: number, monthNumber: number } } = {}
+    // Group sales by month (YYYY-MM, so different years stay apart)
+    const monthlyData: { [key: string]: { sales: number, revenue: number } } = {}
     
     sales.forEach(sale => {
       const date = new Date(sale.sale_date)
-      const monthKey = date.toLocaleDateString('en-US', { month: 'short' })
-      const monthNumber = date.getMonth() // 0-11 for sorting
+      const monthKey = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`
       
       if (!monthlyData[monthKey]) {
-        monthlyData[monthKey] = { sales: 0, revenue: 0, monthNumber }
+        monthlyData[monthKey] = { sales: 0, revenue: 0 }
       }
       
       monthlyData[monthKey].sales += sale.quantity
@@ -85,18 +104,27 @@ export function SalesChart({ productId, salesData: propSalesData, refreshTrigger
     
     // Convert to chart format and sort by month order
     return Object.entries(monthlyData)
-      .map(([month, data]) => ({
-        month,
+      .map(([monthKey, data]) => ({
+        month: monthLabel(monthKey),
         sales: data.sales,
         revenue: Math.round(data.revenue * 100) / 100,
-        monthNumber: data.monthNumber
+        sortKey: monthKey
       }))
-      .sort((a, b) => a.monthNumber - b.monthNumber)
+      .sort((a, b) => a.sortKey.localeCompare(b.sortKey))
   }
+
+  // Monthly rollup points are already one per month, oldest first; they carry no prices
+  const transformSeries = (points: SalesSeriesPoint[]): ChartPoint[] =>
+    points.map(point => ({
+      month: monthLabel(point.date.slice(0, 7)),
+      sales: point.quantity,
+      sortKey: point.date
+    }))
   
-  // Use provided salesData or fetched data, ensure it's always an array
-  const safeData = Array.isArray(propSalesData) ? propSalesData : Array.isArray(salesData) ? salesData : []
-  const displayData = transformSalesData(safeData)
+  const displayData = Array.isArray(propSalesData)
+    ? transformSalesData(propSalesData as SalesRecord[])
+    : transformSeries(monthlySales)
+  const hasRevenue = displayData.some(d => d.revenue !== undefined)
   
   // Show loading state
   if (loading) {
@@ -136,11 +164,11 @@ export function SalesChart({ productId, salesData: propSalesData, refreshTrigger
   const gridStroke = isDark ? 'rgba(255,255,255,0.04)' : 'rgba(0,0,0,0.06)'
 
   return (
-    <div className="grid gap-4 md:grid-cols-2">
+    <div className={`grid gap-4 ${hasRevenue ? 'md:grid-cols-2' : ''}`}>
       <Card>
         <CardHeader>
           <CardTitle>Sales Volume</CardTitle>
-          <CardDescription>Monthly sales units over the past year</CardDescription>
+          <CardDescription>Monthly sales units</CardDescription>
         </CardHeader>
         <CardContent>
           <ChartContainer
@@ -165,6 +193,7 @@ export function SalesChart({ productId, salesData: propSalesData, refreshTrigger
         </CardContent>
       </Card>
 
+      {hasRevenue && (
       <Card>
         <CardHeader>
           <CardTitle>Revenue Trend</CardTitle>
@@ -192,6 +221,7 @@ export function SalesChart({ productId, salesData: propSalesData, refreshTrigger
           </ChartContainer>
         </CardContent>
       </Card>
+      )}
     </div>
   )
 }
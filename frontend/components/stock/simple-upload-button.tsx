@@ -12,7 +12,7 @@ import {
   DialogTrigger,
 } from "@/components/ui/dialog"
 import { Upload, FileText, AlertCircle, Loader2 } from "lucide-react"
-import { uploadSalesData, uploadStockData } from "@/lib/api"
+import { uploadSalesData, uploadStockData, type ImportJob } from "@/lib/api"
 import { useAppToast } from "@/lib/use-toast"
 import UploadOverlay from "@/components/ui/upload-overlay"
 
@@ -55,6 +55,14 @@ export function SimpleUploadButton({ onUploadComplete }: SimpleUploadButtonProps
     }
   }
 
+  // Move the bar with the import job's real progress once the backend reports a row estimate
+  const trackJob = (job: ImportJob) => {
+    const total = job.progress?.rows_total
+    if (!total) return
+    const percent = Math.min(99, (job.progress!.rows_read / total) * 100)
+    setUploadProgress(prev => Math.max(prev, percent))
+  }
+
   const handleSalesUploadClick = () => {
     salesInputRef.current?.click()
   }
@@ -73,7 +81,8 @@ export function SimpleUploadButton({ onUploadComplete }: SimpleUploadButtonProps
     try {
       const result = await uploadSalesData(file, {
         dry_run: salesDryRun,
-        create_missing: salesCreateMissing
+        create_missing: salesCreateMissing,
+        onProgress: trackJob
       })
       
       completeProgress()
@@ -117,7 +126,8 @@ export function SimpleUploadButton({ onUploadComplete }: SimpleUploadButtonProps
 
     try {
       const result = await uploadStockData(file, {
-        dry_run: stockDryRun
+        dry_run: stockDryRun,
+        onProgress: trackJob
       })
       
       completeProgress()
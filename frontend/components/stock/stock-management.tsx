@@ -8,7 +8,7 @@ import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/com
 import { Badge } from "@/components/ui/badge"
 import { SimpleUploadButton } from "./simple-upload-button"
 import { Search, Package, AlertTriangle, Settings } from "lucide-react"
-import { getProducts, getCategories, setDataSource, getDataSource, getAvailableSizesAndColors, getAllSales, analyzeSalesData } from '@/lib/api'
+import { getProducts, getCategories, setDataSource, getDataSource, getAvailableSizesAndColors, getSalesAnalytics, getRestockRecommendations, type RestockRecommendation } from '@/lib/api'
 import { FixedSizeList as List } from 'react-window'
 import { notificationManager } from '@/lib/notifications'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
@@ -53,8 +53,13 @@ export function StockManagement() {
   const searchParams = useSearchParams()
   const router = useRouter()
   const [products, setProducts] = useState<Product[]>([])
+  // keyset cursor of the next /products/ page; null once every page is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [totalEstimate, setTotalEstimate] = useState<number | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [categories, setCategories] = useState<{ id: number; name: string }[]>([])
   const [salesData, setSalesData] = useState<Map<string, any>>(new Map())
+  const [restockData, setRestockData] = useState<Map<string, RestockRecommendation>>(new Map())
   const [loadingSales, setLoadingSales] = useState(false)
   const [loading, setLoading] = useState(true)
   const [loadError, setLoadError] = useState<string | null>(null)
@@ -140,6 +145,19 @@ export function StockManagement() {
     }
   }, [products.length, dataSource])
 
+  // Backend restock forecast for the default lead time (pajara only)
+  useEffect(() => {
+    if (products.length === 0 || dataSource !== 'pajara') {
+      setRestockData(new Map())
+      return
+    }
+    let cancelled = false
+    getRestockRecommendations({ lead_time_days: defaultLeadTime })
+      .then(recs => { if (!cancelled) setRestockData(new Map(recs.map(r => [r.sku, r]))) })
+      .catch(error => console.error('Failed to load restock recommendations:', error))
+    return () => { cancelled = true }
+  }, [products.length, dataSource, defaultLeadTime])
+
   // Helper function to calculate consistent days since last sale
   // Deterministic seed from SKU (string) to emulate days since last sale when numeric id is not available
   const skuToSeed = (sku: string) => {
@@ -274,8 +292,16 @@ export function StockManagement() {
       
       const stockLevel = getStockLevel(p)
       const leadTime = p.lead_time_days || defaultLeadTime
-      const reorderPoint = Math.max(p.low_stock_threshold, leadTime * dailySalesRate)
-      const recommendedReorderQty = Math.ceil(dailySalesRate * 30) // 30 days supply
+      let reorderPoint = Math.max(p.low_stock_threshold, leadTime * dailySalesRate)
+      let recommendedReorderQty = Math.ceil(dailySalesRate * 30) // 30 days supply
+
+      // The backend forecast is computed for the default lead time and adds safety stock
+      const restock = restockData.get(sku)
+      if (restock && leadTime === defaultLeadTime) {
+        reorderPoint = Math.max(p.low_stock_threshold, restock.reorder_point ?? 0)
+        recommendedReorderQty = restock.reorder_qty
+        daysUntilStockout = restock.days_of_cover === null ? 999 : Math.floor(restock.days_of_cover)
+      }
       const inventoryValue = (p.cost_price || 0) * stockLevel
       const profitMargin = p.selling_price && p.cost_price ? 
         ((p.selling_price - p.cost_price) / p.selling_price) * 100 : 0
@@ -292,7 +318,7 @@ export function StockManagement() {
         sales_analysis: salesAnalysis // Include the full sales analysis
       }
     })
-  }, [products, defaultLeadTime, salesData])
+  }, [products, defaultLeadTime, salesData, restockData])
 
   // Apply all filters to products
   const filteredProducts = React.useMemo(() => {
@@ -400,25 +426,8 @@ export function StockManagement() {
   const loadSalesData = async () => {
     try {
       setLoadingSales(true)
-      const sales = await getAllSales()
-      
-      // Group sales by SKU and analyze each
-      const salesByProduct = new Map<string, any>()
-      
-      // Group sales by SKU
-      const salesGrouped: { [sku: string]: any[] } = {}
-      for (const sale of sales) {
-        if (!salesGrouped[sale.sku]) {
-          salesGrouped[sale.sku] = []
-        }
-        salesGrouped[sale.sku].push(sale)
-      }
-      
-      // Analyze each product's sales
-      for (const [sku, productSales] of Object.entries(salesGrouped)) {
-        const analysis = analyzeSalesData(productSales)
-        salesByProduct.set(sku, analysis)
-      }
+      // Per-SKU sales metrics, aggregated by the backend in one query
+      const salesByProduct = await getSalesAnalytics()
       
       setSalesData(salesByProduct)
       console.log('Sales data loaded:', salesByProduct.size, 'products with sales')
@@ -430,6 +439,42 @@ export function StockManagement() {
     }
   }
 
+  // When using server (pajara), send filters to the API
+  const serverFilters = () => {
+    const filters: any = {}
+    if (dataSource === 'pajara') {
+      if (selectedCategory !== 'all') filters.category_id = Number(selectedCategory)
+      if (selectedSize !== 'all') filters.size = selectedSize
+      if (selectedColor !== 'all') filters.color = selectedColor
+    }
+    return dataSource === 'pajara' ? filters : undefined
+  }
+
+  // Attach the `category` object from the categories list when available
+  const withCategories = (items: Product[], cats: { id: number; name: string }[]) => {
+    const catById = new Map<number, { id: number; name: string }>()
+    for (const c of cats) catById.set(c.id, c)
+    return (items || []).map((p: any) => {
+      const cat = p?.category?.name ? p.category : (p?.category_id ? catById.get(Number(p.category_id)) ?? null : null)
+      return { ...p, category: cat }
+    })
+  }
+
+  const loadMoreProducts = async () => {
+    if (!nextCursor || loadingMore) return
+    try {
+      setLoadingMore(true)
+      const productsPage = await getProducts(serverFilters(), nextCursor)
+      setProducts(prev => [...prev, ...withCategories(productsPage.items, categories)])
+      setNextCursor(productsPage.next_cursor)
+    } catch (error) {
+      console.error('Failed to load more products:', error)
+      setLoadError((error as any)?.message || String(error))
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const loadData = async (suppressLoading: boolean = false) => {
     try {
       // When suppressLoading is true (e.g. applying filters), don't flip the
@@ -439,17 +484,12 @@ export function StockManagement() {
         setLoading(true)
       }
       setLoadError(null)
-      // When using server (pajara), send filters to the API
-      const filters: any = {}
-      if (dataSource === 'pajara') {
-        if (selectedCategory !== 'all') filters.category_id = Number(selectedCategory)
-        if (selectedSize !== 'all') filters.size = selectedSize
-        if (selectedColor !== 'all') filters.color = selectedColor
-      }
-      const [productsData, categoriesData] = await Promise.all([
-        getProducts(dataSource === 'pajara' ? filters : undefined),
+      // First page only; further pages load on demand with loadMoreProducts
+      const [productsPage, categoriesData] = await Promise.all([
+        getProducts(serverFilters()),
         getCategories()
       ])
+      const productsData = productsPage.items
       // Normalize categories: backend may return { category_id, name } or { id, name }
       const normalizedCats = (categoriesData || [])
         .map((c: any) => {
@@ -460,16 +500,11 @@ export function StockManagement() {
         })
         .filter((x): x is { id: number; name: string } => x != null && !isNaN(x.id))
       setCategories(normalizedCats)
-      // Map products to include `category` object from the categories list when available
-      const catById = new Map<number, { id: number; name: string }>()
-      for (const c of normalizedCats) catById.set(c.id, c)
-
-      const productsWithCategory = (productsData || []).map((p: any) => {
-        const cat = p?.category?.name ? p.category : (p?.category_id ? catById.get(Number(p.category_id)) ?? null : null)
-        return { ...p, category: cat }
-      })
+      const productsWithCategory = withCategories(productsData, normalizedCats)
 
       setProducts(productsWithCategory)
+      setNextCursor(productsPage.next_cursor)
+      setTotalEstimate(productsPage.total_estimate)
 
       // Check stock levels and trigger notifications
       const stockItems = (productsWithCategory || [])
@@ -1360,6 +1395,19 @@ export function StockManagement() {
               </div>
             )}
 
+            {/* More rows on the server: fetch the next keyset page */}
+            {nextCursor && (
+              <div className="flex items-center justify-between mt-4 pt-4 border-t">
+                <div className="text-sm text-muted-foreground">
+                  Loaded {products.length.toLocaleString()}
+                  {totalEstimate != null && <> of about {Math.max(totalEstimate, products.length).toLocaleString()}</>} products
+                </div>
+                <Button size="sm" variant="outline" onClick={loadMoreProducts} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load more products'}
+                </Button>
+              </div>
+            )}
+
             {/* Pagination controls */}
             {filteredProducts.length > 0 && (
               <div className="flex items-center justify-between mt-4 pt-4 border-t">
@@ -69,6 +69,37 @@ export interface FileUploadData {
   stock_file?: File
 }
 
+export interface ImportJobProgress {
+  rows_total: number | null
+  rows_read: number
+  elapsed_seconds: number
+  rows_per_second: number | null
+  eta_seconds: number | null
+  // importer counters, e.g. processed/skipped/matched_skus/errors for sales
+  [counter: string]: number | null
+}
+
+export interface ImportJob {
+  job_id: string
+  kind: 'products' | 'sales'
+  filename: string | null
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  options: Record<string, boolean>
+  message: string | null
+  error: string | null
+  progress: ImportJobProgress | null
+  report: ({ success: boolean; message: string } & Record<string, any>) | null
+  created_at: string
+  started_at: string | null
+  finished_at: string | null
+}
+
+export interface UploadOptions {
+  dry_run?: boolean
+  // called on every poll while the import job runs
+  onProgress?: (job: ImportJob) => void
+}
+
 // -----------------------------
 // Mock data & simple helpers
 // -----------------------------
@@ -234,21 +265,78 @@ export async function getOutOfStockProducts(): Promise<Product[]> {
 }
 
 // Products/Categories - call backend only when using 'pajara'
-export async function getProducts(filters?: { category_id?: number | null; size?: string | null; color?: string | null }): Promise<Product[]> {
+export interface ProductFilters {
+  category_id?: number | null
+  size?: string | null
+  color?: string | null
+  q?: string | null // case-insensitive SKU/name search
+  sku_prefix?: string | null
+  sort?: 'sku' | 'name' | 'stock_level'
+  order?: 'asc' | 'desc'
+}
+
+export interface ProductPage {
+  items: Product[]
+  next_cursor: string | null
+  total_estimate: number | null
+}
+
+const PRODUCTS_PAGE_LIMIT = 5000
+
+// One keyset page of /products/; pass the previous page's next_cursor to continue.
+export async function getProductsPage(
+  filters: ProductFilters = {},
+  cursor?: string | null,
+  limit = PRODUCTS_PAGE_LIMIT
+): Promise<ProductPage> {
+  const params = new URLSearchParams({ limit: String(limit) })
+  if (cursor) params.set('cursor', cursor)
+  if (filters.category_id != null) params.set('category_id', String(filters.category_id))
+  if (filters.size) params.set('size', filters.size)
+  if (filters.color) params.set('color', filters.color)
+  if (filters.q) params.set('q', filters.q)
+  if (filters.sku_prefix) params.set('sku_prefix', filters.sku_prefix)
+  if (filters.sort) params.set('sort', filters.sort)
+  if (filters.order) params.set('order', filters.order)
+  const res = await apiFetch(`/products/?${params.toString()}`)
+  if (!res.ok) throw new Error('Failed to fetch products')
+  return res.json()
+}
+
+// One page of products; pass the previous page's next_cursor to load the next one.
+// Mock sources come back as a single page.
+export async function getProducts(filters?: ProductFilters, cursor?: string | null): Promise<ProductPage> {
   if (currentDataSource === 'pajara') {
-    const params = new URLSearchParams()
-    if (filters) {
-      if (filters.category_id != null) params.set('category_id', String(filters.category_id))
-      if (filters.size) params.set('size', filters.size)
-      if (filters.color) params.set('color', filters.color)
-    }
-    const path = params.toString() ? `/products?${params.toString()}` : '/products'
-    const res = await apiFetch(path)
-    if (!res.ok) throw new Error('Failed to fetch products')
-    return res.json()
+    return getProductsPage(filters, cursor)
   }
   await delay(200)
-  return dataSources[currentDataSource]
+  const items = dataSources[currentDataSource]
+  return { items, next_cursor: null, total_estimate: items.length }
+}
+
+export interface ProductFacets {
+  sizes: string[]
+  colors: string[]
+  total: number
+  size_counts: Record<string, number>
+  color_counts: Record<string, number>
+  category_counts: Record<string, number> // keyed by category_id
+}
+
+// Facet values with product counts under the given filters. The backend sends
+// an ETag, so the browser revalidates and unchanged facets come back as 304s.
+export async function getProductFacets(
+  filters?: { category_id?: number | null; size?: string | null; color?: string | null }
+): Promise<ProductFacets | null> {
+  if (currentDataSource !== 'pajara') return null
+  const params = new URLSearchParams()
+  if (filters?.category_id != null) params.set('category_id', String(filters.category_id))
+  if (filters?.size) params.set('size', filters.size)
+  if (filters?.color) params.set('color', filters.color)
+  const qs = params.toString()
+  const res = await apiFetch(qs ? `/products/facets?${qs}` : '/products/facets')
+  if (!res.ok) throw new Error('Failed to fetch product facets')
+  return res.json()
 }
 
 // Fetch available sizes and colors from the backend (pajara). This will fetch
@@ -278,11 +366,50 @@ export async function getCategories(): Promise<ProductCategory[]> {
 }
 
 // Sales API functions
-export async function getAllSales(): Promise<Sale[]> {
+export interface SalesFilters {
+  date_from?: string
+  date_to?: string
+  channel?: string[]
+  sku?: string[]
+  order?: 'asc' | 'desc'
+}
+
+export interface SalesPage {
+  items: Sale[]
+  next_cursor: string | null
+  total_estimate: number | null
+}
+
+const SALES_PAGE_LIMIT = 5000
+
+// One keyset page of /sales/; pass the previous page's next_cursor to continue.
+export async function getSalesPage(
+  filters: SalesFilters = {},
+  cursor?: string | null,
+  limit = SALES_PAGE_LIMIT
+): Promise<SalesPage> {
+  const params = new URLSearchParams({ limit: String(limit) })
+  if (cursor) params.set('cursor', cursor)
+  if (filters.date_from) params.set('date_from', filters.date_from)
+  if (filters.date_to) params.set('date_to', filters.date_to)
+  if (filters.order) params.set('order', filters.order)
+  filters.channel?.forEach(c => params.append('channel', c))
+  filters.sku?.forEach(s => params.append('sku', s))
+  const res = await apiFetch(`/sales/?${params.toString()}`)
+  if (!res.ok) throw new Error('Failed to fetch sales data')
+  return res.json()
+}
+
+export async function getAllSales(filters: SalesFilters = {}): Promise<Sale[]> {
   if (currentDataSource === 'pajara') {
-    const res = await apiFetch('/sales/')
-    if (!res.ok) throw new Error('Failed to fetch sales data')
-    return res.json()
+    const sales: Sale[] = []
+    let cursor: string | null = null
+    do {
+      const page: SalesPage = await getSalesPage(filters, cursor)
+      sales.push(...page.items)
+      cursor = page.next_cursor
+    } while (cursor)
+    return sales
   }
   // For mock data, generate some sample sales
   await delay(200)
@@ -300,6 +427,154 @@ export async function getSalesBySku(sku: string): Promise<Sale[]> {
   return generateMockSalesForSku(sku)
 }
 
+export interface SalesSeriesFilters {
+  sku?: string[]
+  channel?: string[]
+  date_from?: string
+  date_to?: string
+  interval?: 'day' | 'week' | 'month'
+  by_channel?: boolean
+}
+
+export interface SalesSeriesPoint {
+  date: string // first day of the bucket
+  channel: string | null // null when by_channel is false
+  quantity: number
+}
+
+function bucketStart(date: string, interval: 'day' | 'week' | 'month'): string {
+  if (interval === 'day') return date.slice(0, 10)
+  if (interval === 'month') return `${date.slice(0, 7)}-01`
+  // ISO weeks start on Monday, like Postgres date_trunc('week')
+  const d = new Date(`${date.slice(0, 10)}T00:00:00Z`)
+  d.setUTCDate(d.getUTCDate() - ((d.getUTCDay() + 6) % 7))
+  return d.toISOString().slice(0, 10)
+}
+
+// Units sold per day/week/month from the backend's sales_daily rollup
+export async function getSalesSeries(filters: SalesSeriesFilters = {}): Promise<SalesSeriesPoint[]> {
+  const interval = filters.interval ?? 'day'
+  const byChannel = filters.by_channel ?? true
+  if (currentDataSource === 'pajara') {
+    const params = new URLSearchParams({ interval, by_channel: String(byChannel) })
+    if (filters.date_from) params.set('date_from', filters.date_from)
+    if (filters.date_to) params.set('date_to', filters.date_to)
+    filters.channel?.forEach(c => params.append('channel', c))
+    filters.sku?.forEach(s => params.append('sku', s))
+    const res = await apiFetch(`/sales/daily?${params.toString()}`)
+    if (!res.ok) throw new Error('Failed to fetch sales series')
+    return res.json()
+  }
+  // Mock data: bucket the generated sales the same way the backend does
+  const sales = filters.sku?.length === 1 ? await getSalesBySku(filters.sku[0]) : await getAllSales()
+  const totals = new Map<string, SalesSeriesPoint>()
+  for (const sale of sales) {
+    if (filters.sku && !filters.sku.includes(sale.sku)) continue
+    if (filters.channel && !filters.channel.includes(sale.channel)) continue
+    if (filters.date_from && sale.date < filters.date_from) continue
+    if (filters.date_to && sale.date.slice(0, 10) > filters.date_to) continue
+    const date = bucketStart(sale.date, interval)
+    const channel = byChannel ? sale.channel : null
+    const key = `${date}|${channel ?? ''}`
+    const point = totals.get(key)
+    if (point) point.quantity += sale.quantity
+    else totals.set(key, { date, channel, quantity: sale.quantity })
+  }
+  return Array.from(totals.values()).sort((x, y) =>
+    x.date.localeCompare(y.date) || (x.channel ?? '').localeCompare(y.channel ?? ''))
+}
+
+export interface RestockRecommendation {
+  sku: string
+  stock_level: number
+  daily_demand: number
+  days_of_cover: number | null // null when the product has no demand
+  safety_stock: number | null
+  reorder_point: number | null
+  reorder_qty: number
+  needs_reorder: boolean
+}
+
+export interface RestockOptions {
+  method?: 'sma' | 'ema'
+  window_days?: number
+  alpha?: number
+  lead_time_days?: number
+  cover_days?: number
+  category_id?: number | null
+  only_reorder?: boolean
+}
+
+// Demand forecast and reorder quantities for every product, most urgent first.
+// Only the pajara backend has the sales history this needs.
+export async function getRestockRecommendations(options: RestockOptions = {}): Promise<RestockRecommendation[]> {
+  if (currentDataSource !== 'pajara') return []
+  const params = new URLSearchParams()
+  for (const [key, value] of Object.entries(options)) {
+    if (value !== undefined && value !== null) params.set(key, String(value))
+  }
+  const qs = params.toString()
+  const res = await apiFetch(qs ? `/restock/recommendations?${qs}` : '/restock/recommendations')
+  if (!res.ok) throw new Error('Failed to fetch restock recommendations')
+  return res.json()
+}
+
+export interface ProductSalesAnalytics {
+  sku: string
+  total_sales: number
+  last_sale_date: string | null
+  days_since_last_sale: number | null
+  average_daily_sales: number
+  is_active: boolean
+}
+
+function toSalesAnalysis(a: ProductSalesAnalytics): SalesAnalysis {
+  return {
+    totalSales: a.total_sales,
+    lastSaleDate: a.last_sale_date,
+    daysSinceLastSale: a.days_since_last_sale ?? Infinity,
+    averageDailySales: a.average_daily_sales,
+    isActive: a.is_active
+  }
+}
+
+// Sales metrics for every product keyed by SKU. The pajara backend computes
+// them in one aggregated query; mock data is analyzed in the browser.
+export async function getSalesAnalytics(
+  filters?: { category_id?: number | null; size?: string | null; color?: string | null }
+): Promise<Map<string, SalesAnalysis>> {
+  const analytics = new Map<string, SalesAnalysis>()
+  if (currentDataSource === 'pajara') {
+    const params = new URLSearchParams()
+    if (filters?.category_id != null) params.set('category_id', String(filters.category_id))
+    if (filters?.size) params.set('size', filters.size)
+    if (filters?.color) params.set('color', filters.color)
+    const qs = params.toString()
+    const res = await apiFetch(qs ? `/analytics/products?${qs}` : '/analytics/products')
+    if (!res.ok) throw new Error('Failed to fetch sales analytics')
+    const rows: ProductSalesAnalytics[] = await res.json()
+    for (const row of rows) analytics.set(row.sku, toSalesAnalysis(row))
+    return analytics
+  }
+  const grouped = new Map<string, Sale[]>()
+  for (const sale of await getAllSales()) {
+    const list = grouped.get(sale.sku)
+    if (list) list.push(sale)
+    else grouped.set(sale.sku, [sale])
+  }
+  grouped.forEach((sales, sku) => analytics.set(sku, analyzeSalesData(sales)))
+  return analytics
+}
+
+export async function getProductSalesAnalytics(sku: string): Promise<SalesAnalysis> {
+  if (currentDataSource === 'pajara') {
+    const res = await apiFetch(`/analytics/products/${encodeURIComponent(sku)}`)
+    if (!res.ok) throw new Error('Failed to fetch sales analytics for SKU')
+    return toSalesAnalysis(await res.json())
+  }
+  return analyzeSalesData(await getSalesBySku(sku))
+}
+
 // Analyze sales data to determine if a product is active
 export function analyzeSalesData(sales: Sale[]): SalesAnalysis {
   if (sales.length === 0) {
@@ -393,10 +668,36 @@ function generateMockSalesForSku(sku: string): Sale[] {
   return mockSales
 }
 
-// File upload functions with proper query parameters
+export async function getImportJob(jobId: string): Promise<ImportJob> {
+  const res = await apiFetch(`/imports/${jobId}`)
+  if (!res.ok) throw new Error('Failed to fetch import job')
+  return res.json()
+}
+
+// Poll an import job until it finishes; resolves with its report, rejects with its error.
+export async function waitForImportJob(
+  jobId: string,
+  onProgress?: (job: ImportJob) => void,
+  intervalMs = 1000
+): Promise<{ success: boolean; message: string } & Record<string, any>> {
+  for (;;) {
+    const job = await getImportJob(jobId)
+    onProgress?.(job)
+    if (job.status === 'succeeded') {
+      return job.report ?? { success: true, message: job.message ?? 'Import finished' }
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Import failed')
+    }
+    await delay(intervalMs)
+  }
+}
+
+// File upload functions with proper query parameters. The backend queues the
+// import and returns a job id; these resolve once the job has finished.
 export async function uploadSalesData(
   file: File, 
-  options: { dry_run?: boolean; create_missing?: boolean } = {}
+  options: UploadOptions & { create_missing?: boolean } = {}
 ): Promise<{ success: boolean; message: string }> {
   console.log('uploadSalesData called with:', { filename: file.name, options, currentDataSource })
   
@@ -419,7 +720,9 @@ export async function uploadSalesData(
       console.error('Sales upload failed:', errorText)
       throw new Error(errorText || 'Failed to upload sales file')
     }
-    const result = await res.json()
+    const queued = await res.json()
+    console.log('Sales import queued:', queued)
+    const result = await waitForImportJob(queued.job_id, options.onProgress)
     console.log('Sales upload result:', result)
     return result
   }
@@ -436,7 +739,7 @@ export async function uploadSalesData(
 
 export async function uploadStockData(
   file: File, 
-  options: { dry_run?: boolean } = {}
+  options: UploadOptions = {}
 ): Promise<{ success: boolean; message: string }> {
   console.log('uploadStockData called with:', { filename: file.name, options, currentDataSource })
   
@@ -458,7 +761,9 @@ export async function uploadStockData(
       console.error('Stock upload failed:', errorText)
       throw new Error(errorText || 'Failed to upload stock file')
     }
-    const result = await res.json()
+    const queued = await res.json()
+    console.log('Stock import queued:', queued)
+    const result = await waitForImportJob(queued.job_id, options.onProgress)
     console.log('Stock upload result:', result)
     return result
   }